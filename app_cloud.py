@@ -102,7 +102,7 @@ def display_single_result(result: Dict[str, Any]):
     if result.get("error"):
         st.error("❌ Lỗi xử lý!")
         st.warning(f"Chi tiết: {result['error']}")
-        st.info("💡 Vui lòng chờ 30 giây rồi thử lại nếu là Rate Limit.")
+        st.info("💡 Hệ thống đã tự chờ và thử lại khi gặp Rate Limit; nếu vẫn lỗi, kiểm tra quota API (LLM_RPM, DOCUMENTAI_QPS trong .env).")
         return
     
     # Success
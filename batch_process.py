@@ -1,61 +1,85 @@
 """
 Xử lý batch images từ folder 'image/' và xuất kết quả ra 'output/results.json'.
+
+Kết quả từng file được ghi ngay vào 'output/results.jsonl' (checkpoint);
+chạy lại sẽ bỏ qua các file đã xử lý thành công. Dùng --fresh để chạy lại từ đầu.
+
+Mặc định (--schedule fifo) đọc thư mục input lười, file nào chạy ngay file đó.
+--schedule lpt/sjf: ước lượng chi phí từng file trước (số trang, dung lượng, loader)
+rồi sắp xếp; báo cáo ước lượng vs thực tế ở 'output/schedule_report.json'.
+Ước lượng đọc text layer mọi trang PDF của toàn bộ input trước khi chạy file đầu tiên
+-> chỉ nên dùng khi batch trộn nhiều file dài / ngắn.
 """
-import os
 import json
 import time
+import argparse
 from pathlib import Path
 from core.pipeline import DocumentProcessor
+from core.batch import BatchRunner, iterInputs, compact, loadCheckpoint, loadActualTimes
+from core.schedule import estimateCost, planLanes, costReport, LONG_LANE_PAGES
+from core.promptcache import getPromptCache
 
 INPUT_DIR = "image"
 OUTPUT_FILE = "output/results.json"
+JSONL_FILE = "output/results.jsonl"
+REPORT_FILE = "output/schedule_report.json"
 
 def main():
+    parser = argparse.ArgumentParser(description="Batch xử lý tài liệu")
+    parser.add_argument("--input", default=INPUT_DIR, help="Thư mục input")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="File JSON kết quả")
+    parser.add_argument("--jsonl", default=JSONL_FILE, help="File JSONL (checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Số file xử lý đồng thời")
+    parser.add_argument("--fresh", action="store_true", help="Bỏ checkpoint, chạy lại toàn bộ")
+    parser.add_argument("--schedule", choices=["fifo", "lpt", "sjf"], default="fifo",
+                        help="Thứ tự chạy: fifo = theo thư mục, đọc lười (mặc định), "
+                             "lpt = file dài trước, sjf = file ngắn trước (ước lượng toàn bộ input trước)")
+    parser.add_argument("--long-lane", type=int, nargs="?", const=LONG_LANE_PAGES, default=0, metavar="PAGES",
+                        help=f"Chạy file >= PAGES trang (mặc định {LONG_LANE_PAGES}) trên lane riêng")
+    parser.add_argument("--long-workers", type=int, default=1, help="Số worker của lane tài liệu dài")
+    parser.add_argument("--report", default=REPORT_FILE, help="File báo cáo ước lượng vs thực tế")
+    args = parser.parse_args()
+
     processor = DocumentProcessor()
-    results = []
-    
-    # Tạo output folder
-    Path("output").mkdir(exist_ok=True)
-    
-    # Duyệt tất cả file ảnh
-    for root, dirs, files in os.walk(INPUT_DIR):
-        for filename in files:
-            file_path = Path(root) / filename
-            if file_path.suffix.lower() not in {'.jpg', '.jpeg', '.png', '.pdf'}:
-                continue
-            
-            print(f"🔄 {file_path}...", end=" ")
-            start = time.time()
-            
-            try:
-                result = processor.run(str(file_path))
-                elapsed = time.time() - start
-                
-                # Thêm metadata
-                doc = result.get("documents", [{}])[0] if result.get("documents") else {}
-                results.append({
-                    "input": str(file_path),
-                    "category": doc.get("category"),
-                    "docType": doc.get("docType"),
-                    "data": doc.get("data"),
-                    "confidence": doc.get("confidence"),
-                    "time_sec": round(elapsed, 2),
-                    "error": result.get("error")
-                })
-                print(f"✅ {doc.get('docType', '?')} ({elapsed:.1f}s)")
-                
-            except Exception as e:
-                results.append({
-                    "input": str(file_path),
-                    "error": str(e)[:100]
-                })
-                print(f"❌ {str(e)[:50]}")
-    
-    # Lưu tất cả vào 1 file JSON
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"total": len(results), "results": results}, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n✅ Đã xử lý {len(results)} files. Kết quả: {OUTPUT_FILE}")
+    runner = BatchRunner(processor, args.jsonl, concurrency=args.concurrency)
+    resume = not args.fresh
+
+    if args.schedule == "fifo" and not args.long_lane:
+        # Đọc lười, không cần ước lượng trước
+        stats = runner.run(iterInputs(args.input), resume=resume)
+    else:
+        completed = loadCheckpoint(args.jsonl) if resume else set()
+        estimates = [estimateCost(p) for p in iterInputs(args.input) if p not in completed]
+        lanes = planLanes(estimates, args.schedule, args.concurrency, args.long_lane, args.long_workers)
+        for name, jobs, workers in lanes:
+            print(f"📋 Lane {name}: {len(jobs)} files, {workers} worker, "
+                  f"ước lượng {sum(e.estimatedSec for e in jobs):.0f}s")
+
+        start = time.time()
+        stats = runner.runLanes([([e.input for e in jobs], workers) for _, jobs, workers in lanes], resume=resume)
+        report = costReport(lanes, loadActualTimes(args.jsonl), wallSec=time.time() - start)
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📊 Ước lượng vs thực tế: {args.report} "
+              f"(sai số TB {report['summary']['mean_abs_error_sec']}s/file)")
+
+    # Gom JSONL -> 1 file JSON
+    total = compact(args.jsonl, args.output)
+
+    print(f"\n✅ Đã xử lý {stats['done']} files ({stats['skipped']} bỏ qua, {stats['errors']} lỗi). "
+          f"Tổng: {total}. Kết quả: {args.output}")
+    limits = {api: m.get("limit") for api, m in stats.get("concurrency", {}).items() if m}
+    if limits:
+        print(f"⚙️ Giới hạn đồng thời (AIMD) cuối batch: {limits}")
+    batchStats = processor.batchStats()
+    if batchStats.get("requests"):
+        print(f"📦 Micro-batch: {batchStats['documents']} tài liệu trong {batchStats['requests']} request "
+              f"({batchStats['missing']} trích xuất riêng)")
+    cacheTotals = getPromptCache().totals
+    if cacheTotals["requests"]:
+        print(f"🧠 Prefix cache: {cacheTotals['cached_tokens']} token input cached / "
+              f"{cacheTotals['uncached_tokens']} uncached ({cacheTotals['requests']} request)")
 
 
 if __name__ == "__main__":
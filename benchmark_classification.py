@@ -0,0 +1,148 @@
+"""
+Benchmark phân loại: flat vs tree (CLASSIFICATION_TREE)
+
+Đánh giá:
+1. Prompt tokens mỗi lần classify (offline, dựng lại đúng prompt của extract_thinker)
+2. Latency + kết quả thực tế trên các file text OCR (--source, cần API key)
+"""
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from extract_thinker import Classification
+from extract_thinker.utils import add_classification_structure
+
+from core.config import config
+from core.classifications import (
+    CLASSIFICATION_TREE, getClassificationsList, getCategoryClassifications, getChildClassifications
+)
+
+SAMPLE_CONTENT_CHARS = 2000
+
+
+def buildClassifyPrompt(content: str, classifications: List[Classification]) -> str:
+    """Dựng lại prompt của Extractor._classify_text_only (system + user)."""
+    info = "\n".join(
+        f"{c.name}: {c.description} \n{add_classification_structure(c)}"
+        for c in classifications
+    )
+    return (
+        "You are a server API that receives document information "
+        "and returns specific fields in JSON format.\n"
+        f"##Content\n{content}\n##Classifications\n"
+        "#if contract present, each field present increase confidence level\n"
+        f"{info}\n"
+        "#Don't use contract structure, just to help on the ClassificationResponse\n"
+        "Output Example: \n"
+        "{\r\n\t\"name\": \"DMV Form\",\r\n\t\"confidence\": 8\r\n}"
+        "\n\n##ClassificationResponse JSON Output\n"
+    )
+
+
+def countTokens(text: str) -> int:
+    try:
+        import litellm
+        return litellm.token_counter(model=config.processing.model, text=text)
+    except Exception:
+        return len(text) // 4
+
+
+def tokenReport(content: str) -> Dict:
+    """Prompt tokens flat vs tree cho từng nhóm (giả sử LLM chọn đúng nhóm)."""
+    flat = countTokens(buildClassifyPrompt(content, getClassificationsList()))
+    stage1 = countTokens(buildClassifyPrompt(content, getCategoryClassifications()))
+
+    perCategory = {}
+    for node in CLASSIFICATION_TREE.nodes:
+        children = getChildClassifications(node.name)
+        stage2 = countTokens(buildClassifyPrompt(content, children)) if len(children) > 1 else 0
+        perCategory[node.name] = {
+            "children": len(children),
+            "flat_tokens": flat,
+            "tree_tokens": stage1 + stage2,
+            "tree_calls": 2 if stage2 else 1,
+            "saving_pct": round((1 - (stage1 + stage2) / flat) * 100, 1),
+        }
+
+    return {
+        "content_tokens": countTokens(content),
+        "flat_tokens": flat,
+        "tree_stage1_tokens": stage1,
+        "per_category": perCategory,
+    }
+
+
+async def timeMode(processor, pages) -> Dict:
+    """Phân loại bằng LLM (bỏ qua luật) với processor của một mode, trả về tên + thời gian."""
+    start = time.time()
+    try:
+        result, debug = await processor.aclassify(pages, useRules=False)
+        return {"name": result.name if result else None, "calls": debug["classify"]["calls"],
+                "time_ms": round((time.time() - start) * 1000, 2)}
+    except Exception as e:
+        return {"error": str(e)[:100], "time_ms": round((time.time() - start) * 1000, 2)}
+
+
+def liveReport(sourceDir: str, maxFiles: int) -> List[Dict]:
+    """Đo latency thực tế trên các file .txt (output của benchmark_ocr.py)."""
+    from core.pipeline import DocumentProcessor
+    processors = {mode: DocumentProcessor(useCache=False, classificationMode=mode) for mode in ("flat", "tree")}
+    files = sorted(Path(sourceDir).rglob("*.txt"))[:maxFiles]
+    results = []
+    for idx, path in enumerate(files):
+        content = path.read_text(encoding="utf-8")
+        pages = [{"content": content}]
+        flat = asyncio.run(timeMode(processors["flat"], pages))
+        tree = asyncio.run(timeMode(processors["tree"], pages))
+        tokens = tokenReport(content[:8000])
+        print(f"[{idx + 1}/{len(files)}] {path.name}: flat {flat['time_ms']:.0f}ms "
+              f"| tree {tree['time_ms']:.0f}ms ({tree.get('calls', '?')} calls)")
+        results.append({"file": str(path), "flat": flat, "tree": tree,
+                        "flat_tokens": tokens["flat_tokens"]})
+    return results
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark phân loại flat vs tree")
+    parser.add_argument("--source", default=None, help="Thư mục text OCR (.txt) để đo latency thực tế")
+    parser.add_argument("--max-files", type=int, default=20, help="Số file tối đa")
+    parser.add_argument("--output", default="benchmark_classification_report.json", help="File output JSON")
+    args = parser.parse_args()
+
+    sample = ("Nội dung văn bản mẫu. " * 200)[:SAMPLE_CONTENT_CHARS]
+    report = {"tokens": tokenReport(sample)}
+
+    print("📊 Prompt tokens / lần classify (nội dung mẫu "
+          f"{report['tokens']['content_tokens']} tokens)")
+    print(f"  Flat: {report['tokens']['flat_tokens']} | Tree tầng 1: {report['tokens']['tree_stage1_tokens']}")
+    for name, row in report["tokens"]["per_category"].items():
+        print(f"  {name:10} | tree {row['tree_tokens']:6} tokens, {row['tree_calls']} call(s) "
+              f"| tiết kiệm {row['saving_pct']:5.1f}%")
+
+    if args.source:
+        live = liveReport(args.source, args.max_files)
+        ok = [r for r in live if "error" not in r["flat"] and "error" not in r["tree"]]
+        report["live"] = live
+        report["live_summary"] = {
+            "files": len(live),
+            "avg_flat_ms": round(sum(r["flat"]["time_ms"] for r in ok) / max(len(ok), 1), 2),
+            "avg_tree_ms": round(sum(r["tree"]["time_ms"] for r in ok) / max(len(ok), 1), 2),
+            "agreement": round(sum(r["flat"]["name"] == r["tree"]["name"] for r in ok) / max(len(ok), 1), 4),
+        }
+        print(f"\n⏱️ Latency TB: flat {report['live_summary']['avg_flat_ms']:.0f}ms "
+              f"| tree {report['live_summary']['avg_tree_ms']:.0f}ms "
+              f"| trùng kết quả {report['live_summary']['agreement']:.0%}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Báo cáo JSON: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
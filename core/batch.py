@@ -0,0 +1,168 @@
+"""
+Batch runner: xử lý song song, ghi kết quả từng file ra JSONL, chạy lại được.
+
+- Worker pool giới hạn (`concurrency`), input được đọc lười (os.walk) -> RAM không tăng theo dataset.
+- Mỗi file xong là append 1 dòng vào JSONL (crash giữa chừng không mất kết quả đã có).
+- Checkpoint = chính file JSONL: chạy lại sẽ bỏ qua các input đã thành công.
+- `compact` gom JSONL thành JSON `{"total", "results"}` như batch_process.py cũ.
+"""
+import os
+import json
+import time
+import asyncio
+import textwrap
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from core.concurrency import concurrencyMetrics
+
+INPUT_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf'}
+
+
+def iterInputs(inputDir: str, extensions: Set[str] = INPUT_EXTENSIONS) -> Iterator[str]:
+    """Duyệt lười các file cần xử lý (thứ tự ổn định giữa các lần chạy)."""
+    for root, dirs, files in os.walk(inputDir):
+        dirs.sort()
+        for filename in sorted(files):
+            if Path(filename).suffix.lower() in extensions:
+                yield str(Path(root) / filename)
+
+
+def makeRecord(filePath: str, result: Dict, elapsed: float) -> Dict:
+    """1 dòng kết quả (cùng format với output/results.json)."""
+    doc = result.get("documents", [{}])[0] if result.get("documents") else {}
+    return {
+        "input": filePath,
+        "category": doc.get("category"),
+        "docType": doc.get("docType"),
+        "data": doc.get("data"),
+        "confidence": doc.get("confidence"),
+        "time_sec": round(elapsed, 2),
+        "error": result.get("error"),
+    }
+
+
+def _iterRecords(jsonlPath: str) -> Iterator[Dict]:
+    """Đọc từng dòng JSONL (bỏ qua dòng hỏng do crash lúc đang ghi)."""
+    if not os.path.exists(jsonlPath):
+        return
+    with open(jsonlPath, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def loadActualTimes(jsonlPath: str) -> Dict[str, float]:
+    """Thời gian xử lý thực tế (time_sec) theo input, lấy bản ghi mới nhất."""
+    return {r["input"]: r.get("time_sec") for r in _iterRecords(jsonlPath) if r.get("input")}
+
+
+def loadCheckpoint(jsonlPath: str) -> Set[str]:
+    """Các input đã xử lý thành công (không có error)."""
+    return {r["input"] for r in _iterRecords(jsonlPath) if r.get("input") and not r.get("error")}
+
+
+def compact(jsonlPath: str, outputPath: str) -> int:
+    """
+    Gom JSONL -> JSON `{"total": N, "results": [...]}` (mỗi input giữ bản ghi mới nhất).
+    Ghi từng record ra file, không giữ toàn bộ kết quả trong RAM. Trả về total.
+    """
+    # Lượt 1: vị trí dòng cuối cùng của mỗi input
+    latest: Dict[str, int] = {}
+    for index, record in enumerate(_iterRecords(jsonlPath)):
+        latest[record.get("input")] = index
+    keep = set(latest.values())
+
+    Path(outputPath).parent.mkdir(parents=True, exist_ok=True)
+    tmpPath = outputPath + ".tmp"
+    with open(tmpPath, "w", encoding="utf-8") as out:
+        out.write(f'{{\n  "total": {len(keep)},\n  "results": [')
+        written = 0
+        for index, record in enumerate(_iterRecords(jsonlPath)):
+            if index not in keep:
+                continue
+            out.write(",\n" if written else "\n")
+            out.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=2), "    "))
+            written += 1
+        out.write("\n  ]\n}" if written else "]\n}")
+    os.replace(tmpPath, outputPath)
+    return len(keep)
+
+
+class BatchRunner:
+    """Chạy `DocumentProcessor.arun` trên nhiều file với worker pool giới hạn, ghi JSONL theo từng file."""
+
+    def __init__(self, processor: Any, jsonlPath: str, concurrency: int = 4):
+        self.processor = processor
+        self.jsonlPath = jsonlPath
+        self.concurrency = max(1, concurrency)
+        self.stats = {"done": 0, "skipped": 0, "errors": 0}
+
+    def run(self, inputs: Iterable[str], resume: bool = True) -> Dict[str, int]:
+        return asyncio.run(self.arun(inputs, resume=resume))
+
+    async def arun(self, inputs: Iterable[str], resume: bool = True) -> Dict[str, int]:
+        return await self.arunLanes([(inputs, self.concurrency)], resume=resume)
+
+    def runLanes(self, lanes: List[Tuple[Iterable[str], int]], resume: bool = True) -> Dict[str, int]:
+        return asyncio.run(self.arunLanes(lanes, resume=resume))
+
+    async def arunLanes(self, lanes: List[Tuple[Iterable[str], int]], resume: bool = True) -> Dict[str, int]:
+        """
+        Chạy nhiều lane song song, mỗi lane [(inputs, số worker)] có queue riêng
+        (ví dụ lane riêng cho tài liệu dài), cùng ghi vào 1 file JSONL.
+        """
+        completed = loadCheckpoint(self.jsonlPath) if resume else set()
+        if not resume and os.path.exists(self.jsonlPath):
+            os.remove(self.jsonlPath)
+        Path(self.jsonlPath).parent.mkdir(parents=True, exist_ok=True)
+
+        with open(self.jsonlPath, "a", encoding="utf-8") as out:
+            await asyncio.gather(*(
+                self._runLane(inputs, workers, completed, out) for inputs, workers in lanes
+            ))
+        self.stats["concurrency"] = concurrencyMetrics()
+        return self.stats
+
+    async def _runLane(self, inputs: Iterable[str], concurrency: int, completed: Set[str], out) -> None:
+        # Queue giới hạn -> producer không đọc trước quá nhiều input
+        concurrency = max(1, concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue, out)) for _ in range(concurrency)]
+        for filePath in inputs:
+            if filePath in completed:
+                self.stats["skipped"] += 1
+                continue
+            await queue.put(filePath)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    async def _worker(self, queue: asyncio.Queue, out) -> None:
+        while True:
+            filePath = await queue.get()
+            if filePath is None:
+                return
+            record = await self._processOne(filePath)
+            # Ghi ngay từng dòng (chỉ event loop thread ghi -> không cần lock)
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            self.stats["done"] += 1
+            if record.get("error"):
+                self.stats["errors"] += 1
+                print(f"❌ {filePath}: {str(record['error'])[:50]}")
+            else:
+                print(f"✅ {filePath}: {record.get('docType', '?')} ({record['time_sec']:.1f}s)")
+
+    async def _processOne(self, filePath: str) -> Dict:
+        start = time.time()
+        try:
+            result = await self.processor.arun(filePath)
+        except Exception as e:
+            return {"input": filePath, "time_sec": round(time.time() - start, 2), "error": str(e)[:100]}
+        return makeRecord(filePath, result, time.time() - start)
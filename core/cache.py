@@ -0,0 +1,268 @@
+"""
+Cache theo nội dung (content-addressed) cho pipeline.
+
+- LruCache: tầng RAM, giới hạn theo số phần tử.
+- SqliteCache: tầng đĩa, dùng chung giữa nhiều process, giới hạn theo dung lượng.
+- ResultCache: cache kết quả cuối cùng của DocumentProcessor (RAM -> đĩa).
+- PageCache: cache `pages` của loader (OCR) trên đĩa, độc lập với ResultCache.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.config import config
+
+
+def fileHash(path: str, chunkSize: int = 1 << 20) -> str:
+    """SHA-256 của nội dung file (đọc theo chunk, không load cả file vào RAM)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def textHash(*parts: Any) -> str:
+    """SHA-256 của một dãy giá trị (None -> chuỗi rỗng)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(("" if part is None else str(part)).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LruCache:
+    """Cache LRU trong RAM, thread-safe."""
+
+    def __init__(self, maxItems: int = 256):
+        self.maxItems = maxItems
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxItems:
+                self._items.popitem(last=False)
+
+
+class SqliteCache:
+    """
+    Cache key-value trên đĩa (SQLite, WAL) dùng chung giữa các process.
+    Khi vượt `maxBytes` thì xóa các entry ít được truy cập gần đây nhất.
+    """
+
+    def __init__(self, path: str, maxBytes: int):
+        self.path = path
+        self.maxBytes = maxBytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Mở connection mới cho mỗi thao tác (commit khi xong, luôn đóng lại)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.maxBytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.maxBytes:
+                break
+
+
+# Các key `_debug` chỉ đúng cho lần chạy tạo ra kết quả, không lưu vào cache
+RUNTIME_DEBUG_KEYS = ("cache", "concurrency", "prompt_cache")
+
+
+class ResultCache:
+    """
+    Cache kết quả `DocumentProcessor.run` 2 tầng: RAM (LRU) -> đĩa (SQLite).
+    Giá trị được lưu dạng JSON nên mỗi lần get trả về một bản copy mới.
+    """
+
+    def __init__(self, directory: str, memoryItems: int = 256, diskBytes: int = 512 << 20):
+        self.memory = LruCache(memoryItems)
+        self.disk = SqliteCache(os.path.join(directory, "results.sqlite"), diskBytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def makeKey(fileDigest: str, model: str, schemaHash: str, extraHash: str, configHash: str = "") -> str:
+        return textHash("result", fileDigest, model, schemaHash, extraHash, configHash)
+
+    @staticmethod
+    def _stripRuntime(response: Dict) -> Dict:
+        """Bỏ các trường `_debug` mô tả lần chạy (cache, concurrency, prompt cache) - không còn đúng khi hit."""
+        documents = [
+            {**doc, "_debug": {k: v for k, v in (doc.get("_debug") or {}).items() if k not in RUNTIME_DEBUG_KEYS}}
+            if isinstance(doc, dict) else doc
+            for doc in response.get("documents", [])
+        ]
+        return {**response, "documents": documents}
+
+    def get(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Trả về (response, tier) - tier là 'memory', 'disk' hoặc None nếu miss."""
+        tier = "memory"
+        raw = self.memory.get(key)
+        if raw is None:
+            tier = "disk"
+            raw = self.disk.get(key)
+            if raw is not None:
+                self.memory.set(key, raw)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+        return self._stripRuntime(json.loads(raw)), tier
+
+    def set(self, key: str, response: Dict) -> None:
+        raw = json.dumps(self._stripRuntime(response), ensure_ascii=False, default=str)
+        self.memory.set(key, raw)
+        self.disk.set(key, raw)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class PageCache:
+    """
+    Cache `pages` trả về từ `loader.load(filePath)` theo (hash file, loader, processor id).
+    Đổi contract / prompt / model không làm OCR lại cùng một tài liệu.
+    """
+
+    def __init__(self, directory: str, diskBytes: int = 2048 << 20):
+        self.disk = SqliteCache(os.path.join(directory, "pages.sqlite"), diskBytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def makeKey(fileDigest: str, loaderName: str, processorId: str = "") -> str:
+        return textHash("pages", fileDigest, loaderName, processorId)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        raw = self.disk.get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, pages: List[Dict]) -> None:
+        try:
+            raw = json.dumps(pages, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # Pages chứa dữ liệu không serialize được (ảnh, ...) -> bỏ qua
+            return
+        self.disk.set(key, raw)
+
+    def load(self, loader: Any, loaderName: str, filePath: str) -> List[Dict]:
+        """Thay thế `loader.load(filePath)`: đọc từ cache nếu có, nếu không thì load rồi lưu."""
+        key = self.makeKey(fileHash(filePath), loaderName, getattr(loader, "processor_id", "") or "")
+        pages = self.get(key)
+        if pages is None:
+            pages = loader.load(filePath)
+            self.set(key, pages)
+        return pages
+
+    def iterLoad(self, loader: Any, loaderName: str, filePath: str, firstPages: int = 0) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Bản streaming của `load`: yield (trang bắt đầu, pages) như `iterPageRanges`.
+        Hit -> 1 lô duy nhất; miss -> yield theo loader rồi lưu cả tài liệu (đúng thứ tự trang).
+        """
+        from core.loaders import iterPageRanges
+        key = self.makeKey(fileHash(filePath), loaderName, getattr(loader, "processor_id", "") or "")
+        pages = self.get(key)
+        if pages is not None:
+            yield 0, pages
+            return
+        loaded: Dict[int, Dict] = {}
+        for start, batch in iterPageRanges(loader, filePath, firstPages):
+            loaded.update((start + k, page) for k, page in enumerate(batch))
+            yield start, batch
+        self.set(key, [loaded[i] for i in sorted(loaded)])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_resultCache: Optional[ResultCache] = None
+_resultCacheLock = threading.Lock()
+
+
+def getResultCache() -> ResultCache:
+    """ResultCache dùng chung cho cả process (các phiên Streamlit, batch, ...)."""
+    global _resultCache
+    with _resultCacheLock:
+        if _resultCache is None:
+            _resultCache = ResultCache(
+                config.cache.directory,
+                memoryItems=config.cache.memoryItems,
+                diskBytes=config.cache.resultDiskMb << 20,
+            )
+        return _resultCache
+
+
+_pageCache: Optional[PageCache] = None
+_pageCacheLock = threading.Lock()
+
+
+def getPageCache() -> PageCache:
+    """PageCache dùng chung cho cả process."""
+    global _pageCache
+    with _pageCacheLock:
+        if _pageCache is None:
+            _pageCache = PageCache(config.cache.directory, diskBytes=config.cache.pageDiskMb << 20)
+        return _pageCache
@@ -0,0 +1,140 @@
+"""
+Trích xuất song song theo cửa sổ cho tài liệu dài có trường danh sách (hóa đơn nhiều mặt hàng).
+
+CONCATENATE đưa toàn bộ trang vào 1 prompt và sinh toàn bộ danh sách trong 1 lần -> latency tỉ lệ
+với số token output. Ở đây text được chia thành các cửa sổ theo dòng, chồng lấn `overlapLines`
+dòng để mặt hàng nằm ở ranh giới luôn trọn vẹn trong ít nhất 1 cửa sổ. Các cửa sổ được trích
+xuất song song rồi ghép lại:
+- trường danh sách: nối theo thứ tự cửa sổ; phần tử ở đầu cửa sổ sau trùng với phần tử của cửa sổ
+  trước và cả 2 đều nằm trong các dòng chồng lấn thì chỉ giữ 1 bản (bản đầy đủ hơn nếu 1 bản bị cắt
+  ngang). Mặt hàng mua 2 lần ở ngoài vùng chồng lấn vẫn giữ đủ;
+- trường đơn: giá trị xuất hiện nhiều nhất trong các cửa sổ, hòa thì lấy cửa sổ đầu tiên.
+"""
+import typing
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from core.pages import pagesText
+from core.validation import isEmpty
+
+# Ghi chú gửi kèm mỗi cửa sổ (giống nhau cho mọi cửa sổ -> không phá prefix cache)
+WINDOW_NOTE = (
+    "Nội dung bên dưới chỉ là 1 đoạn của tài liệu dài. Chỉ trích xuất thông tin có trong đoạn này; "
+    "trường không có trong đoạn thì để null, danh sách không có phần tử thì để []. "
+    "Bỏ qua phần tử bị cắt dở ở đầu / cuối đoạn nếu không đọc được đủ thông tin."
+)
+
+
+def listFields(contract: type) -> Tuple[str, ...]:
+    """Các trường kiểu List[...] của contract (Optional[List[...]] cũng tính)."""
+    names = []
+    for name, info in contract.model_fields.items():
+        annotation = info.annotation
+        args = typing.get_args(annotation) if typing.get_origin(annotation) is typing.Union else (annotation,)
+        if any(typing.get_origin(arg) in (list, List) for arg in args):
+            names.append(name)
+    return tuple(names)
+
+
+def splitWindows(pages: Any, windowChars: int, overlapLines: int) -> List[str]:
+    """Chia text các trang thành các cửa sổ ~`windowChars` ký tự, cửa sổ sau lặp lại `overlapLines` dòng cuối."""
+    lines = pagesText(pages).splitlines()
+    windows, start = [], 0
+    while start < len(lines):
+        end, size = start, 0
+        while end < len(lines) and (end == start or size + len(lines[end]) + 1 <= windowChars):
+            size += len(lines[end]) + 1
+            end += 1
+        windows.append("\n".join(lines[start:end]))
+        if end >= len(lines):
+            break
+        start = max(end - overlapLines, start + 1)
+    return windows
+
+
+def overlapText(previous: str, current: str) -> str:
+    """Các dòng chồng lấn: đoạn cuối dài nhất của cửa sổ trước trùng với đầu cửa sổ sau."""
+    before, after = previous.splitlines(), current.splitlines()
+    for size in range(min(len(before), len(after)), 0, -1):
+        if before[-size:] == after[:size]:
+            return "\n".join(after[:size])
+    return ""
+
+
+def _inText(item: Any, text: str) -> bool:
+    """Phần tử được đọc từ `text`: có giá trị chuỗi (mã hàng, tên hàng...) xuất hiện trong text."""
+    text = text.lower()
+    values = item.values() if isinstance(item, dict) else [item]
+    return any(
+        isinstance(v, str) and not isEmpty(v) and len(v.strip()) >= 3 and v.strip().lower() in text
+        for v in values
+    )
+
+
+def _filled(item: Any) -> int:
+    return sum(not isEmpty(v) for v in item.values()) if isinstance(item, dict) else 1
+
+
+def _sameItem(a: Any, b: Any) -> bool:
+    """2 phần tử là cùng 1 mặt hàng: mọi trường cả 2 bên đều có giá trị thì bằng nhau."""
+    if not isinstance(a, dict) or not isinstance(b, dict):
+        return a == b
+    shared = [k for k in a.keys() & b.keys() if not isEmpty(a[k]) and not isEmpty(b[k])]
+    # Ít nhất 2 trường chung (trừ khi 1 bên bị cắt chỉ còn 1 trường)
+    return len(shared) >= max(1, min(2, _filled(a), _filled(b))) and all(a[k] == b[k] for k in shared)
+
+
+def mergeLists(windows: List[List[Any]], overlaps: List[str]) -> List[Any]:
+    """
+    Nối danh sách của các cửa sổ. `overlaps[k]`: text các dòng chồng lấn giữa cửa sổ k-1 và k.
+    Các phần tử liên tiếp ở đầu cửa sổ sau trùng với phần tử của cửa sổ trước, cả 2 đều đọc
+    từ vùng chồng lấn, chỉ giữ 1 bản - bản có nhiều trường hơn.
+    """
+    merged: List[Any] = []
+    previous: List[int] = []  # index trong merged của các phần tử cửa sổ trước
+    for items, overlap in zip(windows, overlaps):
+        items = items or []
+        current, i = [], 0
+        candidates = [j for j in previous if overlap and _inText(merged[j], overlap)]
+        while i < len(items) and candidates and _inText(items[i], overlap):
+            match = next((j for j in candidates if _sameItem(merged[j], items[i])), None)
+            if match is None:
+                break
+            if _filled(items[i]) > _filled(merged[match]):
+                merged[match] = items[i]
+            candidates = [j for j in candidates if j > match]
+            current.append(match)
+            i += 1
+        for item in items[i:]:
+            current.append(len(merged))
+            merged.append(item)
+        previous = current
+    return merged
+
+
+def _key(value: Any) -> str:
+    return repr(value)
+
+
+def mergeScalars(values: List[Any]) -> Any:
+    """Giá trị xuất hiện nhiều nhất trong các cửa sổ (bỏ rỗng), hòa -> cửa sổ đầu tiên."""
+    values = [v for v in values if not isEmpty(v)]
+    if not values:
+        return None
+    counts = Counter(_key(v) for v in values)
+    best = max(counts.values())
+    return next(v for v in values if counts[_key(v)] == best)
+
+
+def mergeWindows(contract: type, windows: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ghép kết quả trích xuất của các cửa sổ `windows` (theo thứ tự) thành 1 bản ghi."""
+    lists = set(listFields(contract))
+    overlaps = [""] + [overlapText(before, after) for before, after in zip(windows, windows[1:])]
+    data: Dict[str, Any] = {}
+    for name in contract.model_fields:
+        values = [result.get(name) for result in results]
+        if name in lists:
+            data[name] = mergeLists([v if isinstance(v, list) else [] for v in values], overlaps) or None
+        else:
+            data[name] = mergeScalars(values)
+    return data
@@ -92,6 +92,17 @@ def getClassificationsList() -> List[Classification]:
             result.append(node.classification)
     return result
 
+# Tầng 1 của Tree Classification: 5 nhóm + Other
+def getCategoryClassifications() -> List[Classification]:
+    return [node.classification for node in CLASSIFICATION_TREE.nodes]
+
+# Tầng 2 của Tree Classification: các loại trong 1 nhóm
+def getChildClassifications(categoryName: str) -> List[Classification]:
+    for node in CLASSIFICATION_TREE.nodes:
+        if node.name == categoryName:
+            return [child.classification for child in (node.children or [])]
+    return []
+
 # Hàm lấy cây phân loại (Tree) - Dùng cho Tree Classification
 def getClassificationsTree() -> ClassificationTree:
     return CLASSIFICATION_TREE
@@ -0,0 +1,184 @@
+"""
+Giới hạn số request đồng thời tự điều chỉnh (AIMD) cho LLM và Document AI.
+
+Số worker cố định luôn sai: cao quá thì Gemini trả 429 hàng loạt, thấp quá thì bỏ phí quota.
+AdaptiveConcurrency tăng giới hạn dần (additive increase) khi request thành công và
+latency ổn định, giảm một nửa (multiplicative decrease) khi bị throttle (429 / 503).
+Dùng chung cho cả process -> batch runner và nhiều phiên Streamlit cùng chia một giới hạn.
+
+`acquire` chặn thread trong lúc chờ slot -> các lời gọi API chạy trên executor riêng của
+từng API (`runLlm`, `runDocAi`, tối đa `maxLimit` thread) thay vì default executor của
+asyncio: request đang chờ slot không chiếm thread của cache / đọc file.
+"""
+import time
+import asyncio
+import threading
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from core.config import config
+from core.ratelimit import isRetryable
+
+
+class AdaptiveConcurrency:
+    """
+    Semaphore có giới hạn thay đổi theo AIMD:
+    - Thành công, latency <= `latencyTolerance` x latency tốt nhất -> limit += increase / limit
+      (tăng khoảng +1 sau mỗi "vòng" limit request).
+    - Bị throttle -> limit *= decrease (tối đa 1 lần mỗi `cooldownSec`, tránh giảm dồn
+      do nhiều request đang bay cùng nhận 429).
+    - Lỗi khác -> giữ nguyên.
+    """
+
+    def __init__(self, name: str, initial: float = 4, minLimit: float = 1, maxLimit: float = 32,
+                 increase: float = 1.0, decrease: float = 0.5, latencyTolerance: float = 2.0,
+                 cooldownSec: float = 2.0):
+        self.name = name
+        self.minLimit = max(1.0, minLimit)
+        self.maxLimit = max(self.minLimit, maxLimit)
+        self.limit = min(self.maxLimit, max(self.minLimit, initial))
+        self.increase = increase
+        self.decrease = decrease
+        self.latencyTolerance = latencyTolerance
+        self.cooldownSec = cooldownSec
+        self.inFlight = 0
+        self.counts = {"ok": 0, "throttled": 0, "error": 0}
+        self._bestLatency: Optional[float] = None
+        self._lastDecrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self.inFlight < int(self.limit))
+            self.inFlight += 1
+
+    def release(self, latency: float, outcome: str = "ok") -> None:
+        with self._cond:
+            self.inFlight -= 1
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            if outcome == "throttled":
+                now = time.monotonic()
+                if now - self._lastDecrease >= self.cooldownSec:
+                    self.limit = max(self.minLimit, self.limit * self.decrease)
+                    self._lastDecrease = now
+            elif outcome == "ok":
+                if self._bestLatency is None or latency < self._bestLatency:
+                    self._bestLatency = latency
+                if latency <= self._bestLatency * self.latencyTolerance:
+                    self.limit = min(self.maxLimit, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Giữ 1 slot trong lúc gọi API; kết quả (ok / throttled / error) dùng để chỉnh limit."""
+        self.acquire()
+        start = time.monotonic()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        except Exception as e:
+            if isRetryable(e):
+                outcome = "throttled"
+            raise
+        finally:
+            self.release(time.monotonic() - start, outcome)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.inFlight,
+                **self.counts,
+            }
+
+
+class _Unlimited:
+    """Dùng khi tắt ADAPTIVE_CONCURRENCY."""
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        yield
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+
+_llmConcurrency: Optional[Any] = None
+_docAiConcurrency: Optional[Any] = None
+_concurrencyLock = threading.Lock()
+
+
+def getLlmConcurrency():
+    """Giới hạn đồng thời dùng chung cho mọi request LLM."""
+    global _llmConcurrency
+    with _concurrencyLock:
+        if _llmConcurrency is None:
+            limits = config.rateLimit
+            _llmConcurrency = AdaptiveConcurrency(
+                "llm", initial=limits.llmInitialConcurrency, maxLimit=limits.llmMaxConcurrency
+            ) if limits.adaptiveConcurrency else _Unlimited()
+        return _llmConcurrency
+
+
+def getDocAiConcurrency():
+    """Giới hạn đồng thời dùng chung cho mọi request Document AI."""
+    global _docAiConcurrency
+    with _concurrencyLock:
+        if _docAiConcurrency is None:
+            limits = config.rateLimit
+            _docAiConcurrency = AdaptiveConcurrency(
+                "docai", initial=limits.docAiInitialConcurrency, maxLimit=limits.docAiMaxConcurrency
+            ) if limits.adaptiveConcurrency else _Unlimited()
+        return _docAiConcurrency
+
+
+_llmExecutor: Optional[ThreadPoolExecutor] = None
+_docAiExecutor: Optional[ThreadPoolExecutor] = None
+
+
+def getLlmExecutor() -> ThreadPoolExecutor:
+    """Executor cho request LLM: đủ thread cho `llmMaxConcurrency` request cùng lúc."""
+    global _llmExecutor
+    with _concurrencyLock:
+        if _llmExecutor is None:
+            _llmExecutor = ThreadPoolExecutor(
+                max_workers=max(1, config.rateLimit.llmMaxConcurrency), thread_name_prefix="llm"
+            )
+        return _llmExecutor
+
+
+def getDocAiExecutor() -> ThreadPoolExecutor:
+    """Executor cho load tài liệu qua Document AI: đủ thread cho `docAiMaxConcurrency` request cùng lúc."""
+    global _docAiExecutor
+    with _concurrencyLock:
+        if _docAiExecutor is None:
+            _docAiExecutor = ThreadPoolExecutor(
+                max_workers=max(1, config.rateLimit.docAiMaxConcurrency), thread_name_prefix="docai"
+            )
+        return _docAiExecutor
+
+
+async def _runOn(executor: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Như `asyncio.to_thread` nhưng trên `executor` cho trước (giữ contextvars, vd. requestLog)."""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def runLlm(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Chạy lời gọi LLM đồng bộ (Extractor.extract / classify, PipelineLLM.request) trên executor LLM."""
+    return await _runOn(getLlmExecutor(), fn, *args, **kwargs)
+
+
+async def runDocAi(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Chạy load tài liệu đồng bộ (loader.load, lô tiếp theo của stream) trên executor Document AI."""
+    return await _runOn(getDocAiExecutor(), fn, *args, **kwargs)
+
+
+def concurrencyMetrics() -> Dict[str, Dict[str, Any]]:
+    """Giới hạn hiện tại + số request đang chạy / ok / throttled của từng API."""
+    return {"llm": getLlmConcurrency().metrics(), "docai": getDocAiConcurrency().metrics()}
@@ -27,6 +27,9 @@ class DocumentAiConfig:
     location: str = field(default_factory=lambda: os.getenv("DOCUMENTAI_LOCATION", "us"))
     processorId: str = field(default_factory=lambda: os.getenv("DOCUMENTAI_PROCESSOR_ID", ""))
     credentialsPath: str = field(default_factory=lambda: os.getenv("DOCUMENTAI_GOOGLE_CREDENTIALS", "credentials.json"))
+    # Giới hạn trang / request của processor (non-imageless mode: 15) và số request song song
+    maxPagesPerRequest: int = field(default_factory=lambda: int(os.getenv("DOCUMENTAI_MAX_PAGES", "15")))
+    maxConcurrentRequests: int = field(default_factory=lambda: int(os.getenv("DOCUMENTAI_CONCURRENCY", "4")))
     
     # Kiểm tra các tham số cần thiết
     def validate(self) -> List[str]:
@@ -38,8 +41,23 @@ class DocumentAiConfig:
             missing.append("DOCUMENTAI_PROCESSOR_ID")
         return missing
     
-    # Tạo loader cho DocumentAI
+    # Tạo loader cho DocumentAI (tự tách PDF vượt giới hạn trang)
     def createLoader(self):
+        """Create a DocAI loader that splits large PDFs and OCRs the chunks in parallel"""
+        from core.loaders import DocumentLoaderSplitDocAI
+        from core.ratelimit import getDocAiLimiter
+        from core.concurrency import getDocAiConcurrency
+        return DocumentLoaderSplitDocAI(
+            self.createRawLoader,
+            processorId=self.processorId,
+            maxPages=self.maxPagesPerRequest,
+            maxWorkers=self.maxConcurrentRequests,
+            limiter=getDocAiLimiter(),
+            concurrency=getDocAiConcurrency(),
+        )
+    
+    # Tạo loader DocumentAI gốc của extract_thinker
+    def createRawLoader(self):
         """Create a new DocumentLoaderGoogleDocumentAI instance"""
         from extract_thinker import DocumentLoaderGoogleDocumentAI, GoogleDocAIConfig
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = self.credentialsPath
@@ -54,9 +72,91 @@ class DocumentAiConfig:
 @dataclass
 class ProcessingConfig:
     model: str = field(default_factory=lambda: os.getenv("LLM_MODEL", "gemini/gemini-2.5-flash"))
-    eagerPageThreshold: int = 10
+    # Tài liệu dài hơn ngưỡng này chỉ gửi các trang cần thiết vào LLM (xem core/pages.py)
+    eagerPageThreshold: int = field(default_factory=lambda: int(os.getenv("EAGER_PAGE_THRESHOLD", "10")))
+    pagePruning: bool = field(default_factory=lambda: os.getenv("PAGE_PRUNING", "1") != "0")
+    classifyPages: int = 3
+    # PDF dài: phân loại trên các trang đầu trong lúc các trang sau vẫn đang OCR
+    streamPages: bool = field(default_factory=lambda: os.getenv("STREAM_PAGES", "1") != "0")
     dpi: int = 300
     enableThinking: bool = False
+    # PDF: định tuyến từng trang (text layer -> đọc trực tiếp, trang scan -> OCR)
+    hybridPdf: bool = field(default_factory=lambda: os.getenv("PDF_HYBRID", "1") != "0")
+    pageTextMinChars: int = 30
+    # Phân loại sơ bộ bằng luật (số hiệu, tiêu đề) trước khi gọi LLM classify
+    preClassify: bool = field(default_factory=lambda: os.getenv("PRECLASSIFY", "1") != "0")
+    preClassifyMinConfidence: int = 8
+    # Cascade model: "model_nhanh,model_manh" (rỗng = chỉ dùng `model`). Lên tầng tiếp theo khi
+    # confidence phân loại < cascadeMinConfidence hoặc khi sửa các trường trích xuất không hợp lệ
+    cascadeModels: List[str] = field(default_factory=lambda: [
+        m.strip() for m in os.getenv("LLM_CASCADE", "").split(",") if m.strip()
+    ])
+    cascadeMinConfidence: int = field(default_factory=lambda: int(os.getenv("CASCADE_MIN_CONFIDENCE", "7")))
+    # Trường không qua validateData: hỏi lại LLM chỉ các trường đó (kèm đoạn trang liên quan), tối đa N lần
+    repairAttempts: int = field(default_factory=lambda: int(os.getenv("REPAIR_ATTEMPTS", "1")))
+    # Tài liệu dài có trường danh sách (hóa đơn nhiều mặt hàng): chia cửa sổ chồng lấn theo dòng,
+    # trích xuất song song rồi ghép (bỏ trùng ở ranh giới)
+    chunked: bool = field(default_factory=lambda: os.getenv("CHUNKED_EXTRACT", "1") != "0")
+    chunkMinChars: int = field(default_factory=lambda: int(os.getenv("CHUNK_MIN_CHARS", "4000")))
+    chunkChars: int = field(default_factory=lambda: int(os.getenv("CHUNK_CHARS", "2000")))
+    chunkOverlapLines: int = 6
+    # Tài liệu ngắn: phân loại + trích xuất trong 1 request LLM (mặc định tắt, xem README)
+    oneShot: bool = field(default_factory=lambda: os.getenv("ONE_SHOT", "0") == "1")
+    oneShotMaxPages: int = 2
+    oneShotMaxChars: int = 6000
+    # Speculative: trích xuất trước cho top ứng viên của luật song song với LLM classify
+    # (bớt 1 vòng LLM khỏi latency, đổi lại tốn thêm token cho ứng viên sai)
+    speculative: bool = field(default_factory=lambda: os.getenv("SPECULATIVE_EXTRACT", "0") == "1")
+    speculativeCandidates: int = 2
+    speculativeMinScore: int = 4
+    speculativeTokenBudget: int = field(default_factory=lambda: int(os.getenv("SPECULATIVE_TOKEN_BUDGET", "20000")))
+    # Micro-batch: gom tài liệu ngắn cùng loại (CCCD, thẻ SV, hóa đơn...) vào 1 request trích xuất
+    microBatch: bool = field(default_factory=lambda: os.getenv("MICRO_BATCH", "0") == "1")
+    microBatchWindowSec: float = field(default_factory=lambda: float(os.getenv("MICRO_BATCH_WINDOW_SEC", "0.2")))
+    microBatchMaxItems: int = field(default_factory=lambda: int(os.getenv("MICRO_BATCH_MAX_ITEMS", "8")))
+    # Prefix cache (system + schema + EXTRA_CONTENTS): auto | local (chỉ đếm bằng stand-in) | off
+    promptCache: str = field(default_factory=lambda: os.getenv("PROMPT_CACHE", "auto"))
+    promptCacheMinTokens: int = field(default_factory=lambda: int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024")))
+    # Văn bản hành chính: đọc số hiệu / ngày / trích yếu / người ký bằng luật, LLM chỉ lấy phần còn thiếu
+    headerParser: bool = field(default_factory=lambda: os.getenv("HEADER_PARSER", "1") != "0")
+    # Hộ chiếu: đọc vùng MRZ (có check digit), LLM chỉ lấy các trường ngoài MRZ (ngày cấp)
+    mrzParser: bool = field(default_factory=lambda: os.getenv("MRZ_PARSER", "1") != "0")
+    # Hóa đơn: đọc mặt hàng + tổng tiền theo 3 layout OCR đã biết, chỉ dùng khi tổng thành tiền khớp Total Sales
+    invoiceParser: bool = field(default_factory=lambda: os.getenv("INVOICE_PARSER", "1") != "0")
+    # Phân loại bằng LLM: "flat" (1 lần, tất cả các lá) hoặc "tree" (nhóm -> loại)
+    classificationMode: str = field(default_factory=lambda: os.getenv("CLASSIFICATION_MODE", "flat"))
+
+
+#Config cho cache kết quả
+@dataclass
+class CacheConfig:
+    enabled: bool = field(default_factory=lambda: os.getenv("RESULT_CACHE", "1") != "0")
+    directory: str = field(default_factory=lambda: os.getenv("CACHE_DIR", ".cache"))
+    memoryItems: int = 256
+    resultDiskMb: int = field(default_factory=lambda: int(os.getenv("RESULT_CACHE_MB", "512")))
+    pagesEnabled: bool = field(default_factory=lambda: os.getenv("PAGE_CACHE", "1") != "0")
+    pageDiskMb: int = field(default_factory=lambda: int(os.getenv("PAGE_CACHE_MB", "2048")))
+
+
+#Config cho rate limit (0 = không giới hạn)
+@dataclass
+class RateLimitConfig:
+    llmRpm: float = field(default_factory=lambda: float(os.getenv("LLM_RPM", "0")))
+    llmTpm: float = field(default_factory=lambda: float(os.getenv("LLM_TPM", "1000000")))
+    docAiQps: float = field(default_factory=lambda: float(os.getenv("DOCUMENTAI_QPS", "2")))
+    docAiPagesPerMin: float = field(default_factory=lambda: float(os.getenv("DOCUMENTAI_PAGES_PER_MIN", "600")))
+    # Retry khi 429 / 503: exponential backoff + jitter
+    retries: int = field(default_factory=lambda: int(os.getenv("RATE_LIMIT_RETRIES", "5")))
+    backoffBaseSec: float = 1.0
+    backoffMaxSec: float = 60.0
+    # Ước lượng token output mỗi request (trừ trước vào quota tokens/phút)
+    llmOutputTokens: int = 1000
+    # Số request đồng thời tự điều chỉnh (AIMD): tăng dần khi ổn định, giảm một nửa khi bị 429 / 503
+    adaptiveConcurrency: bool = field(default_factory=lambda: os.getenv("ADAPTIVE_CONCURRENCY", "1") != "0")
+    llmInitialConcurrency: int = 4
+    llmMaxConcurrency: int = field(default_factory=lambda: int(os.getenv("LLM_MAX_CONCURRENCY", "32")))
+    docAiInitialConcurrency: int = 2
+    docAiMaxConcurrency: int = field(default_factory=lambda: int(os.getenv("DOCUMENTAI_MAX_CONCURRENCY", "16")))
 
 
 #Config cho toàn bộ ứng dụng
@@ -65,6 +165,8 @@ class AppConfig:
     ocr: OcrConfig = field(default_factory=OcrConfig)
     documentAi: DocumentAiConfig = field(default_factory=DocumentAiConfig)
     processing: ProcessingConfig = field(default_factory=ProcessingConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    rateLimit: RateLimitConfig = field(default_factory=RateLimitConfig)
     
     # Kiểm tra các tham số cần thiết
     def validate(self) -> None:
@@ -96,42 +198,40 @@ class AppConfig:
         
         # 3. PDF files
         if ext == '.pdf':
-            if self._pdfHasText(filePath):
-                # Native Text PDF -> No Vision
-                return DocumentLoaderPyPdf(), False, "pypdf"
-            else:
-                # Scanned PDF -> Use Document AI (Superior OCR)
-                # Thay vì dùng PyPDF + Vision (Gemini), ta dùng DocAI chuyên dụng
-                return self.documentAi.createLoader(), False, "docai_pdf"
+            if self.processing.hybridPdf:
+                # Từng trang: có text -> đọc trực tiếp, chỉ trang scan mới gửi DocAI
+                from core.loaders import DocumentLoaderHybridPdf
+                return DocumentLoaderHybridPdf(
+                    self.documentAi.createLoader,
+                    processorId=self.documentAi.processorId,
+                    minChars=self.processing.pageTextMinChars,
+                ), False, "hybrid_pdf"
+            # PyMuPDF: 1 lần mở file vừa kiểm tra text layer vừa đọc text,
+            # PDF scan (không có text) -> Document AI
+            from core.loaders import DocumentLoaderPyMuPdf
+            return DocumentLoaderPyMuPdf(
+                self.documentAi.createLoader,
+                processorId=self.documentAi.processorId,
+                minChars=self.processing.pageTextMinChars,
+            ), False, "pymupdf"
         
         # Default fallback
         return DocumentLoaderPyPdf(), False, "pypdf"
     
-    # Kiểm tra PDF có selectable text không
-    def _pdfHasText(self, path: str) -> bool:
-        """Check if PDF has selectable text"""
-        try:
-            import fitz
-            doc = fitz.open(path)
-            text = "".join(doc[i].get_text() for i in range(min(3, len(doc))))
-            doc.close()
-            return len(text.strip()) >= 50
-        except:
-            return False
-    
     # Tạo Extractor đã cấu hình sẵn (loader + LLM)
     def createExtractor(self, filePath: str):
         """
         Create a fully configured Extractor for the given file.
         Returns: (extractor, vision, loaderName)
         """
-        from extract_thinker import Extractor, LLM
+        from extract_thinker import Extractor
+        from core.llm import PipelineLLM
         
         loader, vision, loaderName = self.createLoader(filePath)
         
         extractor = Extractor()
         extractor.load_document_loader(loader)
-        extractor.load_llm(LLM(self.processing.model))
+        extractor.load_llm(PipelineLLM(self.processing.model))
         
         return extractor, vision, loaderName
 
@@ -0,0 +1,178 @@
+"""
+Đọc phần đầu + khối chữ ký của văn bản hành chính bằng luật (không gọi LLM).
+
+Văn bản quy phạm pháp luật / hành chính Việt Nam theo thể thức cố định (Nghị định 30/2020/NĐ-CP):
+    CHÍNH PHỦ                     CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM
+    Số: 15/2024/NĐ-CP             Hà Nội, ngày 15 tháng 3 năm 2024
+                        NGHỊ ĐỊNH
+          Quy định chi tiết một số điều của Luật ...
+    ...
+                                  TM. CHÍNH PHỦ
+                                  THỦ TƯỚNG
+                                  Phạm Minh Chính
+
+`parseHeader(contract, pages)` trả về các trường đọc được chắc chắn (số hiệu, ngày ban hành,
+trích yếu, người ký, cơ quan ban hành). Trường không chắc chắn thì bỏ trống để LLM trích xuất.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from contracts.government import (
+    Luat, PhapLenh, NghiDinh, ThongTu, Lenh,
+    NghiQuyetChinhPhu, NghiQuyetPhienHopChinhPhu, VanBanChiDaoDieuHanh, VanBanHopNhat,
+)
+from core.pages import pageTexts
+from core.validation import parseDate
+
+# Tên trường theo contract: số hiệu, ngày, trích yếu (2 contract dùng tên khác)
+_FIELD_NAMES = {
+    VanBanChiDaoDieuHanh: ("so_kieu", "ngay", "tieu_de"),
+    VanBanHopNhat: ("so_kieu", "ngay", "tieu_de"),
+}
+_DEFAULT_NAMES = ("so_hieu", "ngay_ban_hanh", "trich_yeu")
+HEADER_CONTRACTS = (
+    Luat, PhapLenh, NghiDinh, ThongTu, Lenh,
+    NghiQuyetChinhPhu, NghiQuyetPhienHopChinhPhu, VanBanChiDaoDieuHanh, VanBanHopNhat,
+)
+
+# Phần đầu: số hiệu, ngày, tên loại văn bản nằm trong ~2000 ký tự đầu trang 1
+HEADER_CHARS = 2000
+# Khối chữ ký nằm cuối văn bản
+SIGNATURE_CHARS = 3000
+
+# Số hiệu; phần sau dấu gạch có thể có chữ thường (QĐ-TTg, CT-TTg)
+_SO_HIEU = re.compile(
+    r"[Ss][ốô]\s*:\s*(\d+\s*/\s*(?:\d{4}\s*/\s*)?[A-ZĐ][A-ZĐ0-9]*(?:\s*-\s*[A-ZĐ0-9][A-ZĐ0-9a-zđ]*)*)"
+)
+_NGAY = re.compile(r"ngày\s+(\d{1,2})\s+tháng\s+(\d{1,2})\s+năm\s+(\d{4})", re.IGNORECASE)
+# Luật / pháp lệnh không ghi ngày ở phần đầu: "... thông qua ngày 18 tháng 01 năm 2024"
+_THONG_QUA = re.compile(r"thông\s+qua\s+(ngày\s+\d{1,2}\s+tháng\s+\d{1,2}\s+năm\s+\d{4})", re.IGNORECASE)
+# Dòng quốc hiệu / tiêu ngữ (OCR 2 cột hay ghép chung dòng với cơ quan ban hành)
+_QUOC_HIEU = re.compile(
+    r"CỘNG\s+HÒA\s+XÃ\s+HỘI\s+CHỦ\s+NGHĨA\s+VIỆT\s+NAM|Độc\s+lập\s*-\s*Tự\s+do\s*-\s*Hạnh\s+phúc|-{3,}",
+    re.IGNORECASE,
+)
+# Tên loại văn bản (dòng riêng, viết hoa)
+_LOAI_VAN_BAN = re.compile(
+    r"^(LUẬT|PHÁP LỆNH|NGHỊ ĐỊNH|THÔNG TƯ LIÊN TỊCH|THÔNG TƯ|LỆNH|NGHỊ QUYẾT|CHỈ THỊ|CÔNG ĐIỆN|"
+    r"THÔNG BÁO|QUYẾT ĐỊNH|KẾT LUẬN)\b\s*(.*)$"
+)
+# Trích yếu dừng ở phần căn cứ / chủ thể ban hành / nội dung
+_TRICH_YEU_STOP = re.compile(
+    r"^(Căn cứ|Theo đề nghị|Xét đề nghị|CHÍNH PHỦ|QUỐC HỘI|ỦY BAN THƯỜNG VỤ|CHỦ TỊCH|THỦ TƯỚNG|BỘ TRƯỞNG|"
+    r"Chương|Điều\s+\d|Kính gửi|QUYẾT NGHỊ|NAY CÔNG BỐ|Số\s*:)",
+)
+# Chức danh / thẩm quyền ký ngay trên tên người ký
+_CHUC_DANH = re.compile(
+    r"^(T\.?M\.?|K\.?T\.?|Q\.?|T\.?L\.?|TUQ\.?|THỦ TƯỚNG|PHÓ THỦ TƯỚNG|BỘ TRƯỞNG|THỨ TRƯỞNG|CHỦ TỊCH|"
+    r"PHÓ CHỦ TỊCH|CHỦ NHIỆM|TỔNG THƯ KÝ|CHÁNH VĂN PHÒNG|PHÓ CHÁNH VĂN PHÒNG|XÁC THỰC VĂN BẢN HỢP NHẤT)\b"
+)
+_NOT_NAMES = {"Nơi", "Đã", "Lưu", "Như", "Trang", "Chữ"}
+
+
+def _lines(text: str) -> List[str]:
+    return [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+
+
+def _isPersonName(line: str) -> bool:
+    """Họ tên người ký: 2-5 từ, mỗi từ viết hoa chữ cái đầu (Phạm Minh Chính)."""
+    words = line.split()
+    if not 2 <= len(words) <= 5 or words[0] in _NOT_NAMES:
+        return False
+    return all(w.isalpha() and w[0].isupper() and (len(w) == 1 or w[1:].islower()) for w in words)
+
+
+def _top(header: str) -> str:
+    """Phần trên tên loại văn bản (cơ quan, số hiệu, địa danh + ngày); sau đó là căn cứ trích dẫn."""
+    lines = header.splitlines()
+    for i, line in enumerate(lines):
+        if _LOAI_VAN_BAN.match(re.sub(r"\s+", " ", line).strip()) or line.strip().startswith("Căn cứ"):
+            return "\n".join(lines[:i])
+    return header
+
+
+def parseSoHieu(header: str) -> Optional[str]:
+    match = _SO_HIEU.search(header)
+    return re.sub(r"\s+", "", match.group(1)) if match else None
+
+
+def parseNgay(header: str) -> Optional[str]:
+    """Ngày ban hành ở phần đầu ("Hà Nội, ngày 15 tháng 3 năm 2024") -> "15/03/2024"."""
+    match = _NGAY.search(header)
+    if not match:
+        return None
+    date = parseDate(match.group(0))
+    return date.strftime("%d/%m/%Y") if date else None
+
+
+def parseTrichYeu(header: str) -> Optional[str]:
+    """
+    Tên loại văn bản + các dòng ngay sau nó đến phần căn cứ.
+    Luật / pháp lệnh (tên viết hoa): "LUẬT ĐẤT ĐAI"; còn lại lấy phần trích yếu: "Quy định chi tiết ...".
+    """
+    lines = _lines(header)
+    for i, line in enumerate(lines):
+        match = _LOAI_VAN_BAN.match(line)
+        if not match:
+            continue
+        heading, rest = match.group(1), match.group(2).strip()
+        parts = [rest] if rest else []
+        for nxt in lines[i + 1:i + 6]:
+            if not nxt:
+                if parts:
+                    break
+                continue
+            if _TRICH_YEU_STOP.match(nxt) or _CHUC_DANH.match(nxt) or _QUOC_HIEU.search(nxt):
+                break
+            parts.append(nxt)
+        text = " ".join(parts).strip()
+        if not 3 <= len(text) <= 400:
+            return None
+        return f"{heading} {text}" if text.isupper() else text
+    return None
+
+
+def parseNguoiKy(tail: str) -> Optional[str]:
+    """Tên người ký: dòng họ tên đầu tiên sau chức danh ký (TM. CHÍNH PHỦ / THỦ TƯỚNG ...)."""
+    lines = _lines(tail)
+    titles = [i for i, line in enumerate(lines) if _CHUC_DANH.match(line)]
+    for start in reversed(titles):
+        for line in lines[start + 1:start + 8]:
+            if _isPersonName(line):
+                return line
+    return None
+
+
+def parseCoQuan(header: str) -> Optional[str]:
+    """Cơ quan ban hành: dòng viết hoa đầu tiên trước "Số:" (bỏ quốc hiệu, tiêu ngữ)."""
+    for line in _lines(header):
+        if re.match(r"S[ốô]\s*:", line):
+            break
+        line = _QUOC_HIEU.sub("", line).strip(" -")
+        if line and line.isupper() and len(line) <= 80:
+            return line
+    return None
+
+
+def parseHeader(contract: Optional[type], pages: Any) -> Dict[str, str]:
+    """Các trường đọc được chắc chắn từ phần đầu / khối chữ ký. {} nếu không phải văn bản hành chính."""
+    if contract not in HEADER_CONTRACTS:
+        return {}
+    texts = pageTexts(pages)
+    if not texts:
+        return {}
+    header = texts[0][:HEADER_CHARS]
+    top = _top(header)
+    tail = "\n".join(texts)[-SIGNATURE_CHARS:]
+    soHieu, ngay, trichYeu = _FIELD_NAMES.get(contract, _DEFAULT_NAMES)
+
+    adopted = _THONG_QUA.search(tail) if contract in (Luat, PhapLenh) else None
+    values = {
+        soHieu: parseSoHieu(top),
+        ngay: parseNgay(top) or (parseNgay(adopted.group(1)) if adopted else None),
+        trichYeu: parseTrichYeu(header),
+        "nguoi_ky": parseNguoiKy(tail),
+    }
+    if "co_quan_ban_hanh" in contract.model_fields:
+        values["co_quan_ban_hanh"] = parseCoQuan(top)
+    return {name: value for name, value in values.items() if value}
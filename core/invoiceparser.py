@@ -0,0 +1,132 @@
+"""
+Đọc danh sách mặt hàng + tổng tiền của hóa đơn bán lẻ bằng luật (không gọi LLM).
+
+Hỗ trợ 3 layout OCR mô tả trong INVOICE_EXTRA_CONTENT:
+- Format 1: mã + tên cùng dòng, sau đó số lượng, đơn giá (+ giảm giá), thành tiền.
+- Format 2: mã hàng, số lượng, "đơn giá thành tiền", thành tiền, rồi tên hàng ở dòng sau.
+- Format 3: nhiều nhóm Format 2 liên tiếp.
+
+Kết quả chỉ được dùng khi nhất quán: mỗi dòng số lượng x đơn giá (- giảm giá) = thành tiền
+và tổng thành tiền = tong_tien (Total Sales). Không khớp -> trả về {} để LLM trích xuất như cũ.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.pages import pagesText
+
+_MONEY = r"(?:RM\s*)?(\d{1,3}(?:,\d{3})+|\d+)\.(\d{2,3})"
+_CODE_NAME = re.compile(r"^(\d{4,13})\s+(.*[A-Za-z].*)$")
+_CODE = re.compile(r"^(?=[A-Z0-9-]*\d)[A-Z0-9-]{4,13}$")
+_QTY = re.compile(r"^(\d{1,4}(?:\.\d{1,3})?)\s*(?:PC|PCS|UNIT|UNITS|EA|X)?$", re.IGNORECASE)
+_PRICES = re.compile(rf"^{_MONEY}(?:\s+{_MONEY})?$")
+_AMOUNT = re.compile(rf"^{_MONEY}$")
+_TOTAL_SALES = re.compile(r"TOTAL\s+SALES|TOTAL\s+AMOUNT|^TOTAL\b(?!.*(?:QTY|ROUND|DISCOUNT|GST|TAX))", re.IGNORECASE)
+_ROUNDED = re.compile(r"ROUNDED\s+TOTAL|TOTAL\s+ROUNDED|GRAND\s+TOTAL|NETT?\s+TOTAL", re.IGNORECASE)
+_STOP_NAME = re.compile(r"TOTAL|ROUNDING|CASH|CHANGE|GST|TAX|QTY|DISCOUNT", re.IGNORECASE)
+# Tổng tiền lệch nhau do làm tròn (5 sen) / sai số float
+TOLERANCE = 0.05
+
+
+def _money(match: Tuple[str, str]) -> float:
+    whole, cents = match
+    return float(f"{whole.replace(',', '')}.{cents}")
+
+
+def _amounts(line: str) -> List[float]:
+    found = re.findall(_MONEY, line)
+    return [_money(m) for m in found]
+
+
+def _isName(line: str) -> bool:
+    return bool(re.search(r"[A-Za-z]{2}", line)) and not _CODE.match(line) and not _STOP_NAME.search(line)
+
+
+def _parseItem(lines: List[str], i: int) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Đọc 1 mặt hàng bắt đầu từ dòng i. Trả về (item, index dòng tiếp theo) hoặc None."""
+    line = lines[i]
+    match = _CODE_NAME.match(line)
+    if match:
+        code, name = match.group(1), match.group(2).strip()
+    elif _CODE.match(line):
+        code, name = line, None
+    else:
+        return None
+
+    j = i + 1
+    if j >= len(lines) or not _QTY.match(lines[j]):
+        return None
+    qty = float(_QTY.match(lines[j]).group(1))
+    j += 1
+    if j >= len(lines) or not _PRICES.match(lines[j]):
+        return None
+    prices = _amounts(lines[j])
+    j += 1
+    if j >= len(lines) or not _AMOUNT.match(lines[j]):
+        return None
+    amount = _amounts(lines[j])[0]
+    j += 1
+
+    if name is None:
+        if j >= len(lines) or not _isName(lines[j]):
+            return None
+        name = lines[j]
+        j += 1
+
+    # Dòng giá: "đơn giá thành tiền" (Format 2) hoặc "đơn giá giảm giá" (Format 1)
+    unitPrice = prices[0]
+    expected = [qty * unitPrice] + ([qty * unitPrice - prices[1]] if len(prices) > 1 else [])
+    if not any(abs(value - amount) <= 0.01 for value in expected):
+        return None
+    item = {"ten_hang": name, "ma_hang": code, "so_luong": qty, "don_gia": unitPrice, "thanh_tien": amount}
+    return item, j
+
+
+def _labelled(lines: List[str], label: re.Pattern) -> List[float]:
+    """Số tiền của các dòng có nhãn (cùng dòng, hoặc dòng ngay sau nếu chỉ có số)."""
+    values = []
+    for i, line in enumerate(lines):
+        if not label.search(line):
+            continue
+        amounts = _amounts(line)
+        if amounts:
+            values.append(amounts[-1])
+        elif i + 1 < len(lines) and _AMOUNT.match(lines[i + 1]):
+            values.append(_amounts(lines[i + 1])[0])
+    return values
+
+
+def parseItems(text: str) -> List[Dict[str, Any]]:
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    items, i = [], 0
+    while i < len(lines):
+        parsed = _parseItem(lines, i)
+        if parsed is None:
+            i += 1
+            continue
+        item, i = parsed
+        items.append(item)
+    return items
+
+
+def parseInvoice(pages: Any) -> Dict[str, Any]:
+    """
+    {danh_sach_mat_hang, tong_tien, tong_thanh_toan} nếu tổng thành tiền khớp Total Sales;
+    {} nếu không đọc được / không nhất quán (-> LLM).
+    """
+    text = pagesText(pages)
+    items = parseItems(text)
+    if not items:
+        return {}
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    # Có thể có nhiều dòng tổng (trước / sau thuế): lấy dòng khớp tổng thành tiền
+    itemsTotal = sum(item["thanh_tien"] for item in items)
+    total = next((v for v in _labelled(lines, _TOTAL_SALES) if abs(v - itemsTotal) <= TOLERANCE), None)
+    if total is None:
+        return {}
+
+    data: Dict[str, Any] = {"danh_sach_mat_hang": items, "tong_tien": total}
+    rounded = next((v for v in _labelled(lines, _ROUNDED) if abs(v - total) <= TOLERANCE), None)
+    if rounded is not None:
+        data["tong_thanh_toan"] = rounded
+    return data
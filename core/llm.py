@@ -0,0 +1,74 @@
+"""
+LLM dùng trong pipeline: bọc `extract_thinker.LLM` để mọi request đi qua
+rate limiter chung (requests/phút, tokens/phút), giới hạn đồng thời tự điều chỉnh
+(AIMD), retry khi bị 429 / 503 và prefix cache (schema + EXTRA_CONTENTS).
+"""
+from typing import Any, Dict, List, Optional
+
+from extract_thinker import LLM
+
+from core.config import config
+from core.ratelimit import RateLimiter, getLlmLimiter, callWithBackoff, estimateTokens
+from core.concurrency import getLlmConcurrency
+from core.promptcache import PromptCache, getPromptCache, splitPrefix, isCacheControlError
+
+
+def _usageTokens(response: Any) -> Optional[int]:
+    """Tổng token thật từ response litellm / instructor (nếu có)."""
+    raw = getattr(response, "_raw_response", response)
+    usage = getattr(raw, "usage", None)
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+class PipelineLLM(LLM):
+    """`LLM` + rate limit dùng chung cho cả process + exponential backoff khi bị throttle."""
+
+    def __init__(self, model: str, limiter: Optional[RateLimiter] = None, concurrency: Any = None,
+                 promptCache: Optional[PromptCache] = None, **kwargs):
+        super().__init__(model, **kwargs)
+        self._limiter = limiter or getLlmLimiter()
+        self._concurrency = concurrency or getLlmConcurrency()
+        self._promptCache = promptCache or getPromptCache()
+
+    def request(self, messages: List[Dict[str, str]], response_model: Optional[str] = None) -> Any:
+        return self._cached(lambda m: super(PipelineLLM, self).request(m, response_model), messages)
+
+    def raw_completion(self, messages: List[Dict[str, str]]) -> str:
+        return self._cached(lambda m: super(PipelineLLM, self).raw_completion(m), messages)
+
+    def _cached(self, call, messages: List[Dict[str, Any]]) -> Any:
+        """Đánh dấu prefix tĩnh (nếu provider cần) rồi ghi nhận token cached / uncached."""
+        cache = self._promptCache
+        if not cache.enabled:
+            return self._throttled(lambda: call(messages), messages)
+
+        key, prefixTokens = splitPrefix(messages)
+        response = None
+        if cache.shouldMark(self.model, prefixTokens):
+            try:
+                response = self._throttled(lambda: call(cache.markPrefix(messages)), messages)
+            except Exception as e:
+                # Chỉ lỗi do provider không nhận `cache_control` mới gửi lại không đánh dấu
+                if not isCacheControlError(e):
+                    raise
+                cache.disableMarking(self.model)
+        if response is None:
+            response = self._throttled(lambda: call(messages), messages)
+        cache.record(self.model, key, prefixTokens, estimateTokens(messages), response)
+        return response
+
+    def _throttled(self, call, messages: List[Dict[str, Any]]) -> Any:
+        reserved = estimateTokens(messages) + config.rateLimit.llmOutputTokens
+
+        def attempt():
+            # Mỗi lần thử (kể cả retry) đều tính vào quota
+            self._limiter.acquire(requests=1, tokens=reserved)
+            with self._concurrency.slot():
+                return call()
+
+        response = callWithBackoff(attempt)
+        actual = _usageTokens(response)
+        if actual is not None and actual > reserved:
+            self._limiter.debit(tokens=actual - reserved)
+        return response
@@ -0,0 +1,372 @@
+"""
+Document loaders bổ sung cho pipeline (bọc quanh loader của extract_thinker).
+"""
+import os
+import asyncio
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from extract_thinker.document_loader.document_loader import DocumentLoader
+
+from core.concurrency import runDocAi
+from core.ratelimit import RateLimiter, callWithBackoff, isRetryable
+
+
+def pdfPageCount(path: str) -> int:
+    """Số trang của PDF (0 nếu không mở được)."""
+    try:
+        import fitz
+        with fitz.open(path) as doc:
+            return len(doc)
+    except Exception:
+        return 0
+
+
+def _openPdf(source: Union[str, bytes]):
+    import fitz
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _isPdf(source: Union[str, BytesIO]) -> bool:
+    if isinstance(source, str):
+        return os.path.splitext(source)[1].lower() == ".pdf"
+    return hasattr(source, "getvalue") and source.getvalue()[:5] == b"%PDF-"
+
+
+def _chunkRanges(pageCount: int, maxPages: int, firstPages: int = 0) -> List[Tuple[int, int]]:
+    """[(start, end)) các đoạn; nếu có `firstPages` thì đoạn đầu chỉ gồm chừng đó trang."""
+    ranges = []
+    start = 0
+    if 0 < firstPages < pageCount:
+        start = min(firstPages, maxPages)
+        ranges.append((0, start))
+    for s in range(start, pageCount, maxPages):
+        ranges.append((s, min(s + maxPages, pageCount)))
+    return ranges
+
+
+def splitPdf(source: Union[str, bytes], maxPages: int, firstPages: int = 0) -> List[Tuple[int, bytes]]:
+    """
+    Tách PDF (đường dẫn hoặc bytes) thành các đoạn <= maxPages trang. Trả về [(trang bắt đầu, bytes PDF)].
+    `firstPages` > 0: đoạn đầu tiên nhỏ hơn để có sớm các trang đầu (streaming).
+    """
+    import fitz
+    chunks = []
+    with _openPdf(source) as doc:
+        for start, end in _chunkRanges(len(doc), maxPages, firstPages):
+            part = fitz.open()
+            part.insert_pdf(doc, from_page=start, to_page=end - 1)
+            chunks.append((start, part.tobytes()))
+            part.close()
+    return chunks
+
+
+PageRange = Tuple[int, List[Dict[str, Any]]]
+
+
+def iterPageRanges(loader: Any, source: Union[str, BytesIO], firstPages: int = 0) -> Iterator[PageRange]:
+    """
+    Streaming interface cho loader: yield (index trang đầu, pages) theo thứ tự OCR xong,
+    không nhất thiết theo thứ tự trang. Loader không hỗ trợ streaming -> 1 lô duy nhất từ `load`.
+    """
+    if hasattr(loader, "iterRanges"):
+        yield from loader.iterRanges(source, firstPages)
+    else:
+        yield 0, loader.load(source)
+
+
+def _inOrder(ranges: Iterator[PageRange]) -> Iterator[List[Dict[str, Any]]]:
+    """Sắp lại các lô (start, pages) thành các lô liền mạch theo đúng thứ tự trang."""
+    pending: Dict[int, List[Dict[str, Any]]] = {}
+    emitted = 0
+    for start, batch in ranges:
+        pending[start] = batch
+        while emitted in pending:
+            batch = pending.pop(emitted)
+            emitted += len(batch)
+            yield batch
+    for start in sorted(pending):
+        yield pending[start]
+
+
+def iterPages(loader: Any, source: Union[str, BytesIO], firstPages: int = 0) -> Iterator[List[Dict[str, Any]]]:
+    """Như `iterPageRanges` nhưng yield từng lô pages theo đúng thứ tự trang."""
+    yield from _inOrder(iterPageRanges(loader, source, firstPages))
+
+
+def _runs(pages: List[Tuple[int, Dict[str, Any]]]) -> Iterator[PageRange]:
+    """Gom các cặp (index, page) tăng dần thành các đoạn liên tiếp (start, pages)."""
+    run: List[Dict[str, Any]] = []
+    start = 0
+    for i, page in pages:
+        if run and i != start + len(run):
+            yield start, run
+            run = []
+        if not run:
+            start = i
+        run.append(page)
+    if run:
+        yield start, run
+
+
+def _collect(batches: Iterator[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    pages = []
+    for batch in batches:
+        pages.extend(batch)
+    return pages
+
+
+class DocumentLoaderSplitDocAI(DocumentLoader):
+    """
+    Bọc DocumentLoaderGoogleDocumentAI:
+    - PDF vượt giới hạn trang của processor -> tách thành nhiều đoạn,
+      OCR song song (giới hạn số request đồng thời), ghép pages lại đúng thứ tự.
+    - Ảnh / PDF ngắn -> gọi thẳng loader gốc.
+    - Mọi request đi qua `limiter` (QPS + trang/phút), `concurrency` (AIMD) và retry khi bị 429 / 503.
+    """
+
+    SUPPORTED_FORMATS = [
+        "jpeg", "jpg", "png", "bmp", "tiff", "tif", "gif", "webp", "pdf"
+    ]
+
+    def __init__(self, loaderFactory: Callable[[], Any], processorId: str = "",
+                 maxPages: int = 15, maxWorkers: int = 4, limiter: Optional[RateLimiter] = None,
+                 concurrency: Any = None):
+        super().__init__()
+        self._loaderFactory = loaderFactory
+        self._limiter = limiter
+        self._concurrency = concurrency
+        self._local = threading.local()
+        self.processor_id = processorId
+        self.maxPages = max(1, maxPages)
+        self.maxWorkers = max(1, maxWorkers)
+
+    def _loader(self) -> Any:
+        """Mỗi thread một loader riêng (cache nội bộ của extract_thinker không thread-safe)."""
+        loader = getattr(self._local, "loader", None)
+        if loader is None:
+            loader = self._local.loader = self._loaderFactory()
+        return loader
+
+    def _loadLimited(self, source: Union[str, BytesIO], pageCount: int = 1) -> List[Dict[str, Any]]:
+        """1 request OCR: chờ quota rồi gọi loader gốc, retry khi bị throttle."""
+        def attempt():
+            if self._limiter is not None:
+                self._limiter.acquire(requests=1, pages=pageCount)
+            if hasattr(source, "seek"):
+                source.seek(0)
+            if self._concurrency is None:
+                return self._loadOriginal(source)
+            with self._concurrency.slot():
+                return self._loadOriginal(source)
+        return callWithBackoff(attempt)
+
+    def _loadOriginal(self, source: Union[str, BytesIO]) -> List[Dict[str, Any]]:
+        """
+        Gọi loader gốc. extract_thinker bọc mọi lỗi Document AI thành ValueError ->
+        lỗi throttle (429 / 503) được raise lại đúng kiểu gốc để AIMD và backoff nhận ra.
+        """
+        try:
+            return self._loader().load(source)
+        except ValueError as e:
+            original = e.__cause__ or e.__context__
+            if original is not None and isRetryable(original):
+                raise original from None
+            raise
+
+    def _loadChunk(self, chunk: Tuple[int, bytes, int]) -> List[Dict[str, Any]]:
+        _, data, pageCount = chunk
+        return self._loadLimited(BytesIO(data), pageCount)
+
+    def load(self, source: Union[str, BytesIO]) -> List[Dict[str, Any]]:
+        return _collect(_inOrder(self.iterRanges(source)))
+
+    def iterRanges(self, source: Union[str, BytesIO], firstPages: int = 0) -> Iterator[PageRange]:
+        """Yield (trang bắt đầu, pages) của từng đoạn ngay khi đoạn đó OCR xong (đoạn nào xong trước yield trước)."""
+        if not _isPdf(source):
+            yield 0, self._loadLimited(source)
+            return
+
+        data = source if isinstance(source, str) else source.getvalue()
+        with _openPdf(data) as doc:
+            pageCount = len(doc)
+        if pageCount <= self.maxPages and not 0 < firstPages < pageCount:
+            yield 0, self._loadLimited(source, pageCount)
+            return
+
+        ranges = _chunkRanges(pageCount, self.maxPages, firstPages)
+        chunks = [(start, part, end - start)
+                  for (start, part), (_, end) in zip(splitPdf(data, self.maxPages, firstPages), ranges)]
+        name = os.path.basename(source) if isinstance(source, str) else "<bytes>"
+        print(f"✂️ DocAI: tách {name} thành {len(chunks)} đoạn x {self.maxPages} trang")
+
+        # Gửi tất cả các đoạn cùng lúc; mỗi đoạn mang theo trang bắt đầu -> người nhận tự ghép đúng thứ tự
+        with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(chunks))) as pool:
+            futures = {pool.submit(self._loadChunk, chunk): chunk[0] for chunk in chunks}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+class DocumentLoaderPyMuPdf(DocumentLoader):
+    """
+    Loader PDF dựa trên PyMuPDF: mở file 1 lần, vừa đọc text vừa kiểm tra text layer.
+    - Có text layer -> trả về pages ({"content": text}) như DocumentLoaderPyPdf.
+    - Không có text layer (PDF scan) -> chuyển cả file sang OCR loader (nếu có).
+    """
+
+    SUPPORTED_FORMATS = ["pdf"]
+
+    def __init__(self, ocrLoaderFactory: Optional[Callable[[], Any]] = None,
+                 processorId: str = "", minChars: int = 30):
+        super().__init__()
+        self._ocrLoaderFactory = ocrLoaderFactory
+        self.processor_id = processorId
+        self.minChars = minChars
+
+    def _hasText(self, text: str) -> bool:
+        return len(text.strip()) >= self.minChars
+
+    def load(self, source: Union[str, BytesIO]) -> List[Dict[str, Any]]:
+        return _collect(_inOrder(self.iterRanges(source)))
+
+    def iterRanges(self, source: Union[str, BytesIO], firstPages: int = 0) -> Iterator[PageRange]:
+        data = source if isinstance(source, str) else source.getvalue()
+        with _openPdf(data) as doc:
+            texts = [page.get_text() for page in doc]
+
+        if self._ocrLoaderFactory is None or any(self._hasText(t) for t in texts):
+            yield 0, [{"content": text} for text in texts]
+            return
+
+        print("🔍 PyMuPDF: không có text layer -> OCR")
+        yield from iterPageRanges(self._ocrLoaderFactory(), source, firstPages)
+
+
+class DocumentLoaderHybridPdf(DocumentLoaderPyMuPdf):
+    """
+    Loader PDF định tuyến từng trang (cùng một lần mở file với PyMuPDF):
+    - Trang có text layer -> lấy text trực tiếp, không tốn OCR.
+    - Trang chỉ có ảnh (scan, chữ ký, phụ lục) -> gom lại thành 1 PDF con, gửi OCR.
+    Kết quả được ghép lại đúng thứ tự trang; mỗi page có thêm key `route` ("text" / "ocr").
+    """
+
+    def iterRanges(self, source: Union[str, BytesIO], firstPages: int = 0) -> Iterator[PageRange]:
+        """Yield các đoạn trang đã sẵn sàng (text ngay lập tức, trang OCR khi đoạn chứa nó xong)."""
+        import fitz
+        pages: List[Dict[str, Any]] = []
+        ocrIndexes: List[int] = []
+
+        data = source if isinstance(source, str) else source.getvalue()
+        with _openPdf(data) as doc:
+            for i, page in enumerate(doc):
+                text = page.get_text()
+                if self._hasText(text) or self._ocrLoaderFactory is None:
+                    pages.append({"content": text, "route": "text"})
+                else:
+                    pages.append({"content": "", "route": "ocr"})
+                    ocrIndexes.append(i)
+
+            if not ocrIndexes:
+                yield 0, pages
+                return
+
+            # Gom các trang ảnh thành 1 PDF con -> 1 lần OCR (loader tự tách nếu quá dài)
+            scanned = fitz.open()
+            for i in ocrIndexes:
+                scanned.insert_pdf(doc, from_page=i, to_page=i)
+            scannedData = scanned.tobytes()
+            scanned.close()
+
+        print(f"🔀 Hybrid: {len(pages) - len(ocrIndexes)} trang text, {len(ocrIndexes)} trang OCR")
+        # Tất cả trang text: yield ngay, không chờ OCR
+        yield from _runs([(i, page) for i, page in enumerate(pages) if page["route"] == "text"])
+        # Số trang scan nằm trong `firstPages` trang đầu -> đoạn OCR đầu tiên
+        firstOcr = sum(1 for i in ocrIndexes if i < firstPages)
+        for start, batch in iterPageRanges(self._ocrLoaderFactory(), BytesIO(scannedData), firstOcr):
+            # Index trong PDF con -> index trang trong tài liệu gốc
+            done = [(ocrIndexes[start + k], {**page, "route": "ocr"})
+                    for k, page in enumerate(batch) if start + k < len(ocrIndexes)]
+            yield from _runs(done)
+
+
+def splitRouting(pages: Any) -> Tuple[Any, List[str]]:
+    """Tách key `route` khỏi pages (không gửi vào prompt). Trả về (pages sạch, routing theo trang)."""
+    if not isinstance(pages, list) or not any(isinstance(p, dict) and "route" in p for p in pages):
+        return pages, []
+    routing = [p.get("route", "?") for p in pages]
+    clean = [{k: v for k, v in p.items() if k != "route"} for p in pages]
+    return clean, routing
+
+
+class PageStream:
+    """
+    Chạy generator (start, pages) (iterPageRanges) trên thread riêng, cho phép pipeline
+    `await` từng mốc: N trang đầu (để phân loại sớm), đủ các trang một policy cần, hoặc toàn bộ tài liệu.
+    Các đoạn có thể về không theo thứ tự trang. Phải được tạo bên trong event loop đang chạy.
+    """
+
+    def __init__(self, ranges: Iterator[PageRange], total: int = 0):
+        self.pages: Dict[int, Dict[str, Any]] = {}
+        self.total = total
+        self.done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        self._task = asyncio.create_task(self._pump(iter(ranges)))
+
+    async def _pump(self, ranges: Iterator[PageRange]) -> None:
+        end = object()
+        try:
+            while True:
+                item = await runDocAi(next, ranges, end)
+                if item is end:
+                    break
+                start, batch = item
+                async with self._changed:
+                    self.pages.update((start + k, page) for k, page in enumerate(batch))
+                    self._changed.notify_all()
+        except BaseException as e:
+            self._error = e
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def _prefix(self) -> List[Dict[str, Any]]:
+        """Các trang liên tiếp từ trang đầu đã có."""
+        prefix = []
+        while len(prefix) in self.pages:
+            prefix.append(self.pages[len(prefix)])
+        return prefix
+
+    async def until(self, decide: Callable[[Dict[int, Dict[str, Any]]], Any]) -> Any:
+        """
+        Đợi tới khi `decide(pages đã có theo index)` trả về khác None (hoặc hết tài liệu),
+        trả về giá trị đó (None nếu tới cuối vẫn chưa quyết định được).
+        """
+        async with self._changed:
+            decision = None
+
+            def ready() -> bool:
+                nonlocal decision
+                decision = decide(self.pages)
+                return decision is not None or self.done
+            await self._changed.wait_for(ready)
+        if self._error is not None:
+            raise self._error
+        return decision
+
+    async def wait(self, count: int) -> List[Dict[str, Any]]:
+        """Đợi có đủ `count` trang đầu liên tiếp (hoặc hết tài liệu), trả về các trang đầu liên tiếp đã có."""
+        await self.until(lambda pages: True if len(self._prefix()) >= count else None)
+        return self._prefix()
+
+    async def all(self) -> List[Dict[str, Any]]:
+        """Đợi load xong toàn bộ tài liệu, trả về pages theo đúng thứ tự trang."""
+        await self._task
+        if self._error is not None:
+            raise self._error
+        return [self.pages[i] for i in sorted(self.pages)]
@@ -0,0 +1,160 @@
+"""
+Gom nhiều tài liệu ngắn cùng loại (CCCD, thẻ SV, hóa đơn...) vào 1 request LLM.
+
+Mỗi tài liệu chỉ vài trăm token nhưng mỗi request lại lặp lại system prompt, schema
+và EXTRA_CONTENTS. MicroBatcher giữ các job trích xuất cùng contract trong một
+cửa sổ ngắn (`windowSec`) rồi gửi 1 request trả về danh sách kết quả, mỗi phần tử
+mang `document_id` để map ngược về đúng tài liệu. Với quota tính theo RPM, số tài
+liệu / phút tăng gần bằng kích thước batch.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, Field, create_model
+
+from core.concurrency import runLlm
+from core.oneshot import ONE_SHOT_DOCS, isShortDocument
+from core.pages import pagesText
+
+# Contract được gom batch: nhóm tài liệu ngắn (giấy tờ tùy thân, phương tiện, hóa đơn)
+BATCHABLE_CONTRACTS = {
+    item[1] for item in ONE_SHOT_DOCS.values() if isinstance(item, (tuple, list))
+}
+
+_batchModels: Dict[type, Type[BaseModel]] = {}
+
+
+def buildBatchModel(contract: type) -> Type[BaseModel]:
+    """Response model: danh sách {document_id, data: contract}."""
+    if contract not in _batchModels:
+        item = create_model(
+            f"{contract.__name__}BatchItem",
+            document_id=(int, Field(..., description="id của tài liệu trong thẻ <document id=...>")),
+            data=(contract, ...),
+        )
+        _batchModels[contract] = create_model(
+            f"{contract.__name__}Batch",
+            items=(List[item], Field(..., description="Đúng 1 phần tử cho mỗi tài liệu")),
+        )
+    return _batchModels[contract]
+
+
+def buildBatchMessages(contract: type, documents: List[Any], extra: Optional[str]) -> List[Dict[str, str]]:
+    body = "\n".join(
+        f'<document id="{i}">\n{pagesText(pages)}\n</document>' for i, pages in enumerate(documents)
+    )
+    # Phần tĩnh (hướng dẫn, EXTRA_CONTENTS) đứng trước các tài liệu -> dùng được prefix cache
+    return [
+        {
+            "role": "system",
+            "content": "You are a server API that receives document information "
+            "and returns specific fields in JSON format.\n",
+        },
+        {
+            "role": "user",
+            "content": (
+                "##Instructions\n"
+                f"Các tài liệu bên dưới độc lập với nhau, cùng loại {contract.__name__}. "
+                "Trích xuất riêng từng tài liệu, không lấy thông tin của tài liệu này điền cho tài liệu khác. "
+                "Trả về `items` gồm đúng 1 phần tử cho mỗi tài liệu, `document_id` là id trong thẻ <document>.\n"
+                + (f"##Hướng dẫn\n{extra.strip()}\n" if extra else "")
+            ),
+        },
+        {"role": "user", "content": f"##Content ({len(documents)} tài liệu)\n{body}\n"},
+    ]
+
+
+class _Job:
+    __slots__ = ("pages", "future")
+
+    def __init__(self, pages: Any, future: asyncio.Future):
+        self.pages = pages
+        self.future = future
+
+
+class MicroBatcher:
+    """
+    Gom job theo contract. Batch được gửi khi đủ `maxItems` tài liệu / `maxChars` ký tự,
+    hoặc khi hết `windowSec` kể từ job đầu tiên. `submit` trả về (data, số tài liệu trong batch);
+    tài liệu bị thiếu trong response thì nhận None -> pipeline trích xuất riêng như bình thường.
+    """
+
+    def __init__(self, llm: Any, windowSec: float = 0.2, maxItems: int = 8, maxChars: int = 24000):
+        self.llm = llm
+        self.windowSec = windowSec
+        self.maxItems = maxItems
+        self.maxChars = maxChars
+        self.stats = {"requests": 0, "documents": 0, "missing": 0}
+        self._pending: Dict[Tuple[int, type], List[_Job]] = {}
+        # EXTRA_CONTENTS theo đúng nhóm (event loop, contract) đang chờ gửi
+        self._extra: Dict[Tuple[int, type], Optional[str]] = {}
+        # Event loop chỉ giữ weak reference tới task -> giữ task đang gửi cho tới khi xong
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def accepts(contract: Optional[type], pages: Any, maxPages: int, maxChars: int) -> bool:
+        return contract in BATCHABLE_CONTRACTS and isShortDocument(pages, maxPages, maxChars)
+
+    async def submit(self, contract: type, pages: Any, extra: Optional[str]) -> Tuple[Optional[Dict], int]:
+        loop = asyncio.get_running_loop()
+        key = (id(loop), contract)
+        job = _Job(pages, loop.create_future())
+        self._extra[key] = extra
+
+        group = self._pending.setdefault(key, [])
+        group.append(job)
+        if len(group) == 1:
+            loop.call_later(self.windowSec, self._flush, key, group)
+        if len(group) >= self.maxItems or sum(len(pagesText(j.pages)) for j in group) >= self.maxChars:
+            self._flush(key, group)
+        return await job.future
+
+    def _flush(self, key: Tuple[int, type], group: List[_Job]) -> None:
+        # Timer của batch đã gửi (do đủ kích thước) -> bỏ qua
+        if self._pending.get(key) is not group:
+            return
+        del self._pending[key]
+        task = asyncio.ensure_future(self._send(key[1], group, self._extra.pop(key, None)))
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._finished(done, group))
+
+    def _finished(self, task: asyncio.Task, group: List[_Job]) -> None:
+        """Bỏ task khỏi danh sách đang chạy; task lỗi -> chuyển lỗi cho các job chưa có kết quả."""
+        self._tasks.discard(task)
+        error = None if task.cancelled() else task.exception()
+        for job in group:
+            if job.future.done():
+                continue
+            if error is None:
+                job.future.cancel()
+            else:
+                job.future.set_exception(error)
+
+    async def _send(self, contract: type, group: List[_Job], extra: Optional[str]) -> None:
+        start = time.time()
+        messages = buildBatchMessages(contract, [job.pages for job in group], extra)
+        try:
+            response = await runLlm(self.llm.request, messages, buildBatchModel(contract))
+        except Exception as e:
+            for job in group:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+
+        results: Dict[int, Dict] = {}
+        for item in getattr(response, "items", None) or []:
+            data = getattr(item, "data", None)
+            docId = getattr(item, "document_id", None)
+            if isinstance(docId, int) and 0 <= docId < len(group) and data is not None and docId not in results:
+                results[docId] = data.model_dump() if hasattr(data, "model_dump") else data
+
+        missing = len(group) - len(results)
+        self.stats["requests"] += 1
+        self.stats["documents"] += len(results)
+        self.stats["missing"] += missing
+        print(f"📦 Batch {contract.__name__}: {len(results)}/{len(group)} tài liệu trong 1 request "
+              f"({time.time() - start:.1f}s)")
+        for i, job in enumerate(group):
+            if not job.future.done():
+                job.future.set_result((results.get(i), len(group)))
@@ -0,0 +1,120 @@
+"""
+Đọc vùng MRZ (machine-readable zone, ICAO 9303 TD3) của hộ chiếu từ text OCR.
+
+    P<VNMNGUYEN<<VAN<AN<<<<<<<<<<<<<<<<<<<<<<<<<
+    C1234567<0VNM9001011M3001019<<<<<<<<<<<<<<<6
+
+Dòng 2 có check digit cho số hộ chiếu, ngày sinh, ngày hết hạn và 1 check digit tổng.
+Trường nào qua check digit thì điền thẳng vào VietnamPassport; họ tên (không có check digit
+riêng) chỉ điền khi check digit tổng đúng. Ngày cấp không có trong MRZ: đọc từ nhãn
+"Ngày cấp / Date of issue" nếu có, không thì LLM.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.pages import pagesText
+from core.validation import parseDate
+
+MRZ_LENGTH = 44
+_LINE1 = re.compile(r"^P[A-Z<][A-Z<]{3}[A-Z<]+$")
+_LINE2 = re.compile(r"^[A-Z0-9<]{9}[0-9][A-Z<]{3}[0-9]{6}[0-9][MF<][0-9]{6}[0-9][A-Z0-9<]{14}[0-9<][0-9]$")
+# Lỗi OCR thường gặp ở vị trí chỉ có chữ số
+_DIGIT_FIXES = str.maketrans({"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1", "Z": "2", "S": "5", "B": "8", "G": "6"})
+_DIGIT_SLICES = ((9, 10), (13, 20), (21, 28), (42, 44))
+_NATIONALITIES = {"VNM": "VIỆT NAM"}
+# Ngày cấp không có trong MRZ, đọc từ nhãn in trên trang ("Ngày cấp / Date of issue: 01/01/2020")
+_NGAY_CAP = re.compile(r"(?:Ngày\s+cấp|Date\s+of\s+issue)[^\d\n]{0,40}(\d{1,2}\s*/\s*\d{1,2}\s*/\s*\d{4})", re.IGNORECASE)
+
+
+def checkDigit(value: str) -> int:
+    """Check digit ICAO 9303: trọng số 7, 3, 1; chữ A-Z = 10-35, '<' = 0."""
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            n = int(char)
+        elif "A" <= char <= "Z":
+            n = ord(char) - 55
+        else:
+            n = 0
+        total += n * (7, 3, 1)[i % 3]
+    return total % 10
+
+
+def _valid(field: str, digit: str) -> bool:
+    return digit.isdigit() and checkDigit(field) == int(digit)
+
+
+def _fixDigits(line: str) -> str:
+    chars = list(line)
+    for start, end in _DIGIT_SLICES:
+        chars[start:end] = line[start:end].translate(_DIGIT_FIXES)
+    return "".join(chars)
+
+
+def _candidates(text: str) -> List[str]:
+    """Các dòng text đã bỏ khoảng trắng (OCR hay chèn khoảng trắng giữa các ký tự MRZ), '«' -> '<'."""
+    return [re.sub(r"\s+", "", line).upper().replace("«", "<") for line in text.splitlines()]
+
+
+def findMrz(text: str) -> Optional[Tuple[str, str]]:
+    """(dòng 1, dòng 2) của MRZ TD3, dòng 1 được đệm '<' đủ 44 ký tự."""
+    lines = [line for line in _candidates(text) if line]
+    for first, second in zip(lines, lines[1:]):
+        if not _LINE1.match(first) or len(second) != MRZ_LENGTH:
+            continue
+        second = _fixDigits(second) if not _LINE2.match(second) else second
+        if _LINE2.match(second):
+            return first[:MRZ_LENGTH].ljust(MRZ_LENGTH, "<"), second
+    return None
+
+
+def _date(value: str, future: bool) -> Optional[str]:
+    """YYMMDD -> DD/MM/YYYY. Ngày sinh: năm > năm hiện tại thì là 19xx; ngày hết hạn luôn 20xx."""
+    try:
+        yy, mm, dd = int(value[:2]), int(value[2:4]), int(value[4:6])
+        century = 2000 if future or yy <= datetime.now().year % 100 else 1900
+        return datetime(century + yy, mm, dd).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def _names(line1: str) -> Tuple[Optional[str], Optional[str]]:
+    surname, _, given = line1[5:].partition("<<")
+    clean = lambda part: " ".join(w for w in part.split("<") if w) or None
+    return clean(surname), clean(given)
+
+
+def decodeMrz(line1: str, line2: str) -> Dict[str, str]:
+    """Các trường VietnamPassport qua được check digit."""
+    data: Dict[str, Optional[str]] = {}
+    number, birth, expiry = line2[0:9], line2[13:19], line2[21:27]
+    if _valid(number, line2[9]):
+        data["so_ho_chieu"] = number.replace("<", "")
+    if _valid(birth, line2[19]):
+        data["ngay_sinh"] = _date(birth, future=False)
+    if _valid(expiry, line2[27]):
+        data["ngay_het_han"] = _date(expiry, future=True)
+
+    # Check digit tổng đúng -> MRZ đọc đúng, tin cả các phần không có check digit riêng
+    if _valid(line2[0:10] + line2[13:20] + line2[21:43], line2[43]):
+        data["loai"] = line1[0:2].replace("<", "")
+        data["ma_so"] = line1[2:5].replace("<", "")
+        data["ho"], data["chu_dem_va_ten"] = _names(line1)
+        nationality = line2[10:13].replace("<", "")
+        data["quoc_tich"] = _NATIONALITIES.get(nationality, nationality)
+        data["gioi_tinh"] = line2[20] if line2[20] in "MF" else None
+    return {name: value for name, value in data.items() if value}
+
+
+def parsePassportMrz(pages: Any) -> Dict[str, str]:
+    """Tìm + giải mã MRZ trong text OCR; {} nếu không có MRZ hợp lệ."""
+    text = pagesText(pages)
+    found = findMrz(text)
+    if not found:
+        return {}
+    data = decodeMrz(*found)
+    issued = _NGAY_CAP.search(text)
+    if issued and parseDate(issued.group(1)):
+        data["ngay_cap"] = parseDate(issued.group(1)).strftime("%d/%m/%Y")
+    return data
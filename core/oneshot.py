@@ -0,0 +1,104 @@
+"""
+Phân loại + trích xuất trong 1 lần gọi LLM cho tài liệu ngắn (CCCD, GPLX, hóa đơn...).
+
+Response model được dựng từ các contract trong `contracts/__init__.py`:
+`doc_type` + `confidence` + mỗi contract tài liệu ngắn là 1 trường tùy chọn.
+LLM chọn loại và điền đúng trường của loại đó. Nếu loại được chọn không có
+trong nhóm tài liệu ngắn (ví dụ văn bản hành chính 1 trang) thì pipeline dùng
+kết quả như bước phân loại và trích xuất như bình thường.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, create_model
+from extract_thinker import Classification
+from extract_thinker.models.classification_response import ClassificationResponse
+
+from contracts import IDENTITY_DOCS, VEHICLE_DOCS, FINANCE_DOCS, EXTRA_CONTENTS
+from core.classifications import getClassificationsList
+from core.pages import pagesText
+from core.projection import projectContract
+
+# Nhóm tài liệu ngắn được trích xuất luôn trong lần gọi phân loại
+ONE_SHOT_DOCS = {**IDENTITY_DOCS, **VEHICLE_DOCS, **FINANCE_DOCS}
+
+
+def _oneShotContracts() -> List[Tuple[str, type]]:
+    return [item for item in ONE_SHOT_DOCS.values() if isinstance(item, (tuple, list))]
+
+
+@lru_cache(maxsize=64)
+def buildOneShotModel(fields: Optional[Tuple[str, ...]] = None) -> Type[BaseModel]:
+    """
+    Response model: doc_type, confidence và 1 trường tùy chọn cho mỗi contract tài liệu ngắn.
+    `fields`: mỗi contract chỉ gồm các trường này (contract rút gọn); contract không có trường nào
+    được yêu cầu thì bỏ hẳn khỏi schema. Cache theo bộ trường.
+    """
+    definitions: Dict[str, Any] = {
+        "doc_type": (str, Field(..., description="Tên loại tài liệu, đúng nguyên văn một trong các loại được liệt kê")),
+        "confidence": (int, Field(..., ge=1, le=10, description="Độ chắc chắn của doc_type (1-10)")),
+    }
+    for name, contract in _oneShotContracts():
+        target = projectContract(contract, fields) if fields else contract
+        if target is None:
+            continue
+        definitions[contract.__name__] = (
+            Optional[target], Field(None, description=f"Chỉ điền nếu doc_type là '{name}'")
+        )
+    return create_model("OneShotResponse", **definitions)
+
+
+def isShortDocument(pages: Any, maxPages: int, maxChars: int) -> bool:
+    count = len(pages) if isinstance(pages, list) else 1
+    return count <= maxPages and len(pagesText(pages)) <= maxChars
+
+
+def buildOneShotMessages(pages: Any) -> List[Dict[str, str]]:
+    types = "\n".join(f"- {c.name}: {c.description}" for c in getClassificationsList())
+    guides = "\n\n".join(
+        f"### {contract.__name__} ({name})\n{EXTRA_CONTENTS[contract].strip()}"
+        for name, contract in _oneShotContracts() if EXTRA_CONTENTS.get(contract)
+    )
+    # Phần tĩnh (loại tài liệu, hướng dẫn) đứng trước nội dung -> dùng được prefix cache
+    return [
+        {
+            "role": "system",
+            "content": "You are a server API that receives document information "
+            "and returns specific fields in JSON format.\n",
+        },
+        {
+            "role": "user",
+            "content": (
+                f"##Document types\n{types}\n"
+                "##Instructions\n"
+                "1. Chọn doc_type là đúng một trong các loại trên (giữ nguyên tên), confidence 1-10.\n"
+                "2. Nếu doc_type có trường dữ liệu tương ứng bên dưới thì điền trường đó, "
+                "các trường còn lại để null.\n"
+                f"##Hướng dẫn theo loại\n{guides}\n"
+            ),
+        },
+        {"role": "user", "content": f"##Content\n{pagesText(pages)}\n"},
+    ]
+
+
+def parseOneShot(response: Any) -> Tuple[Optional[ClassificationResponse], Optional[type], Optional[Dict]]:
+    """
+    Trả về (classification response, contract, data).
+    - Loại không hợp lệ -> (None, None, None): pipeline quay về đường thường.
+    - Loại ngoài nhóm tài liệu ngắn / thiếu dữ liệu -> data = None (cần extract riêng).
+    """
+    name = str(getattr(response, "doc_type", "") or "").strip()
+    byName: Dict[str, Classification] = {c.name.lower(): c for c in getClassificationsList()}
+    classification = byName.get(name.lower())
+    if classification is None:
+        return None, None, None
+
+    result = ClassificationResponse(
+        name=classification.name,
+        confidence=getattr(response, "confidence", None),
+        classification=classification,
+    )
+    contract = classification.contract
+    extracted = getattr(response, contract.__name__, None) if contract else None
+    data = extracted.model_dump() if extracted is not None else None
+    return result, contract, data
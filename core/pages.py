@@ -0,0 +1,123 @@
+"""
+Chọn trang gửi vào LLM cho tài liệu dài (page pruning).
+
+Văn bản hành chính chỉ cần phần đầu (số hiệu, ngày ban hành, trích yếu) và
+phần cuối (khối chữ ký: TM. CHÍNH PHỦ, KT. BỘ TRƯỞNG, Nơi nhận...). Với tài liệu
+dài hơn `eagerPageThreshold` trang, pipeline chỉ gửi các trang được chọn theo
+policy của contract thay vì toàn bộ văn bản.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from contracts import VietnamCCCD, VietnamPassport, VietnamStudentCard, VietnamDriverLicense, Invoice
+from contracts.government import (
+    Luat, PhapLenh, NghiDinh, ThongTu, Lenh,
+    NghiQuyetChinhPhu, NghiQuyetPhienHopChinhPhu, VanBanChiDaoDieuHanh, VanBanHopNhat,
+)
+
+# Khối chữ ký / phần cuối văn bản hành chính
+SIGNATURE_PATTERNS: Tuple[str, ...] = (
+    r"^\s*(?:TM|KT|Q|TL|TUQ)\.\s*[A-ZĐ]",
+    r"^\s*Nơi nhận\s*:",
+    r"XÁC THỰC VĂN BẢN HỢP NHẤT",
+)
+
+
+@dataclass
+class PagePolicy:
+    """
+    head/tail: số trang đầu/cuối luôn giữ (head = 0 -> giữ tất cả).
+    patterns: giữ thêm các trang khớp regex (tối đa `maxPatternPages` trang).
+    """
+    head: int = 0
+    tail: int = 0
+    patterns: Tuple[str, ...] = ()
+    maxPatternPages: int = 2
+
+    def select(self, texts: List[str]) -> List[int]:
+        """Trả về index các trang được giữ (tăng dần)."""
+        return self.selectFrom(dict(enumerate(texts)), len(texts))
+
+    def selectFrom(self, texts: Dict[int, str], count: int) -> Optional[List[int]]:
+        """
+        Như `select` khi mới có một phần trang (index -> text) của tài liệu `count` trang.
+        Trả về None nếu kết quả còn phụ thuộc các trang chưa có.
+        """
+        if self.head <= 0 or count <= self.head + self.tail:
+            return list(range(count))
+
+        keep = set(range(self.head)) | set(range(count - self.tail, count))
+        matched = 0
+        regexes = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in self.patterns]
+        # Duyệt từ cuối lên: khối chữ ký thường nằm ở các trang cuối
+        for i in reversed(range(self.head, count - self.tail)):
+            if matched >= self.maxPatternPages:
+                break
+            if i not in texts:
+                return None
+            if any(r.search(texts[i]) for r in regexes):
+                keep.add(i)
+                matched += 1
+        return sorted(keep)
+
+
+_GOV_POLICY = PagePolicy(head=2, tail=1, patterns=SIGNATURE_PATTERNS)
+
+# Policy theo contract; contract không có trong map -> gửi toàn bộ trang
+PAGE_POLICIES: Dict[type, PagePolicy] = {
+    Luat: _GOV_POLICY,
+    PhapLenh: _GOV_POLICY,
+    NghiDinh: _GOV_POLICY,
+    ThongTu: _GOV_POLICY,
+    Lenh: _GOV_POLICY,
+    NghiQuyetChinhPhu: _GOV_POLICY,
+    NghiQuyetPhienHopChinhPhu: _GOV_POLICY,
+    VanBanChiDaoDieuHanh: _GOV_POLICY,
+    VanBanHopNhat: _GOV_POLICY,
+    # Giấy tờ tùy thân chỉ 1-2 mặt; hóa đơn cần đủ các dòng hàng
+    VietnamCCCD: PagePolicy(),
+    VietnamPassport: PagePolicy(),
+    VietnamStudentCard: PagePolicy(),
+    VietnamDriverLicense: PagePolicy(),
+    Invoice: PagePolicy(),
+}
+
+
+def pageText(page: Any) -> str:
+    """Text của 1 trang (chỉ lấy `content`, bỏ các key khác của loader)."""
+    if isinstance(page, dict):
+        content = page.get("content")
+        return content if isinstance(content, str) else ""
+    return str(page or "")
+
+
+def pageTexts(pages: Any) -> List[str]:
+    """Text từng trang; `pages` có thể là list trang, 1 trang (dict) hoặc chuỗi."""
+    if isinstance(pages, list):
+        return [pageText(p) for p in pages]
+    return [pageText(pages)]
+
+
+def pagesText(pages: Any, separator: str = "\n\n") -> str:
+    """Ghép text các trang (bỏ trang rỗng)."""
+    return separator.join(text for text in pageTexts(pages) if text)
+
+
+def selectPages(pages: Any, policy: Optional[PagePolicy], threshold: int) -> Tuple[Any, List[int]]:
+    """
+    Áp dụng policy nếu tài liệu dài hơn `threshold` trang.
+    Trả về (pages được chọn, index các trang được chọn); không cắt -> (pages, []).
+    """
+    if policy is None or not isinstance(pages, list) or len(pages) <= threshold:
+        return pages, []
+    indexes = policy.select(pageTexts(pages))
+    if len(indexes) == len(pages):
+        return pages, []
+    return [pages[i] for i in indexes], indexes
+
+
+def classifyPages(pages: Any, count: int, threshold: int) -> Any:
+    """Các trang đầu dùng để phân loại (loại văn bản luôn xác định được từ phần đầu)."""
+    selected, _ = selectPages(pages, PagePolicy(head=count), threshold)
+    return selected
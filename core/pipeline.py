@@ -1,14 +1,38 @@
 import os
-import nest_asyncio
-from typing import Dict, Optional, Any
+import json
+import time
+import asyncio
+from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any, List, Iterable
 
 from extract_thinker import (
-    Extractor, CompletionStrategy, LLM
+    Extractor, CompletionStrategy
 )
 from extract_thinker.document_loader.document_loader_data import DocumentLoaderData
+from extract_thinker.models.classification_response import ClassificationResponse
 
 from core.config import config
-from core.classifications import getClassificationsList, CLASSIFICATION_TREE
+from core.llm import PipelineLLM
+from core.concurrency import concurrencyMetrics, runLlm, runDocAi
+from core.promptcache import requestLog, summarize
+from core.classifications import (
+    getClassificationsList, getCategoryClassifications, getChildClassifications, CLASSIFICATION_TREE
+)
+from core.cache import ResultCache, getResultCache, getPageCache, fileHash, textHash
+from core.loaders import splitRouting, iterPageRanges, pdfPageCount, PageStream
+from core.preclassify import preClassify, rankCandidates
+from core.validation import validateData
+from core.oneshot import buildOneShotModel, buildOneShotMessages, parseOneShot, isShortDocument
+from core.pages import PAGE_POLICIES, selectPages, classifyPages, pageText, pagesText
+from core.microbatch import MicroBatcher
+from core.projection import normalizeFields, projectContract, projectData
+from core.headerparser import parseHeader
+from core.mrz import parsePassportMrz
+from core.invoiceparser import parseInvoice
+from core.repair import fieldSnippets, buildRepairMessages, mergeRepair
+from core.chunking import WINDOW_NOTE, listFields, splitWindows, mergeWindows
+from contracts import VietnamPassport, Invoice
 
 def findCategory(docTypeName: str) -> Optional[str]:
     """Tìm category (nhóm) dựa trên doc_type_name."""
@@ -25,7 +49,8 @@ def makeSuccessResponse(
     data: Any = None, 
     confidence: Optional[float] = None, 
     loader: str = "?", 
-    vision: bool = False
+    vision: bool = False,
+    debug: Optional[Dict] = None
 ) -> Dict:
     """Tạo response thành công chuẩn hóa."""
     return {"documents": [{
@@ -33,7 +58,7 @@ def makeSuccessResponse(
         "docType": docType, 
         "data": data,
         "confidence": confidence,
-        "_debug": {"loader": loader, "vision": vision}
+        "_debug": {"loader": loader, "vision": vision, **(debug or {})}
     }], "error": None}
 
 def makeErrorResponse(msg: str) -> Dict:
@@ -41,7 +66,44 @@ def makeErrorResponse(msg: str) -> Dict:
     return {"documents": [], "error": msg}
 
 
-nest_asyncio.apply()
+
+def schemaFingerprint() -> tuple:
+    """
+    Hash (schema, extra_content) của toàn bộ contract đang đăng ký.
+    Đổi contract / mô tả phân loại / extra_content -> cache cũ tự mất hiệu lực.
+    """
+    from contracts import EXTRA_CONTENTS
+    classifications = getClassificationsList()
+    schemaHash = textHash(*(
+        f"{c.name}|{c.description}|" + (
+            json.dumps(c.contract.model_json_schema(), sort_keys=True) if c.contract else ""
+        )
+        for c in classifications
+    ))
+    extraHash = textHash(*(
+        f"{c.name}|{EXTRA_CONTENTS.get(c.contract, '')}" for c in classifications
+    ))
+    return schemaHash, extraHash
+
+
+# Cấu hình chỉ ảnh hưởng tốc độ / chi phí, không đổi kết quả -> không đưa vào key cache
+_RUNTIME_SETTINGS = {
+    "microBatchWindowSec", "microBatchMaxItems", "promptCache", "promptCacheMinTokens", "speculativeTokenBudget",
+}
+
+
+def configFingerprint(strategy: CompletionStrategy, **overrides) -> str:
+    """
+    Hash cấu hình pipeline ảnh hưởng kết quả (luật phân loại, cascade, one-shot, cắt trang,
+    parser bằng luật, chia cửa sổ, sửa trường lỗi, completion strategy...).
+    `overrides`: giá trị ghi đè theo từng DocumentProcessor (vd. classificationMode).
+    Đổi cấu hình -> cache kết quả cũ tự mất hiệu lực.
+    """
+    settings = {
+        name: value for name, value in asdict(config.processing).items() if name not in _RUNTIME_SETTINGS
+    }
+    settings.update({name: value for name, value in overrides.items() if value is not None})
+    return textHash(json.dumps(settings, sort_keys=True, default=str), str(strategy))
 
 
 class DocumentProcessor:
@@ -50,72 +112,584 @@ class DocumentProcessor:
     """
     
     def __init__(self, model: Optional[str] = None, 
-                 strategy: CompletionStrategy = CompletionStrategy.CONCATENATE):
+                 strategy: CompletionStrategy = CompletionStrategy.CONCATENATE,
+                 cache: Optional[ResultCache] = None, useCache: bool = True,
+                 classificationMode: Optional[str] = None):
         config.validate()
-        self._model = model or config.processing.model
         self._strategy = strategy
-        # Tạo LLM một lần duy nhất, dùng lại cho mọi request
-        self._llm = LLM(self._model)
+        # "flat" / "tree"; None -> theo config.processing.classificationMode
+        self._classificationMode = classificationMode
+        # Cascade: model rẻ/nhanh trước, model mạnh sau (model chỉ định rõ -> không cascade)
+        models = [model] if model else (config.processing.cascadeModels or [config.processing.model])
+        self._model = "|".join(models)
+        # Tạo LLM một lần duy nhất cho mỗi tầng, dùng lại cho mọi request
+        # (rate limiter dùng chung cho cả process: batch + các phiên Streamlit)
+        self._tiers = [PipelineLLM(m) for m in models]
+        self._llm = self._tiers[-1]
+        # Gom các tài liệu ngắn cùng loại vào 1 request (tầng đầu tiên), dùng chung cho run_many / batch
+        settings = config.processing
+        self._batcher = MicroBatcher(
+            self._tiers[0], settings.microBatchWindowSec, settings.microBatchMaxItems
+        ) if settings.microBatch else None
+        # Cache kết quả (mặc định dùng chung cả process), None nếu tắt
+        self._cache = None
+        if useCache:
+            self._cache = cache if cache is not None else (
+                getResultCache() if config.cache.enabled else None
+            )
+        # Cache pages OCR - độc lập với cache kết quả
+        self._pageCache = getPageCache() if config.cache.pagesEnabled else None
+        self._schemaHash, self._extraHash = schemaFingerprint()
+        self._configHash = configFingerprint(strategy, classificationMode=classificationMode)
+    
+    
+    def run(self, filePath: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Entry point đồng bộ - wrapper mỏng quanh `arun`.
+        `fields`: chỉ trích xuất các trường này (ví dụ ["so_cccd", "ho_ten"]), None = toàn bộ contract.
+        """
+        return _runSync(self.arun(filePath, fields=fields))
     
+    def run_many(self, filePaths: Iterable[str], concurrency: int = 4,
+                 fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Xử lý nhiều file đồng thời, trả về kết quả theo đúng thứ tự đầu vào."""
+        return _runSync(self.arun_many(filePaths, concurrency=concurrency, fields=fields))
     
-    def run(self, filePath: str) -> Dict:
-        """Entry point chính - xử lý file trực tiếp, tắt vision."""
+    async def arun(self, filePath: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Entry point async - xử lý file trực tiếp, tắt vision."""
         if not os.path.exists(filePath):
             return makeErrorResponse("File không tồn tại")
+        fields = normalizeFields(fields)
         
+        if self._cache is None:
+            return await self._arunUncached(filePath, fields)
+        
+        # 0. Tra cache theo hash nội dung file + model + schema + extra_content (+ bộ trường) + cấu hình pipeline
+        schemaHash = textHash(self._schemaHash, *fields) if fields else self._schemaHash
+        cacheKey = ResultCache.makeKey(
+            await asyncio.to_thread(fileHash, filePath),
+            self._model, schemaHash, self._extraHash, self._configHash
+        )
+        cached, tier = await asyncio.to_thread(self._cache.get, cacheKey)
+        if cached is not None:
+            print(f"⚡ Cache hit ({tier}): {os.path.basename(filePath)}")
+            self._annotateCache(cached, hit=True, tier=tier)
+            return self._annotateConcurrency(cached)
+        
+        response = await self._arunUncached(filePath, fields)
+        if not response.get("error"):
+            await asyncio.to_thread(self._cache.set, cacheKey, response)
+        self._annotateCache(response, hit=False, tier=None)
+        return response
+    
+    def _annotateCache(self, response: Dict, hit: bool, tier: Optional[str]) -> None:
+        """Ghi thông tin cache (hit/miss + bộ đếm) vào `_debug` của từng document."""
+        info = {"hit": hit, "tier": tier, **self._cache.stats()}
+        for doc in response.get("documents", []):
+            doc.setdefault("_debug", {})["cache"] = info
+    
+    def _annotateConcurrency(self, response: Dict) -> Dict:
+        """Ghi giới hạn đồng thời hiện tại (AIMD) của LLM / Document AI vào `_debug`."""
+        metrics = concurrencyMetrics()
+        for doc in response.get("documents", []):
+            doc.setdefault("_debug", {})["concurrency"] = metrics
+        return response
+    
+    def _annotatePromptCache(self, response: Dict, log: List[Dict]) -> Dict:
+        """Ghi token input cached / uncached của từng request LLM vào `_debug.prompt_cache`."""
+        if log:
+            summary = summarize(log)
+            for doc in response.get("documents", []):
+                doc.setdefault("_debug", {})["prompt_cache"] = summary
+        return response
+    
+    async def _arunUncached(self, filePath: str, fields: Optional[tuple] = None) -> Dict:
+        """Chạy đầy đủ pipeline: load -> classify -> extract."""
+        log: List[Dict] = []
+        token = requestLog.set(log)
         try:
-            # 1. Load document (1 lần duy nhất)
+            # 1. Load document (1 lần duy nhất) - I/O chạy trên thread riêng
             loader, _, loaderName = config.createLoader(filePath)
-            pages = loader.load(filePath)
-            
-            print(f"🔄 Xử lý: {loaderName}, {len(pages) if isinstance(pages, list) else 1} trang (Pre-loaded)")
-            
-            # 2. Xử lý với content đã load
-            return self._process(pages, filePath, loaderName)
+            total = await self._shouldStream(loader, filePath)
+            if total:
+                firstPages = config.processing.classifyPages
+                if self._pageCache is not None:
+                    ranges = self._pageCache.iterLoad(loader, loaderName, filePath, firstPages)
+                else:
+                    ranges = iterPageRanges(loader, filePath, firstPages)
+                response = await self._processStream(ranges, total, filePath, loaderName, fields)
+            else:
+                if self._pageCache is not None:
+                    pages = await runDocAi(self._pageCache.load, loader, loaderName, filePath)
+                else:
+                    pages = await runDocAi(loader.load, filePath)
+                
+                print(f"🔄 Xử lý: {loaderName}, {len(pages) if isinstance(pages, list) else 1} trang (Pre-loaded)")
+                
+                # 2. Xử lý với content đã load
+                response = await self._process(pages, filePath, loaderName, fields=fields)
+            return self._annotatePromptCache(self._annotateConcurrency(response), log)
                 
         except Exception as e:
             import traceback
             traceback.print_exc()
             return makeErrorResponse(str(e)[:200])
+        finally:
+            requestLog.reset(token)
+    
+    async def arun_many(self, filePaths: Iterable[str], concurrency: int = 4,
+                        fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Xử lý nhiều file trên cùng một event loop.
+        Loader I/O, classify và extract của các file khác nhau được chạy xen kẽ,
+        giới hạn tối đa `concurrency` file cùng lúc.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def runOne(path: str) -> Dict:
+            async with semaphore:
+                return await self.arun(path, fields=fields)
+        
+        return await asyncio.gather(*(runOne(p) for p in filePaths))
+    
+    def batchStats(self) -> Dict[str, int]:
+        """Số request / tài liệu / tài liệu phải trích xuất riêng của micro-batch ({} nếu tắt MICRO_BATCH)."""
+        return dict(self._batcher.stats) if self._batcher is not None else {}
+    
+    async def _shouldStream(self, loader, filePath: str) -> int:
+        """
+        Chỉ stream PDF dài (sẽ phân loại trên các trang đầu) với loader hỗ trợ `iterRanges`.
+        Trả về số trang của PDF, 0 nếu không stream.
+        """
+        processing = config.processing
+        if not (processing.streamPages and processing.pagePruning and hasattr(loader, "iterRanges")):
+            return 0
+        if os.path.splitext(filePath)[1].lower() != ".pdf":
+            return 0
+        count = await asyncio.to_thread(pdfPageCount, filePath)
+        return count if count > processing.eagerPageThreshold else 0
+    
+    async def _processStream(self, ranges, total: int, filePath: str, loaderName: str,
+                             fields: Optional[tuple] = None) -> Dict:
+        """
+        Pipeline OCR -> LLM: phân loại ngay khi có các trang đầu trong lúc các trang còn lại
+        vẫn đang OCR. Sau khi phân loại, trích xuất bắt đầu ngay khi đã có đủ các trang mà
+        PAGE_POLICIES của contract chọn (trang đầu/cuối, khối chữ ký) - không chờ cả tài liệu.
+        Các trang OCR về không theo thứ tự (`total`: số trang của PDF).
+        """
+        start = time.time()
+        stream = PageStream(ranges, total)
+        
+        count = config.processing.classifyPages
+        head = await stream.wait(count)
+        firstMs = round((time.time() - start) * 1000)
+        headPages, _ = splitRouting(head[:count])
+        
+        early = None
+        try:
+            classified = await self._classify(headPages)
+            classifiedMs = round((time.time() - start) * 1000)
+            early = await self._startEarlyExtract(stream, total, classified, fields)
+            extractMs = round((time.time() - start) * 1000) if early else None
+            pages = await stream.all()
+            loadedMs = round((time.time() - start) * 1000)
+            
+            print(f"🔄 Xử lý: {loaderName}, {len(pages)} trang (Streaming)")
+            response = await self._process(pages, filePath, loaderName, classified=classified, fields=fields,
+                                           early=early)
+        except BaseException:
+            if early is not None:
+                early[1].cancel()
+            raise
+        for doc in response.get("documents", []):
+            doc.setdefault("_debug", {})["stream"] = {
+                "first_pages_ms": firstMs, "classified_ms": classifiedMs,
+                "extract_started_ms": extractMs, "loaded_ms": loadedMs,
+            }
+        return response
+    
+    async def _startEarlyExtract(self, stream: PageStream, total: int, classified: tuple,
+                                 fields: Optional[tuple] = None) -> Optional[tuple]:
+        """
+        Đợi tới khi policy của contract xác định được các trang cần giữ và các trang đó đã OCR xong,
+        rồi chạy `_extract` trên các trang đó. Trả về (index các trang giữ, task)
+        hoặc None nếu phải chờ cả tài liệu (không có policy / giữ toàn bộ trang).
+        """
+        result = classified[0]
+        contract = result.classification.contract if result and result.classification else None
+        policy = PAGE_POLICIES.get(contract) if contract else None
+        if policy is None or result.name == "Other" or total <= config.processing.eagerPageThreshold:
+            return None
+        
+        def decide(loaded):
+            kept = policy.selectFrom({i: pageText(page) for i, page in loaded.items()}, total)
+            if kept is None or any(i not in loaded for i in kept):
+                return None
+            return kept
+        kept = await stream.until(decide)
+        if not kept or len(kept) >= total:
+            return None
+        
+        extractPages, _ = splitRouting([stream.pages[i] for i in kept])
+        print(f"⚡ Trích xuất sớm {len(kept)}/{total} trang: {[i + 1 for i in kept]}")
+        from contracts import EXTRA_CONTENTS
+        task = asyncio.create_task(self._extract(extractPages, contract, EXTRA_CONTENTS.get(contract), fields))
+        return kept, task
+    
+    def _newExtractor(self, llm: Optional[PipelineLLM] = None) -> Extractor:
+        """Extractor với DocumentLoaderData (nhận pages đã load) và LLM dùng chung."""
+        extractor = Extractor()
+        extractor.load_document_loader(DocumentLoaderData())
+        extractor.load_llm(llm or self._llm)
+        return extractor
+    
+    async def aclassify(self, pages, useRules: bool = True) -> tuple:
+        """
+        Chỉ phân loại (không trích xuất) các pages đã load. `useRules=False` -> luôn gọi LLM.
+        Trả về (ClassificationResponse hoặc None, debug).
+        """
+        return await self._classify(pages, useRules)
+    
+    async def _classify(self, pages, useRules: bool = True) -> tuple:
+        """
+        Phân loại: thử luật trước (không tốn LLM), không chắc chắn mới gọi LLM.
+        LLM chạy theo cascade: confidence < `cascadeMinConfidence` -> lên tầng model tiếp theo.
+        Trả về (result, debug).
+        """
+        result = None
+        if useRules and config.processing.preClassify:
+            result = preClassify(pages, config.processing.preClassifyMinConfidence)
+        debug = {"classifier": "rules" if result else "llm"}
+        if result is not None:
+            return result, debug
+        
+        for tier, llm in enumerate(self._tiers):
+            result, info = await self._classifyLlm(self._newExtractor(llm), pages)
+            info.update({"tier": tier, "model": llm.model})
+            debug["classify"] = info
+            confidence = getattr(result, "confidence", None) or 0
+            if confidence >= config.processing.cascadeMinConfidence:
+                break
+            if tier + 1 < len(self._tiers):
+                print(f"⬆️ Confidence {confidence} < {config.processing.cascadeMinConfidence}: "
+                      f"phân loại lại bằng {self._tiers[tier + 1].model}")
+        return result, debug
+    
+    async def _oneShot(self, pages, fields: Optional[tuple] = None) -> Optional[tuple]:
+        """
+        Phân loại + trích xuất trong 1 request (tầng model đầu tiên).
+        `fields`: schema one-shot chỉ gồm các trường này (contract rút gọn).
+        Trả về (result, data, debug); data = None nếu vẫn cần bước extract riêng.
+        None nếu kết quả không dùng được (loại lạ, confidence thấp) -> đường 2 bước như cũ.
+        """
+        start = time.time()
+        llm = self._tiers[0]
+        try:
+            response = await runLlm(llm.request, buildOneShotMessages(pages), buildOneShotModel(fields))
+        except Exception as e:
+            print(f"⚠️ One-shot lỗi ({type(e).__name__}), chuyển sang phân loại + trích xuất riêng")
+            return None
+        result, contract, data = parseOneShot(response)
+        if result is None or (result.confidence or 0) < config.processing.cascadeMinConfidence:
+            return None
+        
+        info = {"mode": "oneshot", "calls": 1, "ms": round((time.time() - start) * 1000),
+                "tier": 0, "model": llm.model}
+        if data is not None:
+            issues = validateData(contract, data, fields)
+            if issues:
+                # Dữ liệu không hợp lệ -> giữ phân loại, trích xuất lại (+ sửa các trường lỗi)
+                print(f"⚠️ One-shot: dữ liệu không hợp lệ ({', '.join(issues)}), trích xuất lại")
+                data = None
+        return result, data, info
+    
+    async def _extract(self, pages, contract, extra, fields: Optional[tuple] = None) -> tuple:
+        """
+        Trích xuất: đọc bằng luật trước (phần đầu / khối chữ ký văn bản hành chính, MRZ hộ chiếu,
+        mặt hàng + tổng tiền hóa đơn),
+        LLM chỉ trích xuất các trường luật không đọc được (không còn trường nào -> không gọi LLM).
+        `fields`: chỉ trích xuất các trường này.
+        Trả về (data, debug: tầng / model / số lần chạy / các trường còn lỗi).
+        """
+        parsed = self._parseLocal(contract, pages)
+        if fields:
+            parsed = {name: value for name, value in parsed.items() if name in fields}
+        # Giá trị đọc bằng luật cũng phải qua validateData
+        for name in validateData(contract, parsed, parsed.keys()):
+            parsed.pop(name, None)
+        if not parsed:
+            return await self._extractLlm(pages, contract, extra, fields)
+        
+        wanted = fields or tuple(contract.model_fields)
+        missing = tuple(name for name in wanted if name not in parsed)
+        print(f"📐 Đọc bằng luật: {', '.join(parsed)}" + (f"; LLM: {', '.join(missing)}" if missing else ""))
+        if contract is Invoice and "danh_sach_mat_hang" in parsed:
+            # INVOICE_EXTRA_CONTENT chỉ hướng dẫn đọc mặt hàng -> không cần gửi nữa
+            extra = None
+        if missing:
+            data, info = await self._extractLlm(pages, contract, extra, missing)
+        else:
+            data, info = {}, {"tier": None, "model": None, "attempts": 0, "invalid": {}}
+        info["parsed"] = list(parsed)
+        return {**projectData(data, wanted), **parsed}, info
+    
+    @staticmethod
+    def _parseLocal(contract, pages) -> Dict[str, Any]:
+        """Các trường đọc được bằng luật (không gọi LLM) cho contract này."""
+        if contract is VietnamPassport:
+            return parsePassportMrz(pages) if config.processing.mrzParser else {}
+        if contract is Invoice:
+            return parseInvoice(pages) if config.processing.invoiceParser else {}
+        return parseHeader(contract, pages) if config.processing.headerParser else {}
+    
+    async def _extractLlm(self, pages, contract, extra, fields: Optional[tuple] = None) -> tuple:
+        """
+        Trích xuất bằng tầng model đầu tiên; các trường không qua `validateData` được hỏi lại riêng
+        (chỉ các trường lỗi + đoạn trang liên quan) bằng tầng model tiếp theo, tối đa `repairAttempts` lần.
+        `fields`: chỉ gửi schema rút gọn gồm các trường này (contract rút gọn được cache).
+        """
+        target = projectContract(contract, fields) if fields else contract
+        if target is None:
+            # Không trường nào được yêu cầu thuộc loại tài liệu này -> không cần gọi LLM
+            return projectData({}, fields), {"tier": None, "model": None, "attempts": 0, "invalid": {}}
+        batched = await self._extractBatched(pages, contract, target, extra)
+        tier, llm = 0, self._tiers[0]
+        windows = self._windows(pages, target) if batched is None else []
+        if batched is not None:
+            data, batchSize = batched
+        elif windows:
+            data = await self._extractWindows(windows, target, extra, llm)
+        else:
+            extracted = await runLlm(
+                self._newExtractor(llm).extract, pages, target,
+                vision=False,
+                content=extra,
+                completion_strategy=self._strategy
+            )
+            data = extracted.model_dump() if hasattr(extracted, 'model_dump') else extracted
+        issues = validateData(contract, data, fields)
+        attempts, repaired = 1, []
+        while issues and attempts <= config.processing.repairAttempts:
+            # Còn tầng model mạnh hơn thì lên tầng, hết thì hỏi lại tầng cuối
+            tier = min(attempts, len(self._tiers) - 1)
+            llm = self._tiers[tier]
+            print(f"🔧 Dữ liệu không hợp lệ ({', '.join(issues)}): hỏi lại {llm.model} cho các trường này")
+            data, changed, issues = await self._repair(pages, contract, data, issues, extra, llm, fields)
+            repaired.extend(name for name in changed if name not in repaired)
+            attempts += 1
+        info = {"tier": tier, "model": llm.model, "attempts": attempts, "invalid": issues}
+        repaired = [name for name in repaired if name not in issues]
+        if repaired:
+            info["repaired"] = repaired
+        if batched is not None:
+            info["batch_size"] = batchSize
+        if windows:
+            info["windows"] = len(windows)
+        return data, info
+    
+    @staticmethod
+    def _windows(pages, target) -> List[str]:
+        """Các cửa sổ trích xuất song song; [] nếu tắt / contract không có trường danh sách / tài liệu ngắn."""
+        settings = config.processing
+        if not settings.chunked or not listFields(target) or len(pagesText(pages)) < settings.chunkMinChars:
+            return []
+        windows = splitWindows(pages, settings.chunkChars, settings.chunkOverlapLines)
+        return windows if len(windows) > 1 else []
+    
+    async def _extractWindows(self, windows: List[str], target, extra, llm: PipelineLLM) -> Dict[str, Any]:
+        """Trích xuất song song từng cửa sổ rồi ghép (bỏ trùng mặt hàng ở ranh giới, gộp trường đơn)."""
+        start = time.time()
+        content = f"{extra.strip()}\n\n{WINDOW_NOTE}" if extra else WINDOW_NOTE
+        
+        async def extractOne(window: str) -> Dict[str, Any]:
+            extracted = await runLlm(
+                self._newExtractor(llm).extract, [{"content": window}], target,
+                vision=False,
+                content=content,
+                completion_strategy=self._strategy
+            )
+            return extracted.model_dump() if hasattr(extracted, 'model_dump') else extracted
+        
+        results = await asyncio.gather(*(extractOne(w) for w in windows))
+        data = mergeWindows(target, windows, results)
+        counts = [len(r.get(n) or []) for r in results for n in listFields(target)]
+        print(f"🧩 Trích xuất {len(windows)} cửa sổ song song ({time.time() - start:.1f}s), "
+              f"phần tử: {'+'.join(map(str, counts))} -> {sum(len(data.get(n) or []) for n in listFields(target))}")
+        return data
+    
+    async def _repair(self, pages, contract, data, issues, extra, llm: PipelineLLM,
+                      fields: Optional[tuple] = None) -> tuple:
+        """
+        Hỏi lại LLM chỉ các trường trong `issues`, kèm đoạn trang liên quan; ghép vào `data`.
+        `fields`: bộ trường của lần trích xuất (kiểm tra lại trên đúng bộ trường đó).
+        Trả về (data, các trường đã thay, issues sau khi kiểm tra lại). Lỗi LLM -> giữ nguyên data.
+        """
+        names = tuple(issues)
+        target = projectContract(contract, names)
+        if target is None:
+            return data, [], issues
+        snippets = fieldSnippets(pages, contract, data, names)
+        messages = buildRepairMessages(contract, data, issues, snippets, extra)
+        try:
+            response = await runLlm(llm.request, messages, target)
+        except Exception as e:
+            print(f"⚠️ Sửa trường lỗi thất bại ({type(e).__name__}), giữ kết quả cũ")
+            return data, [], issues
+        fixed = response.model_dump() if hasattr(response, "model_dump") else dict(response or {})
+        data, changed = mergeRepair(data, fixed, names)
+        return data, changed, validateData(contract, data, fields)
+    
+    async def _extractBatched(self, pages, contract, target, extra) -> Optional[tuple]:
+        """Trích xuất qua MicroBatcher (tài liệu ngắn). None -> trích xuất riêng như bình thường."""
+        settings = config.processing
+        if self._batcher is None or not self._batcher.accepts(
+            contract, pages, settings.oneShotMaxPages, settings.oneShotMaxChars
+        ):
+            return None
+        try:
+            data, batchSize = await self._batcher.submit(target, pages, extra)
+        except Exception as e:
+            print(f"⚠️ Batch lỗi ({type(e).__name__}), trích xuất riêng")
+            return None
+        return (data, batchSize) if data is not None else None
+    
+    def _extractInput(self, pages, contract) -> tuple:
+        """(các trang cần trích xuất, index các trang được giữ, extra_content) cho 1 contract."""
+        from contracts import EXTRA_CONTENTS
+        policy = PAGE_POLICIES.get(contract) if config.processing.pagePruning else None
+        extractPages, kept = selectPages(pages, policy, config.processing.eagerPageThreshold)
+        return extractPages, kept, EXTRA_CONTENTS.get(contract, None)
+    
+    def _startSpeculative(self, pages, headPages, fields: Optional[tuple] = None) -> Dict[type, Any]:
+        """
+        Chạy trước bước trích xuất cho các ứng viên hàng đầu của luật (khi luật chưa đủ chắc chắn),
+        song song với LLM classify. Tổng token ước lượng không vượt `speculativeTokenBudget`.
+        Trả về {contract: task}.
+        """
+        settings = config.processing
+        candidates = [
+            c for c in rankCandidates(headPages)
+            if c.classification.contract and c.score >= settings.speculativeMinScore
+        ][:settings.speculativeCandidates]
+        
+        tasks, spent = {}, 0
+        for cand in candidates:
+            contract = cand.classification.contract
+            extractPages, _, extra = self._extractInput(pages, contract)
+            cost = (len(pagesText(extractPages)) + len(extra or "")) // 4 + 1
+            if spent + cost > settings.speculativeTokenBudget:
+                break
+            spent += cost
+            tasks[contract] = asyncio.create_task(self._extract(extractPages, contract, extra, fields))
+        if tasks:
+            print(f"🔮 Trích xuất trước: {', '.join(c.__name__ for c in tasks)} (~{spent} token)")
+        return tasks
     
-    def _process(self, pages, filePath: str, loaderName: str) -> Dict:
+    async def _process(self, pages, filePath: str, loaderName: str, classified: Optional[tuple] = None,
+                       fields: Optional[tuple] = None, early: Optional[tuple] = None) -> Dict:
         """
         Xử lý tài liệu với Extractor:
         - Sử dụng DocumentLoaderData để xử lý content đã load (tránh đọc file 2 lần).
         - Extractor tự động xử lý merge/paginate cho tài liệu nhiều trang.
+        - `classified`: kết quả `_classify` đã có sẵn (pipeline streaming) -> bỏ qua bước phân loại.
+        - `fields`: chỉ trích xuất các trường này, `data` trả về có đúng các key đó.
+        - `early`: (index các trang, task `_extract`) đã chạy trong lúc stream; chỉ dùng nếu
+          khớp đúng các trang được chọn trên toàn bộ tài liệu, nếu không thì hủy.
         """
-        # Setup Extractor với DocumentLoaderData (để nhận raw data)
-        extractor = Extractor()
-        extractor.load_document_loader(DocumentLoaderData())
-        extractor.load_llm(self._llm)
+        # Routing từng trang (hybrid loader) -> ghi vào _debug, không đưa vào prompt
+        pages, routing = splitRouting(pages)
+        debug = {"routing": routing} if routing else {}
         
-        # Phân loại (đưa pages vào trực tiếp)
-        classifications = getClassificationsList()
-        result = extractor.classify(pages, classifications, vision=False)
-        confidence = getattr(result, 'confidence', None)
+        # Tài liệu dài: chỉ phân loại trên các trang đầu
+        headPages = classifyPages(
+            pages, config.processing.classifyPages, config.processing.eagerPageThreshold
+        ) if config.processing.pagePruning else pages
         
-        if not result or result.name == "Other":
-            return makeSuccessResponse(category="Other", loader=loaderName, vision=False)
+        # Tài liệu ngắn (luật không nhận ra): phân loại + trích xuất trong 1 request
+        data = None
+        useRules = True
+        if classified is None and config.processing.oneShot and isShortDocument(
+            pages, config.processing.oneShotMaxPages, config.processing.oneShotMaxChars
+        ):
+            rules = preClassify(headPages, config.processing.preClassifyMinConfidence) \
+                if config.processing.preClassify else None
+            if rules is not None:
+                classified = (rules, {"classifier": "rules"})
+            else:
+                useRules = False
+                shot = await self._oneShot(headPages, fields)
+                if shot is not None:
+                    shotResult, data, shotInfo = shot
+                    classified = (shotResult, {"classifier": "oneshot", "classify": shotInfo})
+                    if data is not None:
+                        debug["extract"] = {**shotInfo, "attempts": 1, "invalid": {}}
+        
+        # Speculative: luật không đủ chắc chắn -> trích xuất trước cho top ứng viên trong lúc chờ classify
+        speculative = {}
+        if classified is None and config.processing.speculative:
+            rules = preClassify(headPages, config.processing.preClassifyMinConfidence) \
+                if useRules and config.processing.preClassify else None
+            if rules is not None:
+                classified = (rules, {"classifier": "rules"})
+            else:
+                useRules = False
+                speculative = self._startSpeculative(pages, headPages, fields)
+        
+        if classified is None:
+            try:
+                classified = await self._classify(headPages, useRules=useRules)
+            except BaseException:
+                for task in speculative.values():
+                    task.cancel()
+                raise
+        result, classifyDebug = classified
+        debug.update(classifyDebug)
+        confidence = getattr(result, 'confidence', None)
+        if isinstance(pages, list):
+            debug["pages"] = {"total": len(pages), "classify": len(headPages)}
         
         # Trích xuất
-        contract = result.classification.contract if result.classification else None
-        data = None
+        contract = result.classification.contract if result and result.classification else None
         
-        if contract:
+        # Giữ task đúng loại, hủy các task còn lại (request đang chạy vẫn tính token)
+        hit = speculative.pop(contract, None)
+        for task in speculative.values():
+            task.cancel()
+        if hit is not None or speculative:
+            debug["speculative"] = {
+                "candidates": [c.__name__ for c in ([contract] if hit else []) + list(speculative)],
+                "hit": hit is not None,
+            }
+        
+        if not result or result.name == "Other":
+            return makeSuccessResponse(category="Other", loader=loaderName, vision=False, debug=debug)
+        
+        if contract and data is None:
             print(f"📄 Loại: {result.name}. Trích xuất...")
             
-            # Lấy extra_content
-            from contracts import EXTRA_CONTENTS
-            extra = EXTRA_CONTENTS.get(contract, None)
+            # Chỉ giữ các trang contract cần (trang đầu/cuối, khối chữ ký)
+            extractPages, kept, extra = self._extractInput(pages, contract)
+            if kept:
+                print(f"✂️ Chọn {len(kept)}/{len(pages)} trang: {[i + 1 for i in kept]}")
+            
+            if early is not None and early[0] != kept:
+                early[1].cancel()
+                early = None
             
             # Extract (đưa pages vào trực tiếp, Extractor tự handle strategy)
-            extracted = extractor.extract(
-                pages, contract, 
-                vision=False,
-                content=extra, 
-                completion_strategy=self._strategy
-            )
-            data = extracted.model_dump() if hasattr(extracted, 'model_dump') else extracted
+            if early is not None:
+                data, debug["extract"] = await early[1]
+                debug["extract"]["early"] = True
+            elif hit is not None:
+                data, debug["extract"] = await hit
+            else:
+                data, debug["extract"] = await self._extract(extractPages, contract, extra, fields)
+            if "pages" in debug:
+                debug["pages"]["extract"] = len(extractPages)
+        
+        if fields:
+            data = projectData(data, fields)
+            debug["fields"] = list(fields)
         
         return makeSuccessResponse(
             category=findCategory(result.name) or result.name,
@@ -123,9 +697,51 @@ class DocumentProcessor:
             data=data,
             confidence=confidence,
             loader=loaderName,
-            vision=False
+            vision=False,
+            debug=debug
         )
 
+    async def _classifyLlm(self, extractor: Extractor, pages) -> tuple:
+        """
+        Phân loại bằng LLM theo `classificationMode`:
+        - flat: 1 lần gọi với toàn bộ các lá của cây.
+        - tree: chọn nhóm (prompt nhỏ) rồi chỉ phân biệt trong các con của nhóm đó;
+          nhóm chỉ có 1 con (vehicle, finance) thì dừng luôn sau tầng 1.
+        Trả về (result, thông tin debug: mode / số lần gọi / thời gian).
+        """
+        start = time.time()
+        mode = self._classificationMode or config.processing.classificationMode
+        
+        if mode != "tree":
+            result = await runLlm(extractor.classify, pages, getClassificationsList(), vision=False)
+            return result, {"mode": "flat", "calls": 1, "ms": round((time.time() - start) * 1000)}
+        
+        calls = 1
+        result = await runLlm(extractor.classify, pages, getCategoryClassifications(), vision=False)
+        children = getChildClassifications(result.name) if result else []
+        if len(children) == 1:
+            # Early exit: nhóm chỉ có 1 loại
+            result = ClassificationResponse(
+                name=children[0].name, confidence=result.confidence, classification=children[0]
+            )
+        elif children:
+            calls += 1
+            result = await runLlm(extractor.classify, pages, children, vision=False)
+        return result, {"mode": "tree", "calls": calls, "ms": round((time.time() - start) * 1000)}
+
+
+def _runSync(coro):
+    """
+    Chạy coroutine từ code đồng bộ (không cần nest_asyncio).
+    Nếu thread hiện tại đã có event loop (Jupyter, ...) thì chạy trên thread riêng.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 
 # Alias cho backward compatibility
 DocumentAIProcessor = DocumentProcessor
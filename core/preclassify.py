@@ -0,0 +1,134 @@
+"""
+Phân loại sơ bộ bằng luật (không gọi LLM).
+
+Văn bản hành chính Việt Nam mang loại văn bản ngay trong số hiệu
+(`/NĐ-CP`, `/TT-`, `/NQ-CP`, `/VBHN-`, `/CT-TTg`, ...); giấy tờ tùy thân có
+tiêu đề cố định (CĂN CƯỚC, HỘ CHIẾU, GIẤY PHÉP LÁI XE, ...). Các tín hiệu này
+được map vào các lá của CLASSIFICATION_TREE. Chỉ khi không đủ chắc chắn thì
+pipeline mới gọi `extractor.classify`. Số hiệu được đọc bằng `parseSoHieu`
+(core/headerparser.py, dùng chung với benchmark_ocr.py).
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from extract_thinker import Classification
+from extract_thinker.models.classification_response import ClassificationResponse
+
+from contracts import VietnamCCCD, VietnamPassport, VietnamStudentCard, VietnamDriverLicense, Invoice
+from contracts.government import (
+    Luat, PhapLenh, NghiDinh, ThongTu, Lenh,
+    NghiQuyetChinhPhu, NghiQuyetPhienHopChinhPhu, VanBanChiDaoDieuHanh, VanBanHopNhat,
+)
+from core.classifications import getClassificationsList
+from core.pages import pagesText
+from core.headerparser import parseSoHieu
+
+# Số trang đầu dùng để tìm tín hiệu (số hiệu, tiêu đề luôn nằm ở trang 1)
+HEADER_PAGES = 2
+HEADER_CHARS = 6000
+
+
+@dataclass
+class Rule:
+    """
+    Một luật: pattern (regex, không phân biệt hoa thường) -> contract, kèm điểm (1..10).
+    `kyHieu`: pattern so với ký hiệu trong số hiệu ở phần đầu văn bản (NĐ-CP, TT-BTC, QH15...)
+    thay vì toàn bộ text.
+    """
+    contract: type
+    pattern: str
+    score: int
+    reason: str
+    kyHieu: bool = False
+
+
+# Điểm >= ngưỡng (mặc định 8) mới được dùng thay cho LLM
+RULES: List[Rule] = [
+    # Văn bản quy phạm pháp luật
+    Rule(NghiDinh, r"N[ĐD]-CP", 9, "số hiệu /NĐ-CP", True),
+    Rule(ThongTu, r"TT-[A-ZĐ]+", 9, "số hiệu /TT-", True),
+    Rule(Luat, r"QH\d+", 8, "số hiệu /QHxx", True),
+    Rule(Luat, r"^\s*LUẬT\s*$", 3, "tiêu đề LUẬT"),
+    Rule(PhapLenh, r"UBTVQH\d+", 7, "số hiệu /UBTVQH", True),
+    Rule(PhapLenh, r"^\s*PHÁP LỆNH\s*$", 3, "tiêu đề PHÁP LỆNH"),
+    # Văn bản hành chính
+    Rule(NghiQuyetChinhPhu, r"NQ-CP", 8, "số hiệu /NQ-CP", True),
+    Rule(NghiQuyetPhienHopChinhPhu, r"NQ-CP", 6, "số hiệu /NQ-CP", True),
+    Rule(NghiQuyetPhienHopChinhPhu, r"^\s*(?:NGHỊ QUYẾT\s+)?PHIÊN HỌP CHÍNH PHỦ", 4, "tiêu đề phiên họp Chính phủ"),
+    Rule(Lenh, r"L-CTN", 9, "số hiệu /L-CTN", True),
+    Rule(VanBanHopNhat, r"VBHN-[A-ZĐ]+", 9, "số hiệu /VBHN-", True),
+    Rule(VanBanChiDaoDieuHanh, r"(?:CT|C[ĐD])-TTg", 9, "số hiệu /CT-TTg, /CĐ-TTg", True),
+    Rule(VanBanChiDaoDieuHanh, r"TB-VPCP", 8, "số hiệu /TB-VPCP", True),
+    # QĐ-TTg không có contract riêng -> chỉ gợi ý, để LLM quyết định
+    Rule(VanBanChiDaoDieuHanh, r"Q[ĐD]-TTg", 5, "số hiệu /QĐ-TTg", True),
+    # Giấy tờ tùy thân / phương tiện
+    Rule(VietnamCCCD, r"CĂN CƯỚC CÔNG DÂN|CITIZEN IDENTITY CARD", 8, "tiêu đề CCCD"),
+    Rule(VietnamCCCD, r"(?<!\d)\d{12}(?!\d)", 1, "dãy 12 số"),
+    Rule(VietnamPassport, r"P<VNM", 10, "dòng MRZ hộ chiếu"),
+    Rule(VietnamPassport, r"HỘ CHIẾU|PASSPORT", 8, "tiêu đề hộ chiếu"),
+    Rule(VietnamDriverLicense, r"GIẤY PHÉP LÁI XE|DRIVER'?S? LICEN[CS]E", 8, "tiêu đề GPLX"),
+    Rule(VietnamStudentCard, r"THẺ SINH VIÊN|STUDENT(?: ID)? CARD", 8, "tiêu đề thẻ sinh viên"),
+    # Hóa đơn: 1 tín hiệu chưa đủ; dòng tổng tiền + tiêu đề / số hóa đơn thì đủ chắc chắn
+    Rule(Invoice, r"TOTAL SALES|ROUNDED TOTAL|TOTAL \(RM\)", 5, "dòng tổng tiền hóa đơn"),
+    Rule(Invoice, r"TAX INVOICE|CASH RECEIPT|SIMPLIFIED INVOICE", 4, "tiêu đề hóa đơn"),
+    Rule(Invoice, r"(?:DOC(?:UMENT)?|INVOICE|RECEIPT|BILL)\s*(?:NO|#)", 3, "số hóa đơn"),
+]
+
+_COMPILED = [(rule, re.compile(rule.pattern, re.IGNORECASE | re.MULTILINE)) for rule in RULES]
+
+
+@dataclass
+class Candidate:
+    """Ứng viên phân loại từ luật."""
+    classification: Classification
+    score: int
+    reasons: List[str]
+
+
+def headerText(pages: Any) -> str:
+    """Ghép text các trang đầu (nơi chứa số hiệu / tiêu đề)."""
+    head = pages[:HEADER_PAGES] if isinstance(pages, list) else pages
+    return pagesText(head, "\n")[:HEADER_CHARS]
+
+
+def rankCandidates(pages: Any) -> List[Candidate]:
+    """Chấm điểm các loại văn bản theo luật, trả về danh sách giảm dần theo điểm."""
+    text = headerText(pages)
+    if not text.strip():
+        return []
+    # Số hiệu bắt buộc có "Số:" -> không nhầm với văn bản được trích dẫn ("Căn cứ Luật ... số 76/2015/QH13")
+    soHieu = parseSoHieu(text)
+    kyHieu = soHieu.rsplit("/", 1)[-1] if soHieu else ""
+
+    byContract = {c.contract: c for c in getClassificationsList() if c.contract}
+    scores: Dict[type, Candidate] = {}
+    for rule, regex in _COMPILED:
+        matched = regex.match(kyHieu) if rule.kyHieu else regex.search(text)
+        if rule.contract not in byContract or not matched:
+            continue
+        cand = scores.setdefault(rule.contract, Candidate(byContract[rule.contract], 0, []))
+        cand.score = min(10, cand.score + rule.score)
+        cand.reasons.append(rule.reason)
+
+    return sorted(scores.values(), key=lambda c: c.score, reverse=True)
+
+
+def preClassify(pages: Any, minConfidence: int = 8, margin: int = 2) -> Optional[ClassificationResponse]:
+    """
+    Trả về ClassificationResponse nếu luật đủ chắc chắn, ngược lại None (-> dùng LLM).
+    Chắc chắn = điểm cao nhất >= minConfidence và hơn ứng viên thứ hai ít nhất `margin`.
+    """
+    candidates = rankCandidates(pages)
+    if not candidates:
+        return None
+    top = candidates[0]
+    if top.score < minConfidence:
+        return None
+    if len(candidates) > 1 and top.score - candidates[1].score < margin:
+        return None
+    return ClassificationResponse(
+        name=top.classification.name,
+        confidence=top.score,
+        classification=top.classification,
+    )
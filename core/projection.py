@@ -0,0 +1,48 @@
+"""
+Chỉ trích xuất các trường caller cần (`DocumentProcessor.run(path, fields=[...])`).
+
+Từ contract đầy đủ dựng contract rút gọn chỉ gồm các trường được yêu cầu (giữ nguyên
+kiểu + description), cache theo (contract, bộ trường). Schema nhỏ hơn -> ít token
+input / output hơn. Kết quả luôn có đúng các key được yêu cầu; trường không có trong
+contract của loại tài liệu đã phân loại thì trả về None.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pydantic import create_model
+from extract_thinker import Contract
+
+
+def normalizeFields(fields: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """Bỏ trùng / khoảng trắng, giữ thứ tự. None hoặc rỗng = lấy toàn bộ contract."""
+    if not fields:
+        return None
+    seen = []
+    for name in fields:
+        name = str(name).strip()
+        if name and name not in seen:
+            seen.append(name)
+    return tuple(seen) or None
+
+
+@lru_cache(maxsize=256)
+def projectContract(contract: type, fields: Tuple[str, ...]) -> Optional[type]:
+    """
+    Contract rút gọn gồm các trường trong `fields` có trong `contract`.
+    None nếu không trường nào thuộc contract (không cần gọi LLM).
+    """
+    keep = [name for name in fields if name in contract.model_fields]
+    if not keep:
+        return None
+    if len(keep) == len(contract.model_fields):
+        return contract
+    definitions: Dict[str, Any] = {
+        name: (contract.model_fields[name].annotation, contract.model_fields[name]) for name in keep
+    }
+    return create_model(contract.__name__, __base__=Contract, __doc__=contract.__doc__, **definitions)
+
+
+def projectData(data: Any, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Dữ liệu trả về với đúng các key được yêu cầu (thiếu -> None)."""
+    data = data if isinstance(data, dict) else {}
+    return {name: data.get(name) for name in fields}
@@ -0,0 +1,178 @@
+"""
+Prefix caching cho prompt LLM.
+
+Với mỗi contract, phần đầu prompt (system + JSON schema + EXTRA_CONTENTS) giống hệt nhau
+giữa các request, chỉ message cuối (nội dung tài liệu) thay đổi. Module này:
+- Tách prefix tĩnh = mọi message trước message cuối, tính key (hash) + số token ước lượng.
+- Provider có context cache tường minh (Anthropic / Claude): đánh dấu `cache_control`
+  ở message cuối của prefix. Provider cache ngầm (Gemini 2.5, OpenAI): giữ prefix ổn định
+  là đủ, không cần đánh dấu. Request có đánh dấu bị provider từ chối vì `cache_control`
+  -> gửi lại không đánh dấu và tắt đánh dấu cho model đó; lỗi khác được raise như bình thường.
+- Đếm token input cached / uncached cho từng request: ưu tiên số liệu provider trả về
+  (`usage.prompt_tokens_details.cached_tokens`, `cache_read_input_tokens`), không có thì
+  dùng LocalPrefixCache (mô phỏng cache của provider: TTL + số token tối thiểu).
+"""
+import copy
+import time
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import config
+from core.ratelimit import estimateTokens
+
+# Model cần đánh dấu `cache_control` để provider cache prefix
+_EXPLICIT_PREFIXES = ("anthropic/", "claude", "bedrock/anthropic", "vertex_ai/claude")
+
+# Log các request của tài liệu đang xử lý (pipeline đặt list mới cho mỗi tài liệu;
+# runLlm copy context nên thread gọi LLM vẫn ghi được vào đúng list)
+requestLog: contextvars.ContextVar[Optional[List[Dict]]] = contextvars.ContextVar("promptCacheLog", default=None)
+
+
+def isCacheControlError(error: BaseException) -> bool:
+    """Provider từ chối request vì `cache_control` (không hỗ trợ / sai vị trí) - lỗi khác không liên quan cache."""
+    return "cache_control" in str(error).lower()
+
+
+def splitPrefix(messages: List[Dict[str, Any]]) -> Tuple[Optional[str], int]:
+    """(key của prefix tĩnh, số token ước lượng). Prefix = mọi message trước message cuối."""
+    prefix = messages[:-1]
+    if not prefix:
+        return None, 0
+    digest = hashlib.sha256()
+    for message in prefix:
+        digest.update(str(message.get("role")).encode())
+        digest.update(str(message.get("content")).encode())
+    return digest.hexdigest()[:16], estimateTokens(prefix)
+
+
+def _usage(response: Any) -> Optional[Tuple[int, int]]:
+    """(prompt tokens, cached tokens) nếu provider trả về, ngược lại None."""
+    raw = getattr(response, "_raw_response", response)
+    usage = getattr(raw, "usage", None)
+    prompt = getattr(usage, "prompt_tokens", None)
+    if not isinstance(prompt, int):
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    if not isinstance(cached, int):
+        cached = getattr(usage, "cache_read_input_tokens", None)
+    return prompt, cached if isinstance(cached, int) else 0
+
+
+class LocalPrefixCache:
+    """
+    Stand-in cho context cache của provider: prefix đã gặp trong `ttlSec` giây
+    và dài ít nhất `minTokens` token thì tính là cached.
+    """
+
+    def __init__(self, ttlSec: float = 300.0, minTokens: int = 1024, maxEntries: int = 256):
+        self.ttlSec = ttlSec
+        self.minTokens = minTokens
+        self.maxEntries = maxEntries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Optional[str], prefixTokens: int) -> int:
+        """Số token prefix được cache cho request này (0 nếu miss), đồng thời ghi nhận prefix."""
+        if key is None or prefixTokens < self.minTokens:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            seenAt = self._seen.pop(key, None)
+            self._seen[key] = now
+            while len(self._seen) > self.maxEntries:
+                self._seen.popitem(last=False)
+        return prefixTokens if seenAt is not None and now - seenAt <= self.ttlSec else 0
+
+
+class PromptCache:
+    """
+    Dùng trong PipelineLLM: `prepare` trước khi gửi (đánh dấu prefix nếu cần),
+    `record` sau khi có response (cached / uncached tokens).
+    `mode`: auto (provider nếu có, không thì local) | local (chỉ stand-in) | off.
+    """
+
+    def __init__(self, mode: str = "auto", local: Optional[LocalPrefixCache] = None):
+        self.mode = mode
+        self.local = local or LocalPrefixCache(minTokens=config.processing.promptCacheMinTokens)
+        self.totals = {"requests": 0, "cached_tokens": 0, "uncached_tokens": 0}
+        self._unsupported: set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def shouldMark(self, model: str, prefixTokens: int) -> bool:
+        return (
+            self.mode == "auto"
+            and model not in self._unsupported
+            and model.lower().startswith(_EXPLICIT_PREFIXES)
+            and prefixTokens >= self.local.minTokens
+        )
+
+    def markPrefix(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bản sao messages với `cache_control` ở message cuối của prefix."""
+        marked = copy.copy(messages)
+        last = dict(marked[-2])
+        content = last.get("content")
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        else:
+            content = copy.deepcopy(content)
+        content[-1]["cache_control"] = {"type": "ephemeral"}
+        last["content"] = content
+        marked[-2] = last
+        return marked
+
+    def disableMarking(self, model: str) -> None:
+        print(f"⚠️ {model} không nhận cache_control, gửi prompt không đánh dấu")
+        self._unsupported.add(model)
+
+    def record(self, model: str, key: Optional[str], prefixTokens: int, inputTokens: int, response: Any) -> Dict:
+        localCached = self.local.lookup(key, prefixTokens)
+        usage = _usage(response) if self.mode == "auto" else None
+        if usage is not None:
+            inputTokens, cached = usage
+            source = "provider"
+        else:
+            cached, source = localCached, "local"
+        entry = {
+            "model": model, "prefix": key, "prefix_tokens": prefixTokens,
+            "cached_tokens": cached, "uncached_tokens": max(0, inputTokens - cached), "source": source,
+        }
+        with self._lock:
+            self.totals["requests"] += 1
+            self.totals["cached_tokens"] += entry["cached_tokens"]
+            self.totals["uncached_tokens"] += entry["uncached_tokens"]
+        log = requestLog.get()
+        if log is not None:
+            log.append(entry)
+        return entry
+
+
+def summarize(entries: List[Dict]) -> Dict[str, Any]:
+    """Tổng hợp log của 1 tài liệu cho `_debug.prompt_cache`."""
+    return {
+        "requests": [
+            {k: e[k] for k in ("prefix", "cached_tokens", "uncached_tokens", "source")} for e in entries
+        ],
+        "cached_tokens": sum(e["cached_tokens"] for e in entries),
+        "uncached_tokens": sum(e["uncached_tokens"] for e in entries),
+    }
+
+
+_promptCache: Optional[PromptCache] = None
+_promptCacheLock = threading.Lock()
+
+
+def getPromptCache() -> PromptCache:
+    """PromptCache dùng chung cho cả process (giống rate limiter)."""
+    global _promptCache
+    with _promptCacheLock:
+        if _promptCache is None:
+            _promptCache = PromptCache(config.processing.promptCache)
+        return _promptCache
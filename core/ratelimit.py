@@ -0,0 +1,213 @@
+"""
+Giới hạn tốc độ gọi API (Gemini, Document AI) dùng chung cho cả process.
+
+- TokenBucket: bucket nạp đều theo thời gian, `acquire` chờ (không báo lỗi) đến khi đủ quota.
+- RateLimiter: nhóm nhiều bucket (requests/phút + tokens/phút, QPS + trang/phút).
+- callWithBackoff: retry khi bị 429 / 503 với exponential backoff + jitter.
+
+Tất cả DocumentProcessor (batch, nhiều phiên Streamlit) dùng chung 1 limiter
+cho mỗi API -> tổng lưu lượng luôn nằm ngay dưới quota thay vì dồn lên rồi lỗi.
+"""
+import time
+import random
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import config
+
+
+def estimateTokens(messages: List[Dict[str, Any]]) -> int:
+    """Ước lượng nhanh số token prompt (~4 ký tự / token), không gọi tokenizer."""
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 4 + 1
+
+
+class TokenBucket:
+    """Token bucket thread-safe: nạp `ratePerSec` token/giây, tối đa `capacity` token."""
+
+    def __init__(self, ratePerSec: float, capacity: float):
+        self.ratePerSec = ratePerSec
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def perMinute(cls, limit: float, burstSeconds: float = 10.0) -> "TokenBucket":
+        """Bucket cho quota theo phút, cho phép burst tối đa `burstSeconds` giây quota."""
+        return cls(limit / 60.0, limit * burstSeconds / 60.0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.ratePerSec)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Chờ đến khi lấy được `amount` token. Trả về số giây đã chờ."""
+        # Request lớn hơn capacity: chỉ cần bucket đầy (nếu không sẽ chờ mãi)
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.ratePerSec
+            time.sleep(delay)
+            waited += delay
+
+    def debit(self, amount: float) -> None:
+        """Trừ thêm token sau khi biết chi phí thật (có thể âm -> các request sau chờ lâu hơn)."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+class RateLimiter:
+    """Nhóm các bucket của 1 API. Bucket có limit <= 0 thì bỏ qua (không giới hạn)."""
+
+    def __init__(self, name: str, buckets: Dict[str, TokenBucket]):
+        self.name = name
+        self.buckets = buckets
+        self.waitedSec = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, **amounts: float) -> float:
+        """Ví dụ: `acquire(requests=1, tokens=1200)`. Trả về số giây đã chờ."""
+        waited = 0.0
+        for key, amount in amounts.items():
+            bucket = self.buckets.get(key)
+            if bucket is not None and amount > 0:
+                waited += bucket.acquire(amount)
+        with self._lock:
+            self.calls += 1
+            self.waitedSec += waited
+        return waited
+
+    def debit(self, **amounts: float) -> None:
+        for key, amount in amounts.items():
+            bucket = self.buckets.get(key)
+            if bucket is not None and amount > 0:
+                bucket.debit(amount)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "waited_sec": round(self.waitedSec, 2)}
+
+
+def _buckets(**limitsPerMinute: float) -> Dict[str, TokenBucket]:
+    return {key: TokenBucket.perMinute(limit) for key, limit in limitsPerMinute.items() if limit > 0}
+
+
+_RETRYABLE_CODES = {429, 503}
+_RETRYABLE_NAMES = {"ratelimiterror", "serviceunavailableerror", "resourceexhausted",
+                    "toomanyrequests", "serviceunavailable"}
+# Chỉ dùng khi lỗi không có mã / kiểu rõ ràng (tên trạng thái gRPC, thông báo của SDK)
+_RETRYABLE_MARKERS = ("rate limit", "ratelimit", "resource_exhausted", "resource exhausted",
+                      "service unavailable", "overloaded")
+
+
+@lru_cache(maxsize=1)
+def _retryableTypes() -> tuple:
+    """Các kiểu lỗi throttle của google-api-core / litellm (thư viện nào không cài thì bỏ qua)."""
+    types = []
+    try:
+        from google.api_core import exceptions as google
+        types += [google.ResourceExhausted, google.ServiceUnavailable, google.TooManyRequests]
+    except ImportError:
+        pass
+    try:
+        import litellm
+        types += [litellm.RateLimitError, litellm.ServiceUnavailableError]
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+def _errorChain(error: BaseException) -> List[BaseException]:
+    """Lỗi và các lỗi gốc (`__cause__` / `__context__`), vd. lỗi Document AI bị bọc thành ValueError."""
+    chain: List[BaseException] = []
+    while error is not None and not any(error is seen for seen in chain):
+        chain.append(error)
+        error = error.__cause__ or error.__context__
+    return chain
+
+
+def isRetryable(error: BaseException) -> bool:
+    """Lỗi do throttling / quá tải (429, 503) -> nên retry. Xét theo mã lỗi / kiểu lỗi của cả chuỗi lỗi gốc."""
+    retryable = _retryableTypes()
+    chain = _errorChain(error)
+    for e in chain:
+        if retryable and isinstance(e, retryable):
+            return True
+        for attr in ("status_code", "code"):
+            code = getattr(e, attr, None)
+            try:
+                if int(code) in _RETRYABLE_CODES:
+                    return True
+            except (TypeError, ValueError):
+                pass
+        if type(e).__name__.lower() in _RETRYABLE_NAMES:
+            return True
+    return any(marker in str(e).lower() for e in chain for marker in _RETRYABLE_MARKERS)
+
+
+def callWithBackoff(fn: Callable[[], Any], retries: Optional[int] = None,
+                    baseDelay: Optional[float] = None, maxDelay: Optional[float] = None,
+                    onRetry: Optional[Callable[[BaseException, float], None]] = None) -> Any:
+    """
+    Gọi `fn()`; nếu lỗi 429/503 thì chờ (full jitter: random(0, base * 2^attempt)) rồi thử lại.
+    Lỗi khác hoặc hết số lần retry -> raise.
+    """
+    limits = config.rateLimit
+    retries = limits.retries if retries is None else retries
+    baseDelay = limits.backoffBaseSec if baseDelay is None else baseDelay
+    maxDelay = limits.backoffMaxSec if maxDelay is None else maxDelay
+
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not isRetryable(e):
+                raise
+            delay = random.uniform(0, min(maxDelay, baseDelay * (2 ** attempt)))
+            attempt += 1
+            if onRetry is not None:
+                onRetry(e, delay)
+            print(f"⏳ Rate limit ({type(e).__name__}), thử lại lần {attempt}/{retries} sau {delay:.1f}s")
+            time.sleep(delay)
+
+
+_llmLimiter: Optional[RateLimiter] = None
+_docAiLimiter: Optional[RateLimiter] = None
+_limiterLock = threading.Lock()
+
+
+def getLlmLimiter() -> RateLimiter:
+    """Limiter dùng chung cho mọi request LLM: requests/phút + tokens/phút."""
+    global _llmLimiter
+    with _limiterLock:
+        if _llmLimiter is None:
+            limits = config.rateLimit
+            _llmLimiter = RateLimiter("llm", _buckets(requests=limits.llmRpm, tokens=limits.llmTpm))
+        return _llmLimiter
+
+
+def getDocAiLimiter() -> RateLimiter:
+    """Limiter dùng chung cho Document AI: request/giây + trang/phút."""
+    global _docAiLimiter
+    with _limiterLock:
+        if _docAiLimiter is None:
+            limits = config.rateLimit
+            buckets = _buckets(pages=limits.docAiPagesPerMin)
+            if limits.docAiQps > 0:
+                buckets["requests"] = TokenBucket(limits.docAiQps, limits.docAiQps)
+            _docAiLimiter = RateLimiter("docai", buckets)
+        return _docAiLimiter
@@ -0,0 +1,140 @@
+"""
+Sửa các trường không qua `validateData` mà không trích xuất lại cả tài liệu.
+
+Sau lần trích xuất đầu, các trường lỗi (sai định dạng, thiếu trường bắt buộc, tổng tiền
+không khớp) được hỏi lại LLM với:
+- contract rút gọn chỉ gồm các trường đó (core/projection.py),
+- giá trị hiện tại + lý do không hợp lệ,
+- các đoạn trang liên quan (dòng chứa giá trị cũ / nhãn của trường, kèm vài dòng xung quanh)
+  thay vì toàn bộ tài liệu.
+Kết quả được ghép vào dữ liệu đã có, các trường hợp lệ giữ nguyên.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.pages import pagesText
+from core.validation import isEmpty
+
+# Số dòng lấy thêm trước / sau mỗi dòng khớp
+SNIPPET_CONTEXT = 2
+SNIPPET_MAX_CHARS = 4000
+# Trường không tìm thấy dòng nào -> kèm thêm các dòng đầu tài liệu (thẻ, giấy tờ ngắn)
+HEAD_LINES = 10
+
+
+def _label(contract: type, name: str) -> Optional[str]:
+    """Nhãn của trường lấy từ description ("Số CCCD 12 chữ số" -> "số cccd 12 chữ số", "Total Sales")."""
+    info = contract.model_fields.get(name)
+    description = (info.description or "") if info else ""
+    label = re.split(r"[(.,:/\n]", description, maxsplit=1)[0].strip().lower()
+    return label if len(label) >= 3 else None
+
+
+def _needles(value: Any) -> List[str]:
+    """Các chuỗi của giá trị hiện tại có thể tìm thấy trong text OCR."""
+    if isinstance(value, dict):
+        return [n for v in value.values() for n in _needles(v)]
+    if isinstance(value, list):
+        return [n for v in value for n in _needles(v)]
+    if isinstance(value, bool) or isEmpty(value):
+        return []
+    if isinstance(value, float):
+        return [f"{value:.2f}"]
+    text = str(value).strip().lower()
+    return [text] if len(text) >= 3 else []
+
+
+def _matches(lines: List[str], needles: Iterable[str]) -> List[int]:
+    needles = [n for n in needles if n]
+    return [i for i, line in enumerate(lines) if any(n in line for n in needles)]
+
+
+def fieldSnippets(
+    pages: Any,
+    contract: type,
+    data: Dict[str, Any],
+    fields: Iterable[str],
+    context: int = SNIPPET_CONTEXT,
+    maxChars: int = SNIPPET_MAX_CHARS,
+) -> str:
+    """
+    Các đoạn text liên quan tới `fields`: dòng chứa nhãn hoặc giá trị hiện tại ± `context` dòng.
+    Trường kiểu danh sách lấy liền 1 khối từ dòng khớp đầu tiên tới dòng khớp cuối cùng.
+    Trường không tìm thấy dòng nào -> thêm `HEAD_LINES` dòng đầu; không trường nào tìm thấy
+    -> phần đầu tài liệu (tối đa `maxChars` ký tự).
+    """
+    text = pagesText(pages)
+    lines = text.splitlines()
+    lowered = [line.lower() for line in lines]
+    spans: List[Tuple[int, int]] = []
+    missing = False
+    for name in fields:
+        value = data.get(name)
+        hits = _matches(lowered, [_label(contract, name), *_needles(value)])
+        if not hits:
+            missing = True
+            continue
+        if isinstance(value, list):
+            spans.append((hits[0], hits[-1]))
+        else:
+            spans.extend((i, i) for i in hits)
+    if not spans:
+        return text[:maxChars]
+    if missing:
+        spans.append((0, HEAD_LINES - 1))
+
+    # Ghép các khoảng chồng lấn, giữ thứ tự trong tài liệu
+    merged: List[List[int]] = []
+    for start, end in sorted((max(0, s - context), min(len(lines) - 1, e + context)) for s, e in spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    snippets = "\n...\n".join("\n".join(lines[s:e + 1]) for s, e in merged)
+    return snippets[:maxChars]
+
+
+def buildRepairMessages(
+    contract: type,
+    data: Dict[str, Any],
+    issues: Dict[str, str],
+    snippets: str,
+    extra: Optional[str],
+) -> List[Dict[str, str]]:
+    current = "\n".join(f"- {name}: {data.get(name)!r} -> {reason}" for name, reason in issues.items())
+    # Phần tĩnh (hướng dẫn, EXTRA_CONTENTS) đứng trước phần thay đổi -> dùng được prefix cache
+    return [
+        {
+            "role": "system",
+            "content": "You are a server API that receives document information "
+            "and returns specific fields in JSON format.\n",
+        },
+        {
+            "role": "user",
+            "content": (
+                "##Instructions\n"
+                f"Bản trích xuất trước của tài liệu {contract.__name__} có một số trường không hợp lệ. "
+                "Chỉ đọc lại các trường được liệt kê từ các đoạn trích bên dưới, không đoán. "
+                "Trường không tìm thấy trong đoạn trích thì trả về null.\n"
+                + (f"##Hướng dẫn\n{extra.strip()}\n" if extra else "")
+            ),
+        },
+        {
+            "role": "user",
+            "content": f"##Trường cần sửa (giá trị hiện tại -> lý do)\n{current}\n\n##Content (trích đoạn)\n{snippets}\n",
+        },
+    ]
+
+
+def mergeRepair(data: Dict[str, Any], repaired: Dict[str, Any], fields: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """Ghép giá trị mới của `fields` vào `data` (bỏ qua giá trị rỗng). Trả về (data mới, các trường đã thay)."""
+    merged = dict(data)
+    changed = []
+    for name in fields:
+        value = repaired.get(name)
+        if isEmpty(value):
+            continue
+        if merged.get(name) != value:
+            changed.append(name)
+        merged[name] = value
+    return merged, changed
@@ -0,0 +1,179 @@
+"""
+Kiểm tra dữ liệu trích xuất theo từng contract (định dạng số giấy tờ, ngày tháng, ...).
+
+`validateData(contract, data)` trả về {field: lý do} cho các trường không hợp lệ;
+rỗng nghĩa là hợp lệ. Dùng để quyết định có cần hỏi lại LLM các trường lỗi không
+(core/repair.py). Ngoài luật từng trường còn có luật trên nhiều trường (tổng tiền hóa đơn).
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from contracts import VietnamCCCD, VietnamPassport, VietnamStudentCard, VietnamDriverLicense, Invoice
+from contracts.government import (
+    Luat, PhapLenh, NghiDinh, ThongTu, Lenh,
+    NghiQuyetChinhPhu, NghiQuyetPhienHopChinhPhu, VanBanChiDaoDieuHanh, VanBanHopNhat,
+)
+
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d")
+# "ngày 15 tháng 3 năm 2024" (văn bản hành chính)
+_VN_DATE = re.compile(r"ngày\s+(\d{1,2})\s+tháng\s+(\d{1,2})\s+năm\s+(\d{4})", re.IGNORECASE)
+_NO_EXPIRY = ("không thời hạn", "khong thoi han", "không xác định")
+
+
+def _compact(value: Any) -> str:
+    return re.sub(r"\s+", "", str(value))
+
+
+def parseDate(value: Any) -> Optional[datetime]:
+    """Đọc ngày dạng DD/MM/YYYY (và các biến thể), hoặc 'ngày .. tháng .. năm ..'."""
+    text = str(value).strip()
+    match = _VN_DATE.search(text)
+    if match:
+        day, month, year = (int(g) for g in match.groups())
+        try:
+            return datetime(year, month, day)
+        except ValueError:
+            return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(_compact(text), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _digits(count: int) -> Callable[[Any], bool]:
+    return lambda v: re.fullmatch(rf"\d{{{count}}}", _compact(v)) is not None
+
+
+def _isDate(value: Any) -> bool:
+    return parseDate(value) is not None
+
+
+def _isDateOrNoExpiry(value: Any) -> bool:
+    return _isDate(value) or str(value).strip().lower() in _NO_EXPIRY
+
+
+def _isNumber(value: Any) -> bool:
+    try:
+        return float(value) >= 0
+    except (TypeError, ValueError):
+        return False
+
+
+@dataclass
+class FieldRule:
+    """Luật cho 1 trường. `required`: thiếu (None / rỗng) cũng tính là không hợp lệ."""
+    field: str
+    check: Callable[[Any], bool]
+    message: str
+    required: bool = False
+
+
+_GOV_RULES = [
+    FieldRule("so_hieu", lambda v: re.search(r"\d+\s*/", str(v)) is not None, "số hiệu phải có dạng số/ký hiệu", True),
+    FieldRule("ngay_ban_hanh", _isDate, "ngày ban hành không đọc được"),
+]
+
+VALIDATION_RULES: Dict[type, List[FieldRule]] = {
+    VietnamCCCD: [
+        FieldRule("so_cccd", _digits(12), "số CCCD phải gồm 12 chữ số", True),
+        FieldRule("ngay_sinh", _isDate, "ngày sinh phải dạng DD/MM/YYYY"),
+        FieldRule("ngay_het_han", _isDateOrNoExpiry, "ngày hết hạn phải dạng DD/MM/YYYY"),
+    ],
+    VietnamPassport: [
+        FieldRule("so_ho_chieu", lambda v: re.fullmatch(r"[A-Z]\d{7,8}", _compact(v).upper()) is not None,
+                  "số hộ chiếu phải gồm 1 chữ cái + 7-8 chữ số", True),
+        FieldRule("ngay_sinh", _isDate, "ngày sinh phải dạng DD/MM/YYYY"),
+        FieldRule("ngay_cap", _isDate, "ngày cấp phải dạng DD/MM/YYYY"),
+        FieldRule("ngay_het_han", _isDate, "ngày hết hạn phải dạng DD/MM/YYYY"),
+    ],
+    VietnamDriverLicense: [
+        FieldRule("so_gplx", _digits(12), "số GPLX phải gồm 12 chữ số", True),
+        FieldRule("ngay_sinh", _isDate, "ngày sinh phải dạng DD/MM/YYYY"),
+        FieldRule("hang", lambda v: re.fullmatch(r"A[1-4]?|B[12]?|C1?|D[12]?|E|F[BCDE]?2?", _compact(v).upper()) is not None,
+                  "hạng GPLX không hợp lệ"),
+    ],
+    VietnamStudentCard: [
+        FieldRule("ma_sv", lambda v: re.fullmatch(r"[A-Za-z0-9]{4,}", _compact(v)) is not None, "mã SV không hợp lệ", True),
+    ],
+    Invoice: [
+        FieldRule("tong_tien", _isNumber, "tổng tiền phải là số không âm"),
+        FieldRule("tong_thanh_toan", _isNumber, "tổng thanh toán phải là số không âm"),
+    ],
+    Luat: _GOV_RULES,
+    PhapLenh: _GOV_RULES,
+    NghiDinh: _GOV_RULES,
+    ThongTu: _GOV_RULES,
+    Lenh: _GOV_RULES,
+    NghiQuyetChinhPhu: _GOV_RULES,
+    NghiQuyetPhienHopChinhPhu: _GOV_RULES,
+    VanBanChiDaoDieuHanh: [
+        FieldRule("so_kieu", lambda v: re.search(r"\d+\s*/", str(v)) is not None, "số ký hiệu phải có dạng số/ký hiệu", True),
+    ],
+    VanBanHopNhat: [
+        FieldRule("so_kieu", lambda v: re.search(r"\d+\s*/", str(v)) is not None, "số ký hiệu phải có dạng số/ký hiệu", True),
+    ],
+}
+
+
+def _invoiceTotals(data: Dict[str, Any]) -> Dict[str, str]:
+    """Tổng thành tiền các mặt hàng phải bằng tong_tien (lệch tối đa 0.05 do làm tròn)."""
+    items = [item for item in data.get("danh_sach_mat_hang") or [] if isinstance(item, dict)]
+    total = data.get("tong_tien")
+    amounts = [item.get("thanh_tien") for item in items]
+    if not items or not _isNumber(total) or not all(_isNumber(a) for a in amounts):
+        return {}
+    itemsTotal = sum(float(a) for a in amounts)
+    if abs(itemsTotal - float(total)) <= 0.05:
+        return {}
+    message = f"tổng thành tiền các mặt hàng ({itemsTotal:.2f}) không khớp tổng tiền ({total})"
+    return {"danh_sach_mat_hang": message, "tong_tien": message}
+
+
+# Luật trên nhiều trường cùng lúc: nhận data, trả về {field: lý do}
+RECORD_RULES: Dict[type, List[Callable[[Dict[str, Any]], Dict[str, str]]]] = {
+    Invoice: [_invoiceTotals],
+}
+
+
+# Giá trị mặc định của contract khi LLM không đọc được (InvoiceItem.ten_hang / ma_hang)
+PLACEHOLDERS = ("UNKNOWN",)
+
+
+def isEmpty(value: Any) -> bool:
+    """Thiếu giá trị: None, chuỗi rỗng / placeholder, danh sách / dict rỗng."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip() or value.strip() in PLACEHOLDERS
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def validateData(contract: Optional[type], data: Any, fields: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Trả về {field: lý do} cho các trường không hợp lệ (rỗng = hợp lệ).
+    `fields`: chỉ kiểm tra các trường này (trích xuất theo bộ trường rút gọn).
+    """
+    if contract is None or not isinstance(data, dict):
+        return {}
+    issues = {}
+    for rule in VALIDATION_RULES.get(contract, []):
+        if fields is not None and rule.field not in fields:
+            continue
+        value = data.get(rule.field)
+        if isEmpty(value):
+            if rule.required:
+                issues[rule.field] = "thiếu giá trị"
+            continue
+        if not rule.check(value):
+            issues[rule.field] = rule.message
+    for check in RECORD_RULES.get(contract, []):
+        for name, message in check(data).items():
+            if fields is None or name in fields:
+                issues.setdefault(name, message)
+    return issues
@@ -3,6 +3,7 @@ import glob
 import json
 import sys
 from core.pipeline import DocumentProcessor
+from core.schedule import estimateCost, orderJobs
 
 def load_ground_truth(gt_path):
     if not os.path.exists(gt_path):
@@ -46,6 +47,13 @@ def compare_data(extracted, expected):
     return True
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Đánh giá kết quả trích xuất với ground truth")
+    parser.add_argument("--schedule", choices=["fifo", "lpt", "sjf"], default="fifo",
+                        help="Thứ tự chạy: fifo = theo thứ tự file (mặc định), "
+                             "lpt = file dài trước, sjf = file ngắn trước (ước lượng toàn bộ input trước)")
+    args = parser.parse_args()
+
     input_dir = 'evaluation/inputs'
     gt_dir = 'evaluation/ground_truth'
     
@@ -64,7 +72,14 @@ def main():
     
     print(f"Starting evaluation on {len(files)} files...\n")
     
-    for file_path in files:
+    # Xử lý đồng thời tất cả file theo --schedule, sau đó so sánh tuần tự theo thứ tự cũ
+    ordered = files
+    if args.schedule != "fifo":
+        ordered = [e.input for e in orderJobs(map(estimateCost, files), args.schedule)]
+    results_by_file = dict(zip(ordered, processor.run_many(ordered, concurrency=4)))
+    all_results = [results_by_file[f] for f in files]
+    
+    for file_path, result in zip(files, all_results):
         filename = os.path.basename(file_path)
         base_name = os.path.splitext(filename)[0]
         gt_path = os.path.join(gt_dir, base_name + '.json')
@@ -72,8 +87,6 @@ def main():
         print(f"Processing {filename}...")
         
         try:
-            result = processor.run(file_path)
-            
             if 'error' in result and result['error']:
                 print(f"❌ Error during processing: {result['error']}")
                 failed += 1
@@ -103,5 +116,24 @@ def main():
     print(f"Failed: {failed}")
     print(f"Total: {len(files)}")
 
+    # Model nào đã phục vụ từng bước (cascade) - dùng để chỉnh CASCADE_MIN_CONFIDENCE
+    tier_usage = {}
+    for result in all_results:
+        for doc in result.get("documents", []):
+            debug = doc.get("_debug", {})
+            for step in ("classify", "extract"):
+                model = debug.get(step, {}).get("model")
+                if step == "classify" and debug.get("classifier") == "rules":
+                    model = "rules"
+                if step == "extract" and debug.get("extract", {}).get("attempts") == 0:
+                    model = "rules"
+                if model:
+                    key = f"{step}: {model}"
+                    tier_usage[key] = tier_usage.get(key, 0) + 1
+    if tier_usage:
+        print("\nTier usage:")
+        for key, count in sorted(tier_usage.items()):
+            print(f"  {key}: {count}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,7 @@
+"""Cấu hình chung cho pytest: import được `core` / `contracts` từ thư mục gốc repo."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# litellm tải bảng giá model qua mạng khi import -> dùng bản có sẵn trong package
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
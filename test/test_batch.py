@@ -0,0 +1,82 @@
+"""Test batch runner: JSONL theo từng file, resume từ checkpoint, compact (core/batch.py)."""
+import json
+
+from core.batch import BatchRunner, compact, iterInputs, loadCheckpoint
+
+
+def writeJsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class FakeProcessor:
+    """Processor giả: ghi lại các file được xử lý, file tên 'bad' trả về lỗi."""
+
+    def __init__(self):
+        self.seen = []
+
+    async def arun(self, filePath):
+        self.seen.append(filePath)
+        if "bad" in filePath:
+            return {"documents": [], "error": "hỏng"}
+        return {"documents": [{"category": "identity", "docType": "CCCD", "data": {"so": filePath}}], "error": None}
+
+
+def test_compact_keeps_latest_record_per_input(tmp_path):
+    jsonl = tmp_path / "r.jsonl"
+    writeJsonl(jsonl, [
+        {"input": "a", "error": "timeout"},
+        {"input": "b", "docType": "CCCD", "error": None},
+        {"input": "a", "docType": "Hộ chiếu", "error": None},
+    ])
+    with open(jsonl, "a", encoding="utf-8") as f:
+        f.write('{"input": "c", "docTy')  # dòng ghi dở khi crash
+
+    output = tmp_path / "out" / "results.json"
+    assert compact(str(jsonl), str(output)) == 2
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert result["total"] == 2
+    assert [(r["input"], r["docType"]) for r in result["results"]] == [("b", "CCCD"), ("a", "Hộ chiếu")]
+
+
+def test_compact_empty(tmp_path):
+    output = tmp_path / "results.json"
+    assert compact(str(tmp_path / "missing.jsonl"), str(output)) == 0
+    assert json.loads(output.read_text(encoding="utf-8")) == {"total": 0, "results": []}
+
+
+def test_checkpoint_only_counts_successes(tmp_path):
+    jsonl = tmp_path / "r.jsonl"
+    writeJsonl(jsonl, [{"input": "a", "error": None}, {"input": "b", "error": "hỏng"}, {"input": "c"}])
+    assert loadCheckpoint(str(jsonl)) == {"a", "c"}
+
+
+def test_resume_skips_completed_inputs(tmp_path):
+    jsonl = str(tmp_path / "r.jsonl")
+    inputs = ["a.pdf", "bad.pdf", "c.pdf"]
+
+    first = FakeProcessor()
+    stats = BatchRunner(first, jsonl, concurrency=2).run(inputs)
+    assert sorted(first.seen) == inputs
+    assert (stats["done"], stats["errors"], stats["skipped"]) == (3, 1, 0)
+
+    # Chạy lại: chỉ xử lý lại file lỗi
+    second = FakeProcessor()
+    stats = BatchRunner(second, jsonl, concurrency=2).run(inputs)
+    assert second.seen == ["bad.pdf"]
+    assert (stats["done"], stats["skipped"]) == (1, 2)
+
+    # resume=False: xóa JSONL cũ, chạy lại tất cả
+    third = FakeProcessor()
+    BatchRunner(third, jsonl).run(inputs, resume=False)
+    assert sorted(third.seen) == inputs
+    assert len(open(jsonl, encoding="utf-8").readlines()) == 3
+
+
+def test_iter_inputs_is_sorted_and_filtered(tmp_path):
+    for name in ("b.PDF", "a.jpg", "note.txt", "sub/c.png"):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"")
+    assert [p[len(str(tmp_path)) + 1:] for p in iterInputs(str(tmp_path))] == ["a.jpg", "b.PDF", "sub/c.png"]
@@ -0,0 +1,98 @@
+"""Test cache kết quả (ResultCache) và cache pages OCR (PageCache) theo nội dung file (core/cache.py)."""
+from core.cache import ResultCache, PageCache, textHash
+
+RESPONSE = {"documents": [{
+    "category": "identity", "docType": "Căn cước công dân", "data": {"so_cccd": "001099012345"},
+    "_debug": {"loader": "docai", "classifier": "rules", "cache": {"hit": False},
+               "concurrency": {"llm": {"limit": 4}}, "prompt_cache": {"cached_tokens": 0}},
+}], "error": None}
+
+
+def test_key_depends_on_every_part():
+    parts = ("file", "model", "schema", "extra", "config")
+    key = ResultCache.makeKey(*parts)
+    assert key == ResultCache.makeKey(*parts)
+    for i in range(len(parts)):
+        changed = list(parts)
+        changed[i] += "2"
+        assert ResultCache.makeKey(*changed) != key
+    # Ghép chuỗi khác nhau không được trùng key
+    assert textHash("ab", "c") != textHash("a", "bc")
+
+
+def test_round_trip_strips_runtime_debug(tmp_path):
+    cache = ResultCache(str(tmp_path), memoryItems=4)
+    assert cache.get("k") == (None, None)
+    cache.set("k", RESPONSE)
+
+    cached, tier = cache.get("k")
+    assert tier == "memory"
+    assert cached["documents"][0]["data"] == RESPONSE["documents"][0]["data"]
+    assert cached["documents"][0]["_debug"] == {"loader": "docai", "classifier": "rules"}
+    # Không sửa response gốc của lần chạy
+    assert "cache" in RESPONSE["documents"][0]["_debug"]
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    ResultCache(str(tmp_path)).set("k", RESPONSE)
+    other = ResultCache(str(tmp_path))
+    assert other.get("k")[1] == "disk"
+    assert other.get("k")[1] == "memory"
+
+
+class CountingLoader:
+    """Loader giả: đếm số lần OCR thật."""
+    processor_id = "proc"
+
+    def __init__(self):
+        self.calls = 0
+
+    def load(self, source):
+        self.calls += 1
+        return [{"content": f"trang {self.calls}"}]
+
+
+def test_page_cache_hit_and_miss(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4 a")
+    cache, loader = PageCache(str(tmp_path / "cache")), CountingLoader()
+
+    assert cache.load(loader, "hybrid_pdf", str(path)) == [{"content": "trang 1"}]
+    assert cache.load(loader, "hybrid_pdf", str(path)) == [{"content": "trang 1"}]
+    assert loader.calls == 1 and cache.stats() == {"hits": 1, "misses": 1}
+
+    # Loader khác / nội dung file khác -> OCR lại
+    cache.load(loader, "docai", str(path))
+    path.write_bytes(b"%PDF-1.4 b")
+    cache.load(loader, "hybrid_pdf", str(path))
+    assert loader.calls == 3
+
+
+def test_page_cache_skips_unserializable_pages(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.set("k", [{"content": "x", "image": object()}])
+    assert cache.get("k") is None
+
+
+class OutOfOrderLoader:
+    """Loader streaming giả: các đoạn về không theo thứ tự trang."""
+    processor_id = "proc"
+
+    def __init__(self):
+        self.calls = 0
+
+    def iterRanges(self, source, firstPages=0):
+        self.calls += 1
+        yield 2, [{"content": "c"}]
+        yield 0, [{"content": "a"}, {"content": "b"}]
+
+
+def test_page_cache_stream_stores_pages_in_order(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4 a")
+    cache, loader = PageCache(str(tmp_path / "cache")), OutOfOrderLoader()
+
+    assert [start for start, _ in cache.iterLoad(loader, "hybrid_pdf", str(path))] == [2, 0]
+    assert list(cache.iterLoad(loader, "hybrid_pdf", str(path))) == [(0, [{"content": c} for c in "abc"])]
+    assert loader.calls == 1
@@ -0,0 +1,57 @@
+"""Test chia cửa sổ + ghép kết quả trích xuất song song (core/chunking.py)."""
+from contracts import Invoice
+from core.chunking import listFields, splitWindows, overlapText, mergeLists, mergeScalars, mergeWindows
+
+
+def _item(code, name, amount):
+    return {"ma_hang": code, "ten_hang": name, "so_luong": 1.0, "don_gia": amount, "thanh_tien": amount}
+
+
+def test_list_fields_of_invoice():
+    assert listFields(Invoice) == ("danh_sach_mat_hang",)
+
+
+def test_split_windows_overlap():
+    text = "\n".join(f"line {i:02d}" for i in range(30))
+    windows = splitWindows([{"content": text}], windowChars=80, overlapLines=2)
+    assert len(windows) > 1
+    for before, after in zip(windows, windows[1:]):
+        assert before.splitlines()[-2:] == after.splitlines()[:2]
+    assert windows[-1].splitlines()[-1] == "line 29"
+
+
+def test_overlap_text():
+    assert overlapText("a\nb\nc", "b\nc\nd") == "b\nc"
+    assert overlapText("a\nb", "c\nd") == ""
+
+
+def test_dedup_item_in_overlap_keeps_fuller_copy():
+    windows = ["1001 ENGINE OIL\n1002 STARTER TALI\n9.00", "1002 STARTER TALI\n9.00\n1003 AIR FILTER"]
+    partial = {"ma_hang": "1002", "ten_hang": "STARTER TALI", "so_luong": None, "don_gia": None, "thanh_tien": None}
+    results = [
+        {"danh_sach_mat_hang": [_item("1001", "ENGINE OIL", 5.0), partial]},
+        {"danh_sach_mat_hang": [_item("1002", "STARTER TALI", 9.0), _item("1003", "AIR FILTER", 4.0)]},
+    ]
+    items = mergeWindows(Invoice, windows, results)["danh_sach_mat_hang"]
+    assert [i["ma_hang"] for i in items] == ["1001", "1002", "1003"]
+    assert items[1]["thanh_tien"] == 9.0
+
+
+def test_repeated_item_outside_overlap_is_kept():
+    oil = _item("1001", "ENGINE OIL", 5.0)
+    filt = _item("1003", "AIR FILTER", 4.0)
+    # Cùng mặt hàng mua 2 lần, lần 2 ở cửa sổ sau nhưng ngoài vùng chồng lấn
+    overlaps = ["", "1003 AIR FILTER\n4.00"]
+    merged = mergeLists([[oil, filt], [filt, oil]], overlaps)
+    assert [i["ma_hang"] for i in merged] == ["1001", "1003", "1001"]
+
+
+def test_no_dedup_without_overlap():
+    oil = _item("1001", "ENGINE OIL", 5.0)
+    assert len(mergeLists([[oil], [oil]], ["", ""])) == 2
+
+
+def test_merge_scalars_majority_then_first():
+    assert mergeScalars([None, "A", "B", "B"]) == "B"
+    assert mergeScalars([1.0, None, 2.0]) == 1.0
+    assert mergeScalars([None, "", "UNKNOWN"]) is None
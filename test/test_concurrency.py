@@ -0,0 +1,82 @@
+"""Test giới hạn đồng thời AIMD và executor riêng cho API (core/concurrency.py)."""
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from core.concurrency import AdaptiveConcurrency, runLlm, runDocAi
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+def test_additive_increase_on_stable_latency():
+    limiter = AdaptiveConcurrency("t", initial=2, maxLimit=3)
+    limiter.acquire()
+    limiter.release(1.0)
+    limiter.acquire()
+    limiter.release(1.0)
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(1.0)
+    assert limiter.limit == 3
+
+
+def test_slow_responses_do_not_increase():
+    limiter = AdaptiveConcurrency("t", initial=2, latencyTolerance=2.0)
+    limiter.acquire()
+    limiter.release(1.0)
+    before = limiter.limit
+    limiter.acquire()
+    limiter.release(5.0)
+    assert limiter.limit == before
+
+
+def test_multiplicative_decrease_once_per_cooldown():
+    limiter = AdaptiveConcurrency("t", initial=8, cooldownSec=60)
+    for _ in range(3):
+        with pytest.raises(Throttled):
+            with limiter.slot():
+                raise Throttled()
+    assert limiter.limit == 4
+    assert limiter.metrics() == {"limit": 4, "in_flight": 0, "ok": 0, "throttled": 3, "error": 0}
+
+
+def test_other_errors_keep_limit():
+    limiter = AdaptiveConcurrency("t", initial=4, minLimit=1)
+    with pytest.raises(KeyError):
+        with limiter.slot():
+            raise KeyError("x")
+    assert limiter.limit == 4 and limiter.counts["error"] == 1
+
+
+def test_acquire_blocks_at_limit():
+    limiter = AdaptiveConcurrency("t", initial=1)
+    limiter.acquire()
+    entered = threading.Event()
+
+    def second():
+        limiter.acquire()
+        entered.set()
+    threading.Thread(target=second, daemon=True).start()
+    assert not entered.wait(0.05)
+    limiter.release(1.0)
+    assert entered.wait(1)
+
+
+def test_api_calls_run_on_dedicated_executors_with_context():
+    current = contextvars.ContextVar("current", default=None)
+
+    def call():
+        return current.get(), threading.current_thread().name
+
+    async def main():
+        current.set("tài liệu 1")
+        return await runLlm(call), await runDocAi(call)
+
+    (llmValue, llmThread), (docAiValue, docAiThread) = asyncio.run(main())
+    assert llmValue == docAiValue == "tài liệu 1"
+    assert llmThread.startswith("llm") and docAiThread.startswith("docai")
@@ -0,0 +1,78 @@
+"""Test đọc phần đầu + khối chữ ký văn bản hành chính bằng luật (core/headerparser.py)."""
+from contracts.government import Luat, NghiDinh, VanBanChiDaoDieuHanh
+from core.headerparser import parseHeader, parseSoHieu, parseNgay
+
+NGHI_DINH = """CHÍNH PHỦ          CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM
+Độc lập - Tự do - Hạnh phúc
+Số: 15/2024/NĐ-CP          Hà Nội, ngày 5 tháng 3 năm 2024
+NGHỊ ĐỊNH
+Quy định chi tiết một số điều của Luật Đất đai
+
+Căn cứ Luật Tổ chức Chính phủ ngày 19 tháng 6 năm 2015;
+Điều 1. Phạm vi điều chỉnh
+"""
+NGHI_DINH_KY = "Nơi nhận:\n- Như trên;\nTM. CHÍNH PHỦ\nTHỦ TƯỚNG\nPhạm Minh Chính\n"
+
+QUYET_DINH = """THỦ TƯỚNG CHÍNH PHỦ
+Số: 123/QĐ-TTg    Hà Nội, ngày 1 tháng 2 năm 2024
+QUYẾT ĐỊNH
+VỀ VIỆC PHÊ DUYỆT ĐỀ ÁN CHUYỂN ĐỔI SỐ
+THỦ TƯỚNG CHÍNH PHỦ
+Căn cứ Luật Tổ chức Chính phủ ngày 19 tháng 6 năm 2015;
+QUYẾT ĐỊNH:
+Điều 1. Phê duyệt đề án.
+KT. THỦ TƯỚNG
+PHÓ THỦ TƯỚNG
+Trần Hồng Hà
+"""
+
+LUAT = """QUỐC HỘI          CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM
+Luật số: 31/2024/QH15
+
+LUẬT
+ĐẤT ĐAI
+
+Căn cứ Hiến pháp nước Cộng hòa xã hội chủ nghĩa Việt Nam;
+"""
+LUAT_KY = "Luật này được Quốc hội khóa XV thông qua ngày 18 tháng 01 năm 2024.\nCHỦ TỊCH QUỐC HỘI\nVương Đình Huệ\n"
+
+
+def test_nghi_dinh_header_and_signature():
+    data = parseHeader(NghiDinh, [{"content": NGHI_DINH}, {"content": NGHI_DINH_KY}])
+    assert data == {
+        "so_hieu": "15/2024/NĐ-CP",
+        "ngay_ban_hanh": "05/03/2024",
+        "trich_yeu": "Quy định chi tiết một số điều của Luật Đất đai",
+        "nguoi_ky": "Phạm Minh Chính",
+    }
+
+
+def test_quyet_dinh_uppercase_trich_yeu():
+    data = parseHeader(VanBanChiDaoDieuHanh, [{"content": QUYET_DINH}])
+    assert data["so_kieu"] == "123/QĐ-TTg"
+    assert data["ngay"] == "01/02/2024"
+    assert data["tieu_de"] == "QUYẾT ĐỊNH VỀ VIỆC PHÊ DUYỆT ĐỀ ÁN CHUYỂN ĐỔI SỐ"
+    assert data["nguoi_ky"] == "Trần Hồng Hà"
+
+
+def test_luat_date_from_adoption_line():
+    data = parseHeader(Luat, [{"content": LUAT}, {"content": LUAT_KY}])
+    assert data["so_hieu"] == "31/2024/QH15"
+    assert data["ngay_ban_hanh"] == "18/01/2024"
+    assert data["trich_yeu"] == "LUẬT ĐẤT ĐAI"
+    assert data["nguoi_ky"] == "Vương Đình Huệ"
+
+
+def test_cited_dates_are_not_issue_date():
+    # Chỉ có ngày trong phần căn cứ -> không đoán ngày ban hành
+    text = "CHÍNH PHỦ\nSố: 15/2024/NĐ-CP\nNGHỊ ĐỊNH\nQuy định chi tiết\n\nCăn cứ Luật ngày 19 tháng 6 năm 2015;\n"
+    assert "ngay_ban_hanh" not in parseHeader(NghiDinh, [{"content": text}])
+
+
+def test_helpers():
+    assert parseSoHieu("Số: 01 / 2024 / TT - BTC") == "01/2024/TT-BTC"
+    assert parseNgay("Hà Nội, ngày 31 tháng 2 năm 2024") is None
+
+
+def test_non_government_contract():
+    assert parseHeader(None, [{"content": NGHI_DINH}]) == {}
@@ -0,0 +1,130 @@
+"""Test tách PDF dài cho Document AI, định tuyến từng trang text / OCR và ghép pages đúng thứ tự (core/loaders.py)."""
+import time
+
+import fitz
+
+from core.loaders import (
+    DocumentLoaderSplitDocAI, DocumentLoaderHybridPdf, _chunkRanges, _inOrder, iterPageRanges, splitPdf, splitRouting,
+)
+
+
+def makePdf(path, count):
+    doc = fitz.open()
+    for i in range(count):
+        doc.new_page().insert_text((72, 72), f"trang {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def pdfTexts(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page.get_text().strip() for page in doc]
+
+
+class FakeDocAi:
+    """Loader OCR giả: đọc text layer; đoạn đầu chậm nhất để các đoạn sau xong trước."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def load(self, source):
+        data = source.getvalue() if hasattr(source, "getvalue") else open(source, "rb").read()
+        texts = pdfTexts(data)
+        self.calls.append(len(texts))
+        time.sleep(0.05 if texts[0] == "trang 1" else 0)
+        return [{"content": text} for text in texts]
+
+
+def test_chunk_ranges():
+    assert _chunkRanges(40, 15) == [(0, 15), (15, 30), (30, 40)]
+    assert _chunkRanges(15, 15) == [(0, 15)]
+    # Đoạn đầu nhỏ để có sớm các trang đầu (streaming)
+    assert _chunkRanges(40, 15, firstPages=3) == [(0, 3), (3, 18), (18, 33), (33, 40)]
+    assert _chunkRanges(2, 15, firstPages=3) == [(0, 2)]
+
+
+def test_split_pdf(tmp_path):
+    chunks = splitPdf(makePdf(tmp_path / "a.pdf", 7), 3)
+    assert [start for start, _ in chunks] == [0, 3, 6]
+    assert pdfTexts(chunks[1][1]) == ["trang 4", "trang 5", "trang 6"]
+
+
+def test_split_loader_merges_in_page_order(tmp_path):
+    calls = []
+    loader = DocumentLoaderSplitDocAI(lambda: FakeDocAi(calls), maxPages=4, maxWorkers=4)
+    pages = loader.load(makePdf(tmp_path / "a.pdf", 10))
+    assert [p["content"] for p in pages] == [f"trang {i + 1}" for i in range(10)]
+    assert sorted(calls) == [2, 4, 4]
+
+
+def test_split_loader_yields_chunks_as_they_finish(tmp_path):
+    loader = DocumentLoaderSplitDocAI(lambda: FakeDocAi([]), maxPages=4, maxWorkers=4)
+    ranges = list(loader.iterRanges(makePdf(tmp_path / "a.pdf", 10)))
+    # Đoạn đầu chậm nhất -> về sau cùng, mỗi đoạn mang theo trang bắt đầu
+    assert ranges[-1][0] == 0
+    assert sorted((start, len(batch)) for start, batch in ranges) == [(0, 4), (4, 4), (8, 2)]
+    assert [p["content"] for batch in _inOrder(iter(ranges)) for p in batch] == [f"trang {i + 1}" for i in range(10)]
+
+
+def test_short_pdf_is_one_request(tmp_path):
+    calls = []
+    loader = DocumentLoaderSplitDocAI(lambda: FakeDocAi(calls), maxPages=15)
+    assert len(loader.load(makePdf(tmp_path / "a.pdf", 5))) == 5
+    assert calls == [5]
+
+
+class FakeOcr:
+    """OCR giả cho trang scan (không có text layer)."""
+
+    def load(self, source):
+        count = len(pdfTexts(source.getvalue()))
+        return [{"content": f"ocr {i}"} for i in range(count)]
+
+
+def makeMixedPdf(path, scanned):
+    """PDF 5 trang, các trang trong `scanned` không có text layer."""
+    doc = fitz.open()
+    for i in range(5):
+        page = doc.new_page()
+        if i not in scanned:
+            page.insert_text((72, 72), f"trang {i + 1} có text layer")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_split_routing():
+    pages = [{"content": "a", "route": "text"}, {"content": "b", "route": "ocr"}]
+    assert splitRouting(pages) == ([{"content": "a"}, {"content": "b"}], ["text", "ocr"])
+    assert splitRouting([{"content": "a"}]) == ([{"content": "a"}], [])
+    assert splitRouting("text") == ("text", [])
+
+
+def test_hybrid_routes_each_page(tmp_path):
+    loader = DocumentLoaderHybridPdf(lambda: DocumentLoaderSplitDocAI(FakeOcr), minChars=5)
+    pages = loader.load(makeMixedPdf(tmp_path / "a.pdf", {1, 3}))
+    assert [p["route"] for p in pages] == ["text", "ocr", "text", "ocr", "text"]
+    assert pages[1]["content"] == "ocr 0" and pages[3]["content"] == "ocr 1"
+    assert pages[4]["content"].startswith("trang 5")
+
+
+def test_hybrid_yields_text_pages_before_ocr(tmp_path):
+    loader = DocumentLoaderHybridPdf(lambda: DocumentLoaderSplitDocAI(FakeOcr), minChars=5)
+    ranges = list(loader.iterRanges(makeMixedPdf(tmp_path / "a.pdf", {1, 3})))
+    assert [(start, [p["route"] for p in batch]) for start, batch in ranges] == [
+        (0, ["text"]), (2, ["text"]), (4, ["text"]), (1, ["ocr"]), (3, ["ocr"]),
+    ]
+
+
+def test_loader_without_streaming_is_one_range():
+    class Plain:
+        def load(self, source):
+            return [{"content": "a"}]
+    assert list(iterPageRanges(Plain(), "a.png")) == [(0, [{"content": "a"}])]
+
+
+def test_hybrid_without_scanned_pages_skips_ocr(tmp_path):
+    loader = DocumentLoaderHybridPdf(lambda: 1 / 0, minChars=5)
+    pages = loader.load(makeMixedPdf(tmp_path / "a.pdf", set()))
+    assert [p["route"] for p in pages] == ["text"] * 5
@@ -0,0 +1,66 @@
+"""Test gom tài liệu ngắn cùng loại vào 1 request (core/microbatch.py)."""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from contracts import VietnamCCCD
+from core.config import config
+from core.microbatch import MicroBatcher
+from core.pipeline import DocumentProcessor
+
+
+class FakeLlm:
+    """LLM giả: ghi lại prompt, trả về data = nội dung tài liệu."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def request(self, messages, response_model=None):
+        prompt = "\n".join(m["content"] for m in messages)
+        self.prompts.append(prompt)
+        count = prompt.count("<document id=")
+        return SimpleNamespace(items=[SimpleNamespace(document_id=i, data={"i": i}) for i in range(count)])
+
+
+def test_documents_share_one_request():
+    llm = FakeLlm()
+    batcher = MicroBatcher(llm, windowSec=0.05, maxItems=8)
+
+    async def main():
+        return await asyncio.gather(*(
+            batcher.submit(VietnamCCCD, [{"content": f"CCCD {i}"}], "hướng dẫn") for i in range(3)
+        ))
+    assert asyncio.run(main()) == [({"i": 0}, 3), ({"i": 1}, 3), ({"i": 2}, 3)]
+    assert len(llm.prompts) == 1
+    assert batcher.stats == {"requests": 1, "documents": 3, "missing": 0}
+
+
+def test_extra_content_is_kept_per_event_loop():
+    llm = FakeLlm()
+    batcher = MicroBatcher(llm, windowSec=0.1, maxItems=8)
+    ready = threading.Barrier(2)
+
+    def session(extra):
+        async def main():
+            ready.wait()
+            return await batcher.submit(VietnamCCCD, [{"content": extra}], extra)
+        asyncio.run(main())
+
+    threads = [threading.Thread(target=session, args=(extra,)) for extra in ("phiên A", "phiên B")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    # Mỗi event loop gửi batch riêng, kèm đúng EXTRA_CONTENTS của nó
+    assert len(llm.prompts) == 2
+    for prompt in llm.prompts:
+        assert prompt.count("phiên A") == 2 or prompt.count("phiên B") == 2
+
+
+def test_batch_stats(monkeypatch):
+    monkeypatch.setattr(config.documentAi, "projectId", "p")
+    monkeypatch.setattr(config.documentAi, "processorId", "x")
+    monkeypatch.setattr(config.processing, "microBatch", False)
+    assert DocumentProcessor(useCache=False).batchStats() == {}
+    monkeypatch.setattr(config.processing, "microBatch", True)
+    assert DocumentProcessor(useCache=False).batchStats() == {"requests": 0, "documents": 0, "missing": 0}
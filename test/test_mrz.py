@@ -0,0 +1,54 @@
+"""Test giải mã MRZ hộ chiếu (core/mrz.py) trên mẫu ICAO 9303."""
+from core.mrz import checkDigit, findMrz, decodeMrz, parsePassportMrz
+
+# Mẫu TD3 trong ICAO Doc 9303
+LINE1 = "P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<"
+LINE2 = "L898902C36UTO7408122F1204159ZE184226B<<<<<10"
+
+EXPECTED = {
+    "so_ho_chieu": "L898902C3",
+    "ngay_sinh": "12/08/1974",
+    "ngay_het_han": "15/04/2012",
+    "loai": "P",
+    "ma_so": "UTO",
+    "ho": "ERIKSSON",
+    "chu_dem_va_ten": "ANNA MARIA",
+    "quoc_tich": "UTO",
+    "gioi_tinh": "F",
+}
+
+
+def test_check_digit():
+    assert checkDigit("L898902C3") == 6
+    assert checkDigit("740812") == 2
+    assert checkDigit("120415") == 9
+
+
+def test_decode_specimen():
+    assert decodeMrz(LINE1, LINE2) == EXPECTED
+
+
+def test_ocr_noise_in_digit_positions():
+    # OCR đọc nhầm 0 -> O ở ngày sinh / ngày hết hạn / check digit tổng, chèn khoảng trắng
+    noisy = "P<UTO ERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\nL898902C36UTO74O8122F12O4159ZE184226B<<<<<1O"
+    assert findMrz(noisy) == (LINE1, LINE2)
+    assert parsePassportMrz([{"content": "PASSPORT\n" + noisy}]) == EXPECTED
+
+
+def test_bad_composite_keeps_only_checked_fields():
+    data = decodeMrz(LINE1, LINE2[:-1] + "7")
+    assert data == {"so_ho_chieu": "L898902C3", "ngay_sinh": "12/08/1974", "ngay_het_han": "15/04/2012"}
+
+
+def test_bad_field_check_digit_drops_field():
+    data = decodeMrz(LINE1, LINE2[:9] + "5" + LINE2[10:])
+    assert "so_ho_chieu" not in data
+
+
+def test_issue_date_from_printed_label():
+    text = f"HỘ CHIẾU / PASSPORT\nNgày cấp / Date of issue: 01/01/2020\n{LINE1}\n{LINE2}"
+    assert parsePassportMrz([{"content": text}])["ngay_cap"] == "01/01/2020"
+
+
+def test_no_mrz():
+    assert parsePassportMrz([{"content": "HỘ CHIẾU\nkhông có vùng MRZ"}]) == {}
@@ -0,0 +1,64 @@
+"""Test chọn trang cho tài liệu dài (core/pages.py)."""
+from contracts import VietnamCCCD
+from contracts.government import NghiDinh
+from core.pages import PAGE_POLICIES, PagePolicy, selectPages, classifyPages, pagesText
+
+SIGNATURE = "TM. CHÍNH PHỦ\nTHỦ TƯỚNG"
+
+
+def makePages(count, signatures=()):
+    return [{"content": SIGNATURE if i in signatures else f"trang {i}"} for i in range(count)]
+
+
+def indexes(pages):
+    return [int(p["content"].split()[-1]) if p["content"].startswith("trang") else "ký" for p in pages]
+
+
+def test_gov_policy_keeps_head_tail_and_signature_pages():
+    pages = makePages(12, signatures={8})
+    selected, kept = selectPages(pages, PAGE_POLICIES[NghiDinh], threshold=5)
+    assert kept == [0, 1, 8, 11]
+    assert selected == [pages[i] for i in kept]
+
+
+def test_signature_pages_are_limited_and_scanned_from_the_end():
+    pages = makePages(12, signatures={3, 5, 7, 9})
+    _, kept = selectPages(pages, PAGE_POLICIES[NghiDinh], threshold=5)
+    assert kept == [0, 1, 7, 9, 11]
+
+
+def test_short_document_is_not_pruned():
+    pages = makePages(5)
+    assert selectPages(pages, PAGE_POLICIES[NghiDinh], threshold=5) == (pages, [])
+    # Đủ dài nhưng head + tail đã phủ hết
+    assert selectPages(makePages(3), PAGE_POLICIES[NghiDinh], threshold=1)[1] == []
+
+
+def test_select_from_partial_pages():
+    policy = PAGE_POLICIES[NghiDinh]
+    texts = {i: f"trang {i}" for i in (0, 1, 2, 11)}
+    # Chưa biết trang 10 có khối chữ ký không -> chưa quyết định được
+    assert policy.selectFrom(texts, 12) is None
+    texts.update({10: SIGNATURE, 9: SIGNATURE})
+    assert policy.selectFrom(texts, 12) == [0, 1, 9, 10, 11]
+    assert policy.select([texts.get(i, "") for i in range(12)]) == [0, 1, 9, 10, 11]
+    assert PagePolicy().selectFrom({}, 20) == list(range(20))
+
+
+def test_keep_all_policies():
+    pages = makePages(20)
+    assert PAGE_POLICIES[VietnamCCCD] == PagePolicy()
+    assert selectPages(pages, PagePolicy(), threshold=5) == (pages, [])
+    assert selectPages(pages, None, threshold=5) == (pages, [])
+    assert selectPages("text", PAGE_POLICIES[NghiDinh], threshold=0) == ("text", [])
+
+
+def test_classify_pages_uses_leading_pages():
+    pages = makePages(10)
+    assert indexes(classifyPages(pages, 3, threshold=5)) == [0, 1, 2]
+    assert classifyPages(makePages(4), 3, threshold=5) == makePages(4)
+
+
+def test_pages_text_skips_empty_pages():
+    assert pagesText([{"content": "a"}, {"content": ""}, {"content": None}, {"content": "b"}]) == "a\n\nb"
+    assert pagesText("x") == "x"
@@ -0,0 +1,84 @@
+"""Test phân loại sơ bộ bằng luật (core/preclassify.py)."""
+import asyncio
+
+from contracts import VietnamCCCD, VietnamPassport, Invoice
+from contracts.government import Luat, NghiDinh, VanBanChiDaoDieuHanh
+from core.config import config
+from core.pipeline import DocumentProcessor
+from core.preclassify import preClassify, rankCandidates, headerText, HEADER_PAGES
+
+
+def _contract(text):
+    result = preClassify([{"content": text}])
+    return result.classification.contract if result else None
+
+
+def test_so_hieu_rules():
+    assert _contract("CHÍNH PHỦ\nSố: 15/2024/NĐ-CP\nNGHỊ ĐỊNH") is NghiDinh
+    assert _contract("QUỐC HỘI\nLuật số: 31/2024/QH15\nLUẬT\nĐẤT ĐAI") is Luat
+    assert _contract("THỦ TƯỚNG CHÍNH PHỦ\nSố: 05/CT-TTg\nCHỈ THỊ") is VanBanChiDaoDieuHanh
+
+
+def test_cited_number_is_not_a_signal():
+    # Số hiệu trong phần căn cứ không có "Số:" -> không dùng
+    assert rankCandidates([{"content": "Căn cứ Luật số 76/2015/QH13;\nNGHỊ ĐỊNH"}]) == []
+
+
+def test_weak_signal_goes_to_llm():
+    # QĐ-TTg chỉ là gợi ý (điểm thấp), hóa đơn chỉ có 1 tín hiệu
+    assert _contract("THỦ TƯỚNG CHÍNH PHỦ\nSố: 123/QĐ-TTg") is None
+    assert _contract("UNIHAKKA INTERNATIONAL\nTOTAL SALES\n80.00") is None
+    ranked = rankCandidates([{"content": "THỦ TƯỚNG CHÍNH PHỦ\nSố: 123/QĐ-TTg"}])
+    assert ranked[0].classification.contract is VanBanChiDaoDieuHanh and ranked[0].score == 5
+
+
+def test_invoice_with_two_signals():
+    receipt = "SYARIKAT PERNIAGAAN GIN KEE\nDOC NO: CS00012345\nKF MODELLING CLAY\nTOTAL SALES (INCLUSIVE OF GST): 9.00"
+    assert _contract(receipt) is Invoice
+    assert _contract("TAX INVOICE\nROUNDED TOTAL (RM): 9.00") is Invoice
+
+
+def test_invoice_short_circuits_llm(monkeypatch):
+    monkeypatch.setattr(config.documentAi, "projectId", "p")
+    monkeypatch.setattr(config.documentAi, "processorId", "x")
+    processor = DocumentProcessor(useCache=False)
+
+    async def noLlm(*args, **kwargs):
+        raise AssertionError("không được gọi LLM classify")
+    monkeypatch.setattr(processor, "_classifyLlm", noLlm)
+
+    result, debug = asyncio.run(processor._classify([{"content": "TAX INVOICE\nDOC NO: 1\nTOTAL SALES 9.00"}]))
+    assert result.classification.contract is Invoice and debug == {"classifier": "rules"}
+
+
+def test_identity_documents():
+    assert _contract("CĂN CƯỚC CÔNG DÂN\nSố: 001099012345") is VietnamCCCD
+    assert _contract("P<VNMNGUYEN<<VAN<AN<<<<<<<<<<<<<<<<<<<<<<<<<") is VietnamPassport
+
+
+def test_header_text_uses_leading_pages_only():
+    pages = [{"content": f"trang {i}"} for i in range(HEADER_PAGES + 2)]
+    assert headerText(pages) == "\n".join(f"trang {i}" for i in range(HEADER_PAGES))
+
+
+def test_empty_document():
+    assert preClassify([{"content": ""}]) is None
+
+
+class FakeExtractor:
+    def classify(self, pages, classifications, vision=False):
+        return None
+
+
+def test_classification_mode_per_processor(monkeypatch):
+    monkeypatch.setattr(config.documentAi, "projectId", "p")
+    monkeypatch.setattr(config.documentAi, "processorId", "x")
+    monkeypatch.setattr(config.processing, "classificationMode", "flat")
+    flat, tree = DocumentProcessor(useCache=False), DocumentProcessor(useCache=False, classificationMode="tree")
+    monkeypatch.setattr(tree, "_newExtractor", lambda llm=None: FakeExtractor())
+
+    _, debug = asyncio.run(tree.aclassify([{"content": "TAX INVOICE\nDOC NO: 1\nTOTAL SALES 9.00"}], useRules=False))
+    assert debug["classifier"] == "llm" and debug["classify"]["mode"] == "tree"
+    # Không sửa config dùng chung; cache kết quả tách theo mode
+    assert config.processing.classificationMode == "flat"
+    assert flat._configHash != tree._configHash
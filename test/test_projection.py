@@ -0,0 +1,30 @@
+"""Test trích xuất theo bộ trường rút gọn (core/projection.py)."""
+from contracts import VietnamCCCD
+from core.projection import normalizeFields, projectContract, projectData
+
+
+def test_normalize_fields():
+    assert normalizeFields([" so_cccd", "ho_ten", "so_cccd", ""]) == ("so_cccd", "ho_ten")
+    assert normalizeFields(None) is None and normalizeFields([]) is None and normalizeFields(["  "]) is None
+
+
+def test_project_contract_keeps_types_and_descriptions():
+    target = projectContract(VietnamCCCD, ("ho_ten", "so_cccd", "khong_co"))
+    assert list(target.model_fields) == ["ho_ten", "so_cccd"]
+    assert target.__name__ == "VietnamCCCD"
+    original = VietnamCCCD.model_fields["so_cccd"]
+    assert target.model_fields["so_cccd"].annotation == original.annotation
+    assert target.model_fields["so_cccd"].description == original.description
+    # Cache theo (contract, bộ trường)
+    assert projectContract(VietnamCCCD, ("ho_ten", "so_cccd", "khong_co")) is target
+
+
+def test_project_contract_edge_cases():
+    assert projectContract(VietnamCCCD, ("khong_co",)) is None
+    assert projectContract(VietnamCCCD, tuple(VietnamCCCD.model_fields)) is VietnamCCCD
+
+
+def test_project_data_has_exactly_requested_keys():
+    data = {"so_cccd": "001099012345", "ho_ten": "NGUYEN VAN A", "ngay_sinh": "01/01/1990"}
+    assert projectData(data, ("so_cccd", "gioi_tinh")) == {"so_cccd": "001099012345", "gioi_tinh": None}
+    assert projectData(None, ("so_cccd",)) == {"so_cccd": None}
@@ -0,0 +1,74 @@
+"""Test prefix cache của prompt qua PipelineLLM (core/promptcache.py, core/llm.py)."""
+import extract_thinker
+import pytest
+
+from core.concurrency import _Unlimited
+from core.llm import PipelineLLM
+from core.promptcache import PromptCache, LocalPrefixCache, requestLog
+from core.ratelimit import RateLimiter
+
+PREFIX = [
+    {"role": "system", "content": "You are a server API that returns JSON."},
+    {"role": "user", "content": "##Contract\n" + "so_cccd: str\n" * 40},
+]
+
+
+def messages(document):
+    return PREFIX + [{"role": "user", "content": f"##Content\n{document}"}]
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Thay request thật của extract_thinker.LLM: ghi lại messages, model có 'legacy' từ chối cache_control."""
+    calls = []
+
+    def request(self, messages, response_model=None):
+        marked = any(isinstance(m["content"], list) for m in messages)
+        calls.append({"model": self.model, "marked": marked})
+        if marked and "legacy" in self.model:
+            raise ValueError("Invalid parameter: cache_control is not supported")
+        return {"ok": True}
+    monkeypatch.setattr(extract_thinker.LLM, "request", request)
+    return calls
+
+
+def makeLlm(model, mode="auto"):
+    cache = PromptCache(mode, LocalPrefixCache(minTokens=10))
+    return PipelineLLM(model, limiter=RateLimiter("t", {}), concurrency=_Unlimited(), promptCache=cache)
+
+
+def test_second_request_with_same_contract_reports_cached_prefix(sent):
+    llm = makeLlm("gemini/gemini-2.5-flash", mode="local")
+    log = []
+    token = requestLog.set(log)
+    try:
+        llm.request(messages("CCCD 1"))
+        llm.request(messages("CCCD 2"))
+    finally:
+        requestLog.reset(token)
+    assert [entry["cached_tokens"] for entry in log] == [0, log[0]["prefix_tokens"]]
+    assert log[0]["prefix"] == log[1]["prefix"] and log[1]["source"] == "local"
+    assert llm._promptCache.totals["cached_tokens"] == log[0]["prefix_tokens"]
+
+
+def test_cache_control_only_for_claude(sent):
+    makeLlm("anthropic/claude-sonnet-4-5").request(messages("a"))
+    makeLlm("gemini/gemini-2.5-flash").request(messages("a"))
+    assert [call["marked"] for call in sent] == [True, False]
+
+
+def test_fallback_when_provider_rejects_cache_control(sent):
+    llm = makeLlm("anthropic/claude-legacy")
+    assert llm.request(messages("a")) == {"ok": True}
+    assert [call["marked"] for call in sent] == [True, False]
+    # Lần sau không đánh dấu nữa
+    llm.request(messages("b"))
+    assert [call["marked"] for call in sent] == [True, False, False]
+
+
+def test_other_errors_are_not_swallowed(sent, monkeypatch):
+    def broken(self, messages, response_model=None):
+        raise KeyError("schema")
+    monkeypatch.setattr(extract_thinker.LLM, "request", broken)
+    with pytest.raises(KeyError):
+        makeLlm("anthropic/claude-sonnet-4-5").request(messages("a"))
@@ -0,0 +1,95 @@
+"""Test giới hạn tốc độ và retry khi bị throttle (core/ratelimit.py)."""
+import time
+
+import litellm
+import pytest
+
+from core.concurrency import AdaptiveConcurrency
+from core.config import config
+from core.loaders import DocumentLoaderSplitDocAI
+from core.ratelimit import TokenBucket, RateLimiter, isRetryable, callWithBackoff
+
+
+class TooManyRequests(Exception):
+    """Giống google.api_core.exceptions.TooManyRequests (có `code`)."""
+    code = 429
+
+
+def wrapped(error):
+    """Như DocumentLoaderGoogleDocumentAI: bọc mọi lỗi thành ValueError bên trong `except`."""
+    try:
+        raise error
+    except Exception as e:
+        try:
+            raise ValueError(f"Error processing document: {e}")
+        except ValueError as outer:
+            return outer
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(ratePerSec=50, capacity=2)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    start = time.monotonic()
+    waited = bucket.acquire()
+    assert waited > 0 and time.monotonic() - start >= 0.015
+
+
+def test_bucket_clamps_large_requests_and_debit():
+    bucket = TokenBucket(ratePerSec=1000, capacity=5)
+    assert bucket.acquire(50) == 0
+    bucket.debit(5)
+    assert bucket.acquire(1) > 0
+
+
+def test_limiter_skips_unconfigured_buckets():
+    limiter = RateLimiter("t", {"requests": TokenBucket(1000, 10)})
+    assert limiter.acquire(requests=1, tokens=10_000) == 0
+    assert limiter.stats() == {"calls": 1, "waited_sec": 0}
+
+
+def test_is_retryable_by_code_and_type():
+    assert isRetryable(TooManyRequests("quota"))
+    assert isRetryable(litellm.RateLimitError("slow down", llm_provider="gemini", model="gemini-2.0-flash"))
+    assert isRetryable(type("ServiceUnavailable", (Exception,), {})())
+    assert not isRetryable(ValueError("bad input"))
+
+
+def test_is_retryable_sees_wrapped_docai_errors():
+    assert isRetryable(wrapped(TooManyRequests("quota")))
+    assert not isRetryable(wrapped(KeyError("page")))
+
+
+def test_numbers_in_message_are_not_status_codes():
+    assert not isRetryable(ValueError("Hóa đơn số 4290 không hợp lệ"))
+    assert not isRetryable(wrapped(ValueError("invoice 503 missing")))
+
+
+def test_call_with_backoff_retries_only_throttling():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TooManyRequests()
+        return "ok"
+    assert callWithBackoff(flaky, retries=5, baseDelay=0) == "ok" and len(calls) == 3
+
+    with pytest.raises(KeyError):
+        callWithBackoff(lambda: {}["x"], retries=5, baseDelay=0)
+
+
+def test_docai_throttle_is_unwrapped_for_concurrency(monkeypatch):
+    monkeypatch.setattr(config.rateLimit, "backoffBaseSec", 0)
+    calls = []
+
+    class Throttled:
+        def load(self, source):
+            calls.append(source)
+            if len(calls) == 1:
+                raise wrapped(TooManyRequests("quota"))
+            return [{"content": "ok"}]
+
+    concurrency = AdaptiveConcurrency("docai", initial=4)
+    loader = DocumentLoaderSplitDocAI(Throttled, concurrency=concurrency)
+    assert loader.load("a.png") == [{"content": "ok"}]
+    assert concurrency.counts["throttled"] == 1 and concurrency.counts["ok"] == 1 and concurrency.limit < 4
@@ -0,0 +1,78 @@
+"""Test kiểm tra dữ liệu (core/validation.py) và sửa riêng các trường lỗi (core/repair.py)."""
+from contracts import VietnamCCCD, Invoice
+from core.validation import validateData, parseDate, isEmpty
+from core.repair import fieldSnippets, buildRepairMessages, mergeRepair
+
+CCCD_TEXT = "\n".join([
+    "CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM",
+    "CĂN CƯỚC CÔNG DÂN",
+    "Số / No: 001099012345",
+    "Họ và tên / Full name:",
+    "NGUYEN VAN A",
+    "Ngày sinh / Date of birth: 01/01/1990",
+] + [f"dòng {i}" for i in range(40)] + ["Có giá trị đến: 01/01/2035"])
+
+
+def test_parse_date_formats():
+    assert parseDate("05/03/2024").day == 5
+    assert parseDate("ngày 5 tháng 3 năm 2024").month == 3
+    assert parseDate("31/02/2024") is None
+
+
+def test_is_empty():
+    assert all(isEmpty(v) for v in (None, "", "  ", "UNKNOWN", [], {}))
+    assert not any(isEmpty(v) for v in ("A", 0, 0.0, [1]))
+
+
+def test_validate_cccd_fields():
+    data = {"so_cccd": "001099012345", "ngay_sinh": "1990", "ho_ten": "NGUYEN VAN A"}
+    issues = validateData(VietnamCCCD, data)
+    assert "ngay_sinh" in issues and "so_cccd" not in issues
+    # Chỉ kiểm tra các trường được yêu cầu
+    assert validateData(VietnamCCCD, data, ["so_cccd"]) == {}
+
+
+def test_unknown_placeholder_counts_as_missing():
+    # Bắt buộc -> báo thiếu (để được hỏi lại); không bắt buộc -> bỏ qua, không báo sai định dạng
+    assert validateData(VietnamCCCD, {"so_cccd": "UNKNOWN", "ngay_sinh": "UNKNOWN"}) == {"so_cccd": "thiếu giá trị"}
+    assert validateData(VietnamCCCD, {"so_cccd": " UNKNOWN ", "ngay_het_han": []}) == {"so_cccd": "thiếu giá trị"}
+
+
+def test_invoice_totals_rule():
+    items = [{"thanh_tien": 9.0}, {"thanh_tien": 3.5}]
+    assert set(validateData(Invoice, {"danh_sach_mat_hang": items, "tong_tien": 15.0})) == {
+        "danh_sach_mat_hang", "tong_tien",
+    }
+    assert validateData(Invoice, {"danh_sach_mat_hang": items, "tong_tien": 12.5}) == {}
+    assert list(validateData(Invoice, {"danh_sach_mat_hang": items, "tong_tien": 15.0}, ["tong_tien"])) == ["tong_tien"]
+
+
+def test_merge_repair_keeps_valid_fields():
+    data = {"so_cccd": "LLM", "ho_ten": "NGUYEN VAN A", "ngay_sinh": "x"}
+    merged, changed = mergeRepair(data, {"so_cccd": "001099012345", "ngay_sinh": None, "ho_ten": "B"},
+                                  ["so_cccd", "ngay_sinh"])
+    assert merged == {"so_cccd": "001099012345", "ho_ten": "NGUYEN VAN A", "ngay_sinh": "x"}
+    assert changed == ["so_cccd"]
+    # Không sửa dữ liệu gốc
+    assert data["so_cccd"] == "LLM"
+
+
+def test_snippets_around_label_and_value():
+    data = {"ngay_sinh": "01/01/1990"}
+    snippets = fieldSnippets([{"content": CCCD_TEXT}], VietnamCCCD, data, ["ngay_sinh"], context=1)
+    assert "Ngày sinh / Date of birth: 01/01/1990" in snippets
+    assert "dòng 30" not in snippets
+
+
+def test_snippets_fall_back_to_head():
+    snippets = fieldSnippets([{"content": CCCD_TEXT}], VietnamCCCD, {"so_cccd": "LLM"}, ["so_cccd"], maxChars=200)
+    assert snippets == CCCD_TEXT[:200]
+
+
+def test_repair_messages_list_only_invalid_fields():
+    issues = {"so_cccd": "số CCCD phải gồm 12 chữ số"}
+    messages = buildRepairMessages(VietnamCCCD, {"so_cccd": "LLM", "ho_ten": "A"}, issues, "Số / No: 001099012345", None)
+    content = messages[-1]["content"]
+    assert "so_cccd: 'LLM' -> số CCCD phải gồm 12 chữ số" in content
+    assert "ho_ten" not in content
+    assert "001099012345" in content
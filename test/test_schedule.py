@@ -0,0 +1,39 @@
+"""Test lập lịch batch: sắp xếp theo chi phí ước lượng và chia lane (core/schedule.py)."""
+from core.schedule import CostEstimate, orderJobs, planLanes
+
+
+def job(name, sec, pages=1):
+    return CostEstimate(name, "docai", pages, pages, 0.1, sec)
+
+
+JOBS = [job("a", 5), job("b", 60, pages=40), job("c", 2), job("d", 30, pages=25)]
+
+
+def names(jobs):
+    return [e.input for e in jobs]
+
+
+def test_order_jobs():
+    assert names(orderJobs(JOBS, "lpt")) == ["b", "d", "a", "c"]
+    assert names(orderJobs(JOBS, "sjf")) == ["c", "a", "d", "b"]
+    assert names(orderJobs(iter(JOBS), "fifo")) == ["a", "b", "c", "d"]
+
+
+def test_single_lane_by_default():
+    assert [(lane, names(jobs), workers) for lane, jobs, workers in planLanes(JOBS, "lpt", 4)] == [
+        ("main", ["b", "d", "a", "c"], 4)
+    ]
+
+
+def test_long_documents_get_their_own_lane():
+    lanes = planLanes(JOBS, "lpt", concurrency=4, longPages=20, longWorkers=1)
+    assert [(lane, names(jobs), workers) for lane, jobs, workers in lanes] == [
+        ("long", ["b", "d"], 1), ("short", ["a", "c"], 3)
+    ]
+    # Lane dài không được chiếm hết worker
+    assert [workers for _, _, workers in planLanes(JOBS, "sjf", concurrency=2, longPages=20, longWorkers=5)] == [1, 1]
+
+
+def test_no_split_when_one_side_is_empty():
+    lanes = planLanes(JOBS, "fifo", concurrency=4, longPages=100)
+    assert [(lane, len(jobs)) for lane, jobs, _ in lanes] == [("main", 4)]
@@ -0,0 +1,95 @@
+"""Test pipeline streaming: PageStream nhận trang không theo thứ tự, trích xuất sớm theo PAGE_POLICIES."""
+import asyncio
+import threading
+
+import pytest
+
+from core.config import config
+from core.loaders import PageStream
+from core.pipeline import DocumentProcessor
+from core.preclassify import preClassify
+
+HEADER = "CHÍNH PHỦ\nSố: 15/2024/NĐ-CP\nNGHỊ ĐỊNH"
+SIGNATURE = "TM. CHÍNH PHỦ\nTHỦ TƯỚNG"
+
+
+def page(i):
+    return {"content": f"trang {i}"}
+
+
+def test_wait_needs_contiguous_prefix():
+    async def main():
+        gate = threading.Event()
+
+        def ranges():
+            yield 3, [page(3), page(4)]
+            yield 0, [page(0)]
+            gate.wait(5)
+            yield 1, [page(1), page(2)]
+
+        stream = PageStream(ranges(), total=5)
+        assert await stream.wait(1) == [page(0)]
+        assert await stream.until(lambda pages: sorted(pages) if 4 in pages else None) == [0, 3, 4]
+        gate.set()
+        assert await stream.wait(3) == [page(i) for i in range(5)]
+        assert await stream.all() == [page(i) for i in range(5)]
+    asyncio.run(main())
+
+
+def test_wait_returns_what_exists_when_document_is_short():
+    async def main():
+        stream = PageStream(iter([(0, [page(0), page(1)])]), total=2)
+        assert await stream.wait(3) == [page(0), page(1)]
+        assert await stream.until(lambda pages: None) is None
+    asyncio.run(main())
+
+
+def test_loader_error_is_raised_to_waiters():
+    def ranges():
+        yield 0, [page(0)]
+        raise RuntimeError("OCR lỗi")
+
+    async def main():
+        stream = PageStream(ranges(), total=5)
+        with pytest.raises(RuntimeError):
+            await stream.wait(3)
+        with pytest.raises(RuntimeError):
+            await stream.all()
+    asyncio.run(main())
+
+
+def test_extraction_starts_before_middle_pages_arrive(monkeypatch):
+    monkeypatch.setattr(config.documentAi, "projectId", "p")
+    monkeypatch.setattr(config.documentAi, "processorId", "x")
+    monkeypatch.setattr(config.processing, "pagePruning", True)
+    monkeypatch.setattr(config.processing, "eagerPageThreshold", 5)
+    processor = DocumentProcessor(useCache=False)
+    started = threading.Event()
+    extracted = []
+
+    async def classify(pages, useRules=True):
+        return preClassify(pages), {"classifier": "rules"}
+
+    async def extract(pages, contract, extra, fields=None):
+        extracted.append([p["content"] for p in pages])
+        started.set()
+        return {"so_hieu": "15/2024/NĐ-CP"}, {"tier": 0}
+
+    monkeypatch.setattr(processor, "_classify", classify)
+    monkeypatch.setattr(processor, "_extract", extract)
+
+    texts = [HEADER] + [f"trang {i}" for i in range(1, 12)]
+    texts[9] = texts[10] = SIGNATURE
+
+    def ranges():
+        # Trang đầu và 3 trang cuối về trước, phần giữa chỉ về sau khi đã bắt đầu trích xuất
+        yield 0, [{"content": t, "route": "text"} for t in texts[:3]]
+        yield 9, [{"content": t, "route": "ocr"} for t in texts[9:]]
+        assert started.wait(5)
+        yield 3, [{"content": t, "route": "text"} for t in texts[3:9]]
+
+    response = asyncio.run(processor._processStream(ranges(), len(texts), "a.pdf", "hybrid_pdf"))
+    doc = response["documents"][0]
+    assert extracted == [[texts[i] for i in (0, 1, 9, 10, 11)]]
+    assert doc["data"] == {"so_hieu": "15/2024/NĐ-CP"} and doc["_debug"]["extract"]["early"] is True
+    assert doc["_debug"]["stream"]["extract_started_ms"] is not None